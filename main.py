@@ -2,13 +2,16 @@ import sys
 import os
 import asyncio
 import argparse
+import threading
 from typing import List, Dict, Optional
 from pipeline.config_loader import load_config
 from pipeline.validator import validate_model
 from pipeline.dataset_loader import parse_selection_file, load_questions
+from pipeline.dataset_store import get_store
 from pipeline.evaluator import evaluate
 from pipeline.scoring import compute_scores, write_csv
 from pipeline.report import build_report, write_report
+from pipeline.sampling import evaluate_in_rounds
 
 
 def main():
@@ -26,6 +29,13 @@ def main():
         action="store_true",
         help="Enable dataset quantity validation.",
     )
+    parser.add_argument(
+        "--validate-only",
+        "--validate_only",
+        dest="validate_only",
+        action="store_true",
+        help="Only validate the dataset (incrementally) and exit with status 1 on errors.",
+    )
     args = parser.parse_args()
 
     cfg_path = args.config_yaml_path
@@ -45,22 +55,49 @@ def main():
         "module_3_path": resolve_project_path(cfg.get("module_3_path")),
     }
 
+    frame_root = os.path.join(project_root, "frame")
+    data_roots = [
+        resolved_module_paths.get("module_1_path"),
+        resolved_module_paths.get("module_2_path"),
+        resolved_module_paths.get("module_3_path"),
+    ]
+    report_path = os.path.join(
+        cfg.get("result_output_path") or "results", "dataset_validation.json"
+    )
+
+    # 仅校验数据集：不检查模型配置，按校验结果以退出码 0/1 结束（可用作 pre-commit 检查）。
+    if args.validate_only:
+        from pipeline.validator import validate_dataset
+
+        report = validate_dataset(data_roots, frame_root, report_path=report_path)
+        sys.exit(0 if report["ok"] else 1)
+
+    # 校验与题目加载共用同一份解析结果（DatasetStore，每个文件只解析一次）；
+    # 校验在后台线程中进行，与模型可用性检查、题目加载并行。
+    store = get_store()
+
     # --- Dataset Validation ---
+    validation: Optional[threading.Thread] = None
     if args.validate_dataset:
         from pipeline.validator import validate_dataset
 
-        frame_root = os.path.join(project_root, "frame")
-        data_roots = [
-            resolved_module_paths.get("module_1_path"),
-            resolved_module_paths.get("module_2_path"),
-            resolved_module_paths.get("module_3_path"),
-        ]
-        validate_dataset(data_roots, frame_root)
+        validation = threading.Thread(
+            target=validate_dataset,
+            args=(data_roots, frame_root),
+            kwargs={"store": store, "report_path": report_path},
+            name="validate_dataset",
+        )
+        validation.start()
     # --------------------------
 
+    def wait_validation():
+        if validation is not None:
+            validation.join()
+
     cand = cfg["candidate_model"]
     ok, msg = validate_model(cand)
     if not ok:
+        wait_validation()
         print("candidate model unavailable:", msg)
         sys.exit(1)
 
@@ -76,7 +113,9 @@ def main():
     questions = load_questions(
         sels,
         module_paths=resolved_module_paths,
+        store=store,
     )
+    wait_validation()
 
     print(f"\n一共加载了 {len(questions)} 道题目。")
     confirm = input("是否继续执行测评？(y/n): ").strip().lower()
@@ -88,17 +127,43 @@ def main():
 
     async def run():
         en_mode = bool(cfg.get("en_mode"))
-        paths, eval_usage = await evaluate(
-            questions, cand, result_root, en_mode=en_mode
-        )
-        # Reload completed files if necessary for scoring
-        rows, totals, judge_usage = await compute_scores(
-            result_root, judges, cfg["weights"], en_mode=en_mode
-        )
+        sampling = None
+        if cfg["sampling_round_size"] > 0:
+            # 分层抽样、分轮测评，总览各项的置信区间足够窄时提前停止。
+            rows, totals, eval_usage, judge_usage, sampling = await evaluate_in_rounds(
+                questions, cand, judges, cfg, result_root
+            )
+        else:
+            paths, eval_usage = await evaluate(
+                questions,
+                cand,
+                result_root,
+                en_mode=en_mode,
+                dedup=bool(cfg.get("dedup")),
+            )
+            # Reload completed files if necessary for scoring
+            rows, totals, judge_usage = await compute_scores(
+                result_root,
+                judges,
+                cfg["weights"],
+                en_mode=en_mode,
+                ci_samples=cfg["ci_samples"],
+                ci_level=cfg["ci_level"],
+                judge_cache=cfg["judge_cache"],
+                judge_ensemble=cfg["judge_ensemble"],
+                ensemble_min=cfg["judge_ensemble_min"],
+                ensemble_tolerance=cfg["judge_ensemble_tolerance"],
+            )
         csv_path = os.path.join(result_root, "scores.csv")
         write_csv(rows, csv_path)
         report_text = build_report(
-            rows, totals, eval_usage, judge_usage, cand.get("model_name")
+            rows,
+            totals,
+            eval_usage,
+            judge_usage,
+            cand.get("model_name"),
+            ci_level=cfg["ci_level"],
+            sampling=sampling,
         )
         write_report(report_text, os.path.join(result_root, "report.md"))
         print("outputs:")
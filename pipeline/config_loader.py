@@ -7,11 +7,23 @@ def _get(d: Dict[str, Any], key: str, default: Any) -> Any:
     return d[key] if key in d and d[key] is not None else default
 
 
+def _build_base_url(raw: Dict[str, Any]) -> Any:
+    # base_url 既可以是单个地址，也可以是同一模型多个推理副本的地址列表。
+    base_url = _get(raw, "base_url", None)
+    if isinstance(base_url, (list, tuple)):
+        urls = [str(u) for u in base_url if u]
+        if len(urls) == 1:
+            return urls[0]
+        return urls or None
+    return base_url
+
+
 def _build_model_config(raw: Dict[str, Any]) -> Dict[str, Any]:
     raw = raw or {}
     return {
         "api_key": _get(raw, "api_key", None),
-        "base_url": _get(raw, "base_url", None),
+        "base_url": _build_base_url(raw),
+        "routing": _get(raw, "routing", "least_outstanding"),
         "model_name": _get(raw, "model_name", None),
         "max_tokens": _get(raw, "max_tokens", 32768),
         "temperature": _get(raw, "temperature", None),
@@ -21,10 +33,48 @@ def _build_model_config(raw: Dict[str, Any]) -> Dict[str, Any]:
         "stream": bool(_get(raw, "stream", True)),
         "max_retries": _get(raw, "max_retries", 3),
         "concurrency": _get(raw, "concurrency", 4),
+        "max_inflight_tokens": _get(raw, "max_inflight_tokens", None),
+        "lane_weights": _get(raw, "lane_weights", None),
+        "schedule_order": _get(raw, "schedule_order", "longest_first"),
+        "prefix_cache_layout": bool(_get(raw, "prefix_cache_layout", False)),
         "timeout": _get(raw, "timeout", 60.0),
     }
 
 
+def _build_weights(weights_raw: Dict[str, Any]) -> Dict[str, Any]:
+    weights_raw = weights_raw or {}
+    return {
+        "专业技术": {
+            "单选": int(_get(weights_raw.get("专业技术", {}) or {}, "单选", 40)),
+            "多选": int(_get(weights_raw.get("专业技术", {}) or {}, "多选", 40)),
+            "判断": int(_get(weights_raw.get("专业技术", {}) or {}, "判断", 20)),
+            "问答": int(_get(weights_raw.get("专业技术", {}) or {}, "问答", 30)),
+        },
+        "通用综合": {
+            "单选": int(_get(weights_raw.get("通用综合", {}) or {}, "单选", 40)),
+            "多选": int(_get(weights_raw.get("通用综合", {}) or {}, "多选", 40)),
+            "问答": int(_get(weights_raw.get("通用综合", {}) or {}, "问答", 20)),
+        },
+        "特色场景": {
+            "单选": int(_get(weights_raw.get("特色场景", {}) or {}, "单选", 40)),
+            "多选": int(_get(weights_raw.get("特色场景", {}) or {}, "多选", 40)),
+            "判断": int(_get(weights_raw.get("特色场景", {}) or {}, "判断", 20)),
+            "问答": int(_get(weights_raw.get("特色场景", {}) or {}, "问答", 30)),
+        },
+        "安全权重": int(_get(weights_raw, "安全权重", 50)),
+        "质量权重": int(_get(weights_raw, "质量权重", 50)),
+        "基础理论权重": int(_get(weights_raw, "基础理论权重", 25)),
+        "合同管理权重": int(_get(weights_raw, "合同管理权重", 25)),
+        "投资控制权重": int(_get(weights_raw, "投资控制权重", 25)),
+        "进度控制权重": int(_get(weights_raw, "进度控制权重", 25)),
+        "医疗权重": int(_get(weights_raw, "医疗权重", 50)),
+        "机场权重": int(_get(weights_raw, "机场权重", 50)),
+        "专业技术权重": int(_get(weights_raw, "专业技术权重", 40)),
+        "通用综合权重": int(_get(weights_raw, "通用综合权重", 40)),
+        "特色场景权重": int(_get(weights_raw, "特色场景权重", 20)),
+    }
+
+
 def load_config(path: str) -> Dict[str, Any]:
     cfg: Dict[str, Any] = {}
     if path and os.path.exists(path):
@@ -49,6 +99,7 @@ def load_config(path: str) -> Dict[str, Any]:
         j = j or {}
         judge_cfg = _build_model_config(j)
         judge_cfg["concurrency"] = _get(j, "concurrency", 2)
+        judge_cfg["batch_size"] = int(_get(j, "batch_size", 1))
         judges.append(judge_cfg)
 
     datasets_config_path = _get(cfg, "datasets_config_path", None)
@@ -57,38 +108,19 @@ def load_config(path: str) -> Dict[str, Any]:
     module_3_path = _get(cfg, "module_3_path", os.path.join(".", "data", "3特色场景"))
     en_mode = bool(_get(cfg, "en_mode", False))
     result_output_path = _get(cfg, "result_output_path", os.path.join("results"))
+    dedup = bool(_get(cfg, "dedup", False))
+    judge_cache = bool(_get(cfg, "judge_cache", True))
+    judge_ensemble = str(_get(cfg, "judge_ensemble", "full"))
+    judge_ensemble_min = int(_get(cfg, "judge_ensemble_min", 2))
+    judge_ensemble_tolerance = float(_get(cfg, "judge_ensemble_tolerance", 10.0))
+    ci_samples = int(_get(cfg, "ci_samples", 10000))
+    ci_level = float(_get(cfg, "ci_level", 0.95))
+    sampling_round_size = int(_get(cfg, "sampling_round_size", 0))
+    sampling_ci_width = float(_get(cfg, "sampling_ci_width", 5.0))
+    sampling_min_per_stratum = int(_get(cfg, "sampling_min_per_stratum", 2))
+    sampling_seed = int(_get(cfg, "sampling_seed", 0))
 
-    weights_raw = cfg.get("weights", {}) or {}
-    weights = {
-        "专业技术": {
-            "单选": int(_get(weights_raw.get("专业技术", {}) or {}, "单选", 40)),
-            "多选": int(_get(weights_raw.get("专业技术", {}) or {}, "多选", 40)),
-            "判断": int(_get(weights_raw.get("专业技术", {}) or {}, "判断", 20)),
-            "问答": int(_get(weights_raw.get("专业技术", {}) or {}, "问答", 30)),
-        },
-        "通用综合": {
-            "单选": int(_get(weights_raw.get("通用综合", {}) or {}, "单选", 40)),
-            "多选": int(_get(weights_raw.get("通用综合", {}) or {}, "多选", 40)),
-            "问答": int(_get(weights_raw.get("通用综合", {}) or {}, "问答", 20)),
-        },
-        "特色场景": {
-            "单选": int(_get(weights_raw.get("特色场景", {}) or {}, "单选", 40)),
-            "多选": int(_get(weights_raw.get("特色场景", {}) or {}, "多选", 40)),
-            "判断": int(_get(weights_raw.get("特色场景", {}) or {}, "判断", 20)),
-            "问答": int(_get(weights_raw.get("特色场景", {}) or {}, "问答", 30)),
-        },
-        "安全权重": int(_get(weights_raw, "安全权重", 50)),
-        "质量权重": int(_get(weights_raw, "质量权重", 50)),
-        "基础理论权重": int(_get(weights_raw, "基础理论权重", 25)),
-        "合同管理权重": int(_get(weights_raw, "合同管理权重", 25)),
-        "投资控制权重": int(_get(weights_raw, "投资控制权重", 25)),
-        "进度控制权重": int(_get(weights_raw, "进度控制权重", 25)),
-        "医疗权重": int(_get(weights_raw, "医疗权重", 50)),
-        "机场权重": int(_get(weights_raw, "机场权重", 50)),
-        "专业技术权重": int(_get(weights_raw, "专业技术权重", 40)),
-        "通用综合权重": int(_get(weights_raw, "通用综合权重", 40)),
-        "特色场景权重": int(_get(weights_raw, "特色场景权重", 20)),
-    }
+    weights = _build_weights(cfg.get("weights", {}))
 
     return {
         "candidate_model": candidate_model,
@@ -99,5 +131,16 @@ def load_config(path: str) -> Dict[str, Any]:
         "module_3_path": module_3_path,
         "en_mode": en_mode,
         "result_output_path": result_output_path,
+        "dedup": dedup,
+        "judge_cache": judge_cache,
+        "judge_ensemble": judge_ensemble,
+        "judge_ensemble_min": judge_ensemble_min,
+        "judge_ensemble_tolerance": judge_ensemble_tolerance,
+        "ci_samples": ci_samples,
+        "ci_level": ci_level,
+        "sampling_round_size": sampling_round_size,
+        "sampling_ci_width": sampling_ci_width,
+        "sampling_min_per_stratum": sampling_min_per_stratum,
+        "sampling_seed": sampling_seed,
         "weights": weights,
     }
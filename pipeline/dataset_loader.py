@@ -1,12 +1,19 @@
 import os
 import json
-from typing import Any, Dict, List, Optional
+import time
+import random
+from typing import Any, Dict, List, Optional, Tuple
 from collections import Counter
 from loguru import logger
+from .dataset_store import DatasetStore, get_store
+from .jsonio import load_file
+from .question import Question
 
 
 Root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 DataRoot = os.path.join(Root, "data")
+CacheRoot = os.path.join(Root, ".cache", "dataset")
+ManifestPath = os.path.join(CacheRoot, "manifest.json")
 
 
 def _read_lines(path: Optional[str]) -> List[str]:
@@ -26,66 +33,164 @@ def _list_json_files(base: str) -> List[str]:
 
 
 def _load_json(path: str) -> List[Dict[str, Any]]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _match_security(item: Dict[str, Any], parts: List[str]) -> bool:
-    if len(parts) == 1:
-        return True
-    if len(parts) >= 2 and parts[1] != "安全":
-        return False
-    if len(parts) >= 3 and str(item.get("安全类型")) != parts[2]:
-        return False
-    if len(parts) >= 4 and str(item.get("安全专项")) != parts[3]:
-        return False
-    return True
-
-
-def _match_quality(item: Dict[str, Any], parts: List[str]) -> bool:
-    if len(parts) == 1:
-        return True
-    if len(parts) >= 2 and parts[1] != "质量":
-        return False
-    if len(parts) >= 3 and str(item.get("分部工程")) != parts[2]:
-        return False
-    if len(parts) >= 4 and str(item.get("子分部工程")) != parts[3]:
-        return False
-    if len(parts) >= 5 and str(item.get("分项工程")) != parts[4]:
-        return False
-    return True
-
-
-def _match_general(item: Dict[str, Any], parts: List[str]) -> bool:
-    if len(parts) == 1:
-        return True
-    if len(parts) >= 2 and str(item.get("板块类型")) != parts[1]:
-        return False
-    return True
-
-
-def _match_special(item: Dict[str, Any], parts: List[str]) -> bool:
-    if len(parts) == 1:
-        return True
-
-    domain = str(item.get("领域"))
-    if len(parts) >= 2 and domain != parts[1]:
-        return False
-
-    if domain == "机场":
-        if len(parts) >= 3 and str(item.get("专项")) != parts[2]:
-            return False
-        return True
-
-    if len(parts) >= 3 and str(item.get("专业类别")) != parts[2]:
-        return False
-    if len(parts) >= 4 and str(item.get("专业专项")) != parts[3]:
-        return False
-    if len(parts) >= 5 and str(item.get("子专业专项")) != parts[4]:
-        return False
-    if len(parts) >= 6 and str(item.get("细分子专业")) != parts[5]:
-        return False
-    return True
+    return load_file(path)
+
+
+# 选择行首段关键字与模块的对应关系（按顺序取第一个命中的关键字）。
+_MODULE_KEYWORDS = (
+    ("专业技术", "module_1_path"),
+    ("通用综合", "module_2_path"),
+    ("特色场景", "module_3_path"),
+)
+
+
+def _selection_module(parts: List[str]) -> Optional[str]:
+    for keyword, module_key in _MODULE_KEYWORDS:
+        if keyword in parts[0]:
+            return module_key
+    return None
+
+
+def _taxonomy_path(item: Dict[str, Any], module_key: str) -> Optional[List[str]]:
+    """
+    题目在所属模块分类体系中的路径，与选择行去掉首段后的各段逐级对应：
+
+    - 专业技术：领域(安全) → 安全类型 → 安全专项；领域(质量) → 分部工程 → 子分部工程 → 分项工程；
+      其他领域的题目不属于任何选择；
+    - 通用综合：板块类型；
+    - 特色场景：领域(机场) → 专项；其他领域 → 专业类别 → 专业专项 → 子专业专项 → 细分子专业。
+    """
+    if module_key == "module_1_path":
+        domain = str(item.get("领域") or item.get("工程类别") or "")
+        if domain == "安全":
+            return [domain, str(item.get("安全类型")), str(item.get("安全专项"))]
+        if domain == "质量":
+            return [
+                domain,
+                str(item.get("分部工程")),
+                str(item.get("子分部工程")),
+                str(item.get("分项工程")),
+            ]
+        return None
+    if module_key == "module_2_path":
+        return [str(item.get("板块类型"))]
+    if module_key == "module_3_path":
+        domain = str(item.get("领域"))
+        if domain == "机场":
+            return [domain, str(item.get("专项"))]
+        return [
+            domain,
+            str(item.get("专业类别")),
+            str(item.get("专业专项")),
+            str(item.get("子专业专项")),
+            str(item.get("细分子专业")),
+        ]
+    return None
+
+
+def _selection_depth(module_key: str, levels: List[str]) -> int:
+    # 选择行比分类路径更深的部分不参与匹配（如“特色场景-机场-专项-…”只比较到专项）。
+    first = levels[0] if levels else ""
+    if module_key == "module_1_path":
+        return 4 if first == "质量" else 3
+    if module_key == "module_2_path":
+        return 1
+    return 2 if first == "机场" else 5
+
+
+def _compile_selections(selections: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    把选择行编译为按模块划分的前缀树，节点为 {"children": {...}, "sel": 选择行序号或 None}。
+
+    同一路径上可能有多个选择行终止（如“专业技术-安全”与“专业技术-安全-X”），
+    匹配时取序号最小者，与逐行检查时“第一个匹配的选择行”一致。
+    """
+    tries: Dict[str, Dict[str, Any]] = {}
+    for idx, s in enumerate(selections):
+        parts = s.get("parts", [])
+        if not parts:
+            continue
+        module_key = _selection_module(parts)
+        if module_key is None:
+            continue
+        levels = parts[1:]
+        levels = levels[: _selection_depth(module_key, levels)]
+        node = tries.setdefault(module_key, {"children": {}, "sel": None})
+        for v in levels:
+            node = node["children"].setdefault(v, {"children": {}, "sel": None})
+        if node["sel"] is None:
+            node["sel"] = idx
+    return tries
+
+
+def _match_selection(
+    tries: Dict[str, Dict[str, Any]], module_key: Optional[str], item: Dict[str, Any]
+) -> Optional[int]:
+    """沿题目的分类路径走一遍前缀树，返回第一个匹配的选择行序号。"""
+    if module_key not in tries:
+        return None
+    return _match_path(tries, module_key, _taxonomy_path(item, module_key))
+
+
+def _match_path(
+    tries: Dict[str, Dict[str, Any]], module_key: Optional[str], path: Optional[List[str]]
+) -> Optional[int]:
+    """沿分类路径走一遍前缀树，返回第一个匹配的选择行序号。"""
+    node = tries.get(module_key)
+    if node is None or path is None:
+        return None
+    best = node["sel"]
+    for v in path:
+        node = node["children"].get(v)
+        if node is None:
+            break
+        if node["sel"] is not None and (best is None or node["sel"] < best):
+            best = node["sel"]
+    return best
+
+
+def _load_manifest() -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(ManifestPath):
+        return {}
+    try:
+        data = load_file(ManifestPath)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_manifest(manifest: Dict[str, Dict[str, Any]]):
+    try:
+        os.makedirs(CacheRoot, exist_ok=True)
+        tmp = ManifestPath + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp, ManifestPath)
+    except OSError as e:
+        logger.warning(f"Failed to write dataset manifest {ManifestPath}: {e}")
+
+
+def _file_signature(fp: str) -> List[int]:
+    st = os.stat(fp)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _manifest_entry(
+    paths: List[Optional[List[str]]], module_key: str, signature: List[int]
+) -> Dict[str, Any]:
+    """文件清单：文件内出现过的各不相同的分类路径，按 mtime 与大小判断是否过期。"""
+    distinct = {}
+    for path in paths:
+        if path is not None:
+            distinct.setdefault(tuple(path), path)
+    return {"signature": signature, "module": module_key, "paths": list(distinct.values())}
+
+
+def _log_load_time(store: Any, started: float, hits: int, misses: int):
+    logger.info(
+        f"Dataset loaded in {time.perf_counter() - started:.2f}s "
+        f"(cached files: {store.hits - hits}, parsed files: {store.misses - misses})"
+    )
 
 
 def parse_selection_file(path: Optional[str]) -> List[Dict[str, Any]]:
@@ -196,63 +301,102 @@ def _build_file_rel_map(
 
 
 def load_questions(
-    selections: List[Dict[str, Any]], module_paths: Optional[Dict[str, str]] = None
-) -> List[Dict[str, Any]]:
+    selections: List[Dict[str, Any]],
+    module_paths: Optional[Dict[str, str]] = None,
+    store: Optional[DatasetStore] = None,
+) -> List[Question]:
+    """按选择行加载题目，返回的 Question 上带有来源文件 src 与相对路径 rel。"""
     module_paths = {**_default_module_paths(), **(module_paths or {})}
     module_keys = _pick_module_keys(selections)
     file_rel = _build_file_rel_map(module_paths, module_keys)
     files = sorted(file_rel.keys())
-    out: List[Dict[str, Any]] = []
+    out: List[Question] = []
+    started = time.perf_counter()
+    store = store or get_store()
+    hits, misses = store.hits, store.misses
 
     # Initialize counters for logging
     selection_stats = {id(s): Counter() for s in selections}
 
     if not selections or (len(selections) == 1 and selections[0].get("root") == "全部"):
         total_stats = Counter()
+        store.preload(files)
         for fp in files:
             try:
-                items = _load_json(fp)
+                items = store.load(fp)
             except Exception:
                 continue
             for it in items:
-                out.append({"src": fp, "rel": file_rel.get(fp), "item": it})
+                it = it.with_source(fp, file_rel.get(fp))
+                out.append(it)
                 total_stats[str(it.get("题型", "未知"))] += 1
+        store.save()
+        _log_load_time(store, started, hits, misses)
 
         final_stats = dict(total_stats)
         final_stats["总题数"] = sum(total_stats.values())
         logger.info(f"Subtask: 全部 | Stats: {final_stats}")
         return out
 
+    # 选择行编译为前缀树，每道题只需沿自身分类路径匹配一次；
+    # 只与文件所属模块下的选择行比较。
+    tries = _compile_selections(selections)
+    module_of_prefix = {v: k for k, v in _module_prefixes().items()}
+    # 文件清单记录每个文件出现过的分类路径；清单未过期且没有任何路径能匹配的文件不再解析。
+    manifest = _load_manifest()
+    manifest_dirty = False
+    parsed = 0
+    pruned = 0
+    candidates = []
     for fp in files:
+        rel = file_rel.get(fp)
+        module_key = module_of_prefix.get((rel or "").split(os.sep)[0])
+        if module_key not in tries:
+            continue
+        key = os.path.abspath(fp)
+        try:
+            signature = _file_signature(fp)
+        except OSError:
+            continue
+        entry = manifest.get(key)
+        fresh = (
+            isinstance(entry, dict)
+            and entry.get("signature") == signature
+            and entry.get("module") == module_key
+        )
+        if fresh and all(_match_path(tries, module_key, p) is None for p in entry["paths"]):
+            pruned += 1
+            continue
+        candidates.append((fp, rel, module_key, key, signature, fresh))
+
+    # 需要读取的文件先并行解析，再按文件顺序逐个匹配。
+    store.preload([c[0] for c in candidates])
+    for fp, rel, module_key, key, signature, fresh in candidates:
         try:
-            items = _load_json(fp)
+            items = store.load(fp)
+            paths = store.column(
+                fp,
+                f"taxonomy:{module_key}",
+                lambda items: [_taxonomy_path(it, module_key) for it in items],
+            )
         except Exception:
             continue
-        for it in items:
-            for s in selections:
-                parts = s.get("parts", [])
-                if not parts:
-                    continue
-                p0 = parts[0]
-                domain = str(it.get("领域") or it.get("工程类别") or "")
-
-                matched = False
-                if "专业技术" in p0:
-                    if domain == "安全" and _match_security(it, parts):
-                        matched = True
-                    elif domain == "质量" and _match_quality(it, parts):
-                        matched = True
-                elif "通用综合" in p0:
-                    if _match_general(it, parts):
-                        matched = True
-                elif "特色场景" in p0:
-                    if _match_special(it, parts):
-                        matched = True
-
-                if matched:
-                    out.append({"src": fp, "rel": file_rel.get(fp), "item": it})
-                    selection_stats[id(s)][str(it.get("题型", "未知"))] += 1
-                    break
+        parsed += 1
+        if not fresh:
+            manifest[key] = _manifest_entry(paths, module_key, signature)
+            manifest_dirty = True
+        for it, path in zip(items, paths):
+            idx = _match_path(tries, module_key, path)
+            if idx is None:
+                continue
+            out.append(it.with_source(fp, rel))
+            selection_stats[id(selections[idx])][str(it.get("题型", "未知"))] += 1
+
+    if manifest_dirty:
+        _save_manifest(manifest)
+    store.save()
+    logger.info(f"Dataset files read: {parsed}, skipped by manifest: {pruned}")
+    _log_load_time(store, started, hits, misses)
 
     for s in selections:
         parts_str = "-".join(s.get("parts", []))
@@ -265,3 +409,36 @@ def load_questions(
             logger.warning(f"Subtask: {parts_str} | No matching questions found.")
 
     return out
+
+
+def _stratum(q: Question, module_of_prefix: Dict[str, str]) -> Tuple[str, ...]:
+    # 抽样分层：题目所属模块、分类路径与题型，与评分的叶子一一对应。
+    module_key = module_of_prefix.get((q.rel or "").split(os.sep)[0]) or ""
+    path = _taxonomy_path(q, module_key) or []
+    return (module_key, *path, str(q.get("题型")))
+
+
+def stratified_order(
+    questions: List[Question], seed: int = 0, min_per_stratum: int = 1
+) -> Tuple[List[Question], List[int]]:
+    """
+    按分类体系分层的抽样顺序，返回 (重排后的题目, 各层题数)；取任意前缀即为一个分层样本。
+
+    - 层为（模块, 分类路径, 题型），与评分的叶子对应；层内题目随机排列；
+    - 每层的前 min_per_stratum 道题排在最前面（层内题目不足时取全部），
+      保证前 Σ min(min_per_stratum, 层大小) 道题覆盖所有层；
+    - 其后第 j 道题（层大小 N、随机偏移 u）按 (j + u) / N 排序，任意前缀中各层题数与层大小成比例。
+    """
+    rng = random.Random(seed)
+    module_of_prefix = {v: k for k, v in _module_prefixes().items()}
+    strata: Dict[Tuple[str, ...], List[Question]] = {}
+    for q in questions:
+        strata.setdefault(_stratum(q, module_of_prefix), []).append(q)
+    keyed: List[Tuple[int, float, float, Question]] = []
+    for members in strata.values():
+        rng.shuffle(members)
+        u = rng.random()
+        for j, q in enumerate(members):
+            keyed.append((min(j, min_per_stratum), (j + u) / len(members), rng.random(), q))
+    keyed.sort(key=lambda k: k[:3])
+    return [k[3] for k in keyed], [len(m) for m in strata.values()]
@@ -0,0 +1,181 @@
+import os
+import pickle
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+from .jsonio import loads, map_ordered, read_bytes
+from .question import Question, to_questions
+
+
+Root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+StorePath = os.path.join(Root, ".cache", "dataset", "store.pkl")
+
+# 存储格式变化时递增，旧缓存整体作废。
+_STORE_VERSION = 3
+
+_STORES: Dict[str, "DatasetStore"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+class DatasetStore:
+    """
+    已解析题目文件的二进制缓存（pickle），避免每次启动都重新解析 data/ 下的 JSON。
+
+    - 按文件绝对路径索引，每条记录保存 mtime_ns、大小、内容 sha1 与解析后的题目列表（Question）；
+    - mtime 与大小未变时直接使用缓存；变化时按内容 sha1 判断，内容相同只更新 mtime，否则重新解析；
+    - 派生列（如各题的分类路径）随记录一起缓存，记录失效时一并丢弃；
+    - 可被多个线程共享（如后台校验与题目加载），同一文件只解析一次；
+    - preload 在线程池中并行解析一批已失效的文件（JSON 解析见 jsonio）。
+    """
+
+    def __init__(self, path: str = StorePath):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+        # preload 解析、尚未被 load 取用的文件；取用时计为解析（misses）而不是命中。
+        self._preloaded: set = set()
+        self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable dataset cache {self.path}: {e}")
+            return
+        if isinstance(data, dict) and data.get("version") == _STORE_VERSION:
+            self.files = data.get("files") or {}
+
+    @staticmethod
+    def _signature(key: str) -> List[int]:
+        st = os.stat(key)
+        return [st.st_mtime_ns, st.st_size]
+
+    def _install(
+        self, key: str, signature: List[int], sha1: str, parse: Callable[[], Any]
+    ) -> Tuple[Dict[str, Any], bool]:
+        # 返回 (记录, 是否重新解析)；内容 sha1 未变时只更新 mtime 与大小。
+        entry = self.files.get(key)
+        self._dirty = True
+        if entry is not None and entry["sha1"] == sha1:
+            entry["signature"] = signature
+            return entry, False
+
+        entry = {
+            "signature": signature,
+            "sha1": sha1,
+            "items": to_questions(parse(), src=key),
+            "columns": {},
+        }
+        self.files[key] = entry
+        return entry, True
+
+    def _entry(self, fp: str, count: bool = True) -> Dict[str, Any]:
+        key = os.path.abspath(fp)
+        signature = self._signature(key)
+        entry = self.files.get(key)
+        if entry is not None and entry["signature"] == signature:
+            if key in self._preloaded:
+                self._preloaded.discard(key)
+                self.misses += 1
+            else:
+                self.hits += int(count)
+            return entry
+
+        raw = read_bytes(key)
+        sha1 = hashlib.sha1(raw).hexdigest()
+        entry, parsed = self._install(key, signature, sha1, lambda: loads(raw))
+        if parsed:
+            self.misses += 1
+        else:
+            self.hits += int(count)
+        return entry
+
+    def preload(self, paths: Sequence[str], workers: Optional[int] = None):
+        """
+        并行读取并解析 paths 中缓存已失效的文件，之后的 load/column 直接命中。
+
+        读取或解析失败的文件保持原状，由随后的 load 按顺序抛出异常。
+        """
+        with self._lock:
+            stale: List[Tuple[str, List[int]]] = []
+            for fp in paths:
+                key = os.path.abspath(fp)
+                try:
+                    signature = self._signature(key)
+                except OSError:
+                    continue
+                entry = self.files.get(key)
+                if entry is None or entry["signature"] != signature:
+                    stale.append((key, signature))
+            if not stale:
+                return
+
+            def read(job: Tuple[str, List[int]]) -> Optional[Tuple[str, Any]]:
+                try:
+                    raw = read_bytes(job[0])
+                    return hashlib.sha1(raw).hexdigest(), loads(raw)
+                except Exception:
+                    return None
+
+            for (key, signature), res in zip(stale, map_ordered(read, stale, workers=workers)):
+                if res is None:
+                    continue
+                sha1, data = res
+                _entry, parsed = self._install(key, signature, sha1, lambda: data)
+                if parsed:
+                    self._preloaded.add(key)
+
+    def load(self, fp: str) -> List[Question]:
+        """文件中的题目（跳过非 dict 元素）；读取或解析失败时抛出与 json.load 相同的异常。"""
+        with self._lock:
+            return self._entry(fp)["items"]
+
+    def column(
+        self, fp: str, name: str, build: Callable[[List[Question]], Any]
+    ) -> Any:
+        """返回文件的派生列 name，不存在时由 build(items) 生成并缓存。"""
+        with self._lock:
+            entry = self._entry(fp, count=False)
+            if name not in entry["columns"]:
+                entry["columns"][name] = build(entry["items"])
+                self._dirty = True
+            return entry["columns"][name]
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(
+                    {"version": _STORE_VERSION, "files": self.files},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Failed to write dataset cache {self.path}: {e}")
+
+
+def get_store(path: Optional[str] = None) -> DatasetStore:
+    """同一进程内共享一个 DatasetStore，使校验与加载只读取一次缓存。"""
+    path = path or StorePath
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = DatasetStore(path)
+            _STORES[path] = store
+        return store
@@ -0,0 +1,180 @@
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+from loguru import logger
+
+
+# MinHash 签名长度与 LSH 分带：16 带 × 4 行，候选阈值约为 (1/16)^(1/4) ≈ 0.5，
+# 候选对再按签名估计的 Jaccard 相似度过滤。
+_NUM_PERM = 64
+_BANDS = 16
+_SHINGLE = 3
+_SEED = 20240601
+_MASK = np.uint64(0xFFFFFFFF)
+
+# 归一化时去掉空白与常见中英文标点，避免排版差异影响相似度。
+_NORMALIZE_RE = re.compile(r"[\s，。、；：？！“”‘’（）《》【】,.;:?!\"'()\[\]<>]+")
+
+
+def normalize_question(text: Any) -> str:
+    return _NORMALIZE_RE.sub("", str(text or ""))
+
+
+def exact_key(item: Any) -> Tuple[str, str]:
+    """完全重复的判定键：题型与题干相同即提示词相同，模型回答可以共用。"""
+    return str(item.get("题型")), str(item.get("问题"))
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    # 中文按字符 k-gram 切分；过短的文本整体作为一个 shingle。
+    if len(text) <= _SHINGLE:
+        grams = {text}
+    else:
+        grams = {text[i : i + _SHINGLE] for i in range(len(text) - _SHINGLE + 1)}
+    return np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)
+    )
+
+
+def minhash_signatures(texts: Sequence[str]) -> np.ndarray:
+    """返回 (len(texts), _NUM_PERM) 的 MinHash 签名矩阵，按置换逐列向量化计算。"""
+    shingles = [_shingle_hashes(t) for t in texts]
+    lengths = np.array([len(s) for s in shingles], dtype=np.int64)
+    flat = np.concatenate(shingles) if shingles else np.zeros(0, dtype=np.uint64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+    rng = np.random.default_rng(_SEED)
+    a = rng.integers(1, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+    sig = np.empty((len(texts), _NUM_PERM), dtype=np.uint32)
+    for p in range(_NUM_PERM):
+        hashed = (a[p] * flat + b[p]) & _MASK
+        sig[:, p] = np.minimum.reduceat(hashed, starts) if len(flat) else 0
+    return sig
+
+
+def _candidate_pairs(sig: np.ndarray) -> set:
+    rows = _NUM_PERM // _BANDS
+    pairs: set = set()
+    for band in range(_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        chunk = np.ascontiguousarray(sig[:, band * rows : (band + 1) * rows])
+        for i in range(len(sig)):
+            buckets.setdefault(chunk[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def find_duplicate_clusters(
+    items: Sequence[Any], threshold: float = 0.8
+) -> List[Dict[str, Any]]:
+    """
+    按“问题”文本查找近似重复的题目簇（MinHash + LSH）。
+
+    - 每个簇给出成员下标 members、成员间签名估计的最小相似度 min_similarity，
+      以及 exact（所有成员题型与题干完全相同，可共用一次模型调用）；
+    - 簇按大小降序排列，单个题目不构成簇。
+    """
+    texts = [normalize_question(it.get("问题")) for it in items]
+    sig = minhash_signatures(texts)
+
+    parent = list(range(len(items)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    sims: Dict[Tuple[int, int], float] = {}
+    for i, j in _candidate_pairs(sig):
+        sim = float(np.mean(sig[i] == sig[j]))
+        if sim >= threshold:
+            sims[(i, j)] = sim
+            parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+
+    clusters: List[Dict[str, Any]] = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        member_set = set(members)
+        edge = [s for (i, j), s in sims.items() if i in member_set]
+        keys = {exact_key(items[i]) for i in members}
+        clusters.append(
+            {
+                "members": members,
+                "min_similarity": round(min(edge), 3) if edge else 1.0,
+                "exact": len(keys) == 1,
+            }
+        )
+    clusters.sort(key=lambda c: len(c["members"]), reverse=True)
+    return clusters
+
+
+def exact_duplicate_groups(items: Sequence[Any]) -> Dict[Tuple[str, str], List[int]]:
+    """按 exact_key 分组，只返回包含多道题目的组（首个下标为代表题）。"""
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for i, it in enumerate(items):
+        groups.setdefault(exact_key(it), []).append(i)
+    return {k: v for k, v in groups.items() if len(v) > 1}
+
+
+def duplicate_report(items: Sequence[Any], threshold: float = 0.8) -> Dict[str, Any]:
+    """近似重复簇与完全重复组的汇总，题目以 rel/id/题型/问题 表示。"""
+    started = time.perf_counter()
+    clusters = find_duplicate_clusters(items, threshold=threshold)
+    elapsed = time.perf_counter() - started
+    exact = exact_duplicate_groups(items)
+
+    def ref(i: int) -> Dict[str, Any]:
+        it = items[i]
+        return {
+            "rel": getattr(it, "rel", None),
+            "id": it.get("id"),
+            "题型": it.get("题型"),
+            "问题": str(it.get("问题") or "")[:120],
+        }
+
+    report = {
+        "items": len(items),
+        "threshold": threshold,
+        "seconds": round(elapsed, 3),
+        "near_duplicate_clusters": len(clusters),
+        "near_duplicate_items": sum(len(c["members"]) for c in clusters),
+        "exact_duplicate_groups": len(exact),
+        "calls_saved_by_exact_dedup": sum(len(v) - 1 for v in exact.values()),
+        "clusters": [
+            {**c, "members": [ref(i) for i in c["members"]]} for c in clusters
+        ],
+    }
+    logger.info(
+        f"Duplicates: {report['near_duplicate_clusters']} near-duplicate clusters "
+        f"({report['near_duplicate_items']} questions, threshold {threshold}), "
+        f"{report['exact_duplicate_groups']} exact groups "
+        f"({report['calls_saved_by_exact_dedup']} calls saved by dedup) in {elapsed:.2f}s"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    # 对全部题目生成重复报告：python -m pipeline.dedup [输出路径] [阈值]
+    import sys
+    import json
+    from pipeline.dataset_loader import load_questions
+
+    out_path = sys.argv[1] if len(sys.argv) > 1 else "duplicates.json"
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.8
+    report = duplicate_report(load_questions([{"root": "全部"}]), threshold=threshold)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(out_path)
@@ -1,27 +1,225 @@
 import os
 import json
 import asyncio
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 from tqdm import tqdm
-from .llm import async_retry_llm
-from .prompt import format_question_prompt, format_summary_prompt
+from .jsonio import load_file
+from .llm import _cached_tokens, async_retry_llm
+from .prompt import (
+    format_question_messages,
+    format_question_prompt,
+    format_summary_prompt,
+)
+from .dedup import exact_key
+from .question import Question
+from .scheduler import (
+    CostModel,
+    LaneScheduler,
+    LatencyModel,
+    ScheduleLog,
+    load_history,
+    order_by_cost,
+    save_history,
+)
+
+T = TypeVar("T")
 
 
 def _build_prompt(item: Dict[str, Any], en_mode: bool) -> str:
     return format_question_prompt(item, en_mode=en_mode)
 
 
+def _build_request(
+    item: Dict[str, Any], model_cfg: Dict[str, Any], en_mode: bool
+) -> Tuple[str, Optional[List[Dict[str, str]]], int]:
+    # 每道题只构建一次请求：(提示词, 实际发送的消息, 发送内容字符数)。
+    # 开启 prefix_cache_layout 时消息拆为 system/user，否则为 None（直接发送提示词）；
+    # 字符数按实际发送的内容计算，供耗时预估、token 预算准入与学习共用。
+    prompt = _build_prompt(item, en_mode=en_mode)
+    if not model_cfg.get("prefix_cache_layout"):
+        return prompt, None, len(prompt)
+    messages = format_question_messages(item, en_mode=en_mode)
+    return prompt, messages, sum(len(m["content"]) for m in messages)
+
+
 def _empty_usage() -> Dict[str, int]:
-    return {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0}
+    return {
+        "completion_tokens": 0,
+        "prompt_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+    }
 
 
 def _merge_usage(base: Dict[str, int], extra: Dict[str, Any]) -> Dict[str, int]:
     base["completion_tokens"] += int((extra or {}).get("completion_tokens", 0) or 0)
     base["prompt_tokens"] += int((extra or {}).get("prompt_tokens", 0) or 0)
     base["total_tokens"] += int((extra or {}).get("total_tokens", 0) or 0)
+    base["cached_tokens"] += int((extra or {}).get("cached_tokens", 0) or 0)
     return base
 
 
+def _merge_replica(
+    stats: Dict[str, Dict[str, Any]], replica: Any, latency: Any, usage: Any
+) -> Dict[str, Dict[str, Any]]:
+    # 按推理副本汇总调用次数、生成 token 数与累计耗时，用于统计各副本吞吐。
+    if not replica:
+        return stats
+    st = stats.setdefault(
+        str(replica), {"calls": 0, "completion_tokens": 0, "latency": 0.0}
+    )
+    st["calls"] += 1
+    st["completion_tokens"] += int((usage or {}).get("completion_tokens", 0) or 0)
+    st["latency"] += float(latency or 0.0)
+    return stats
+
+
+def _merge_record_replicas(stats: Dict[str, Dict[str, Any]], rec: Any):
+    if not isinstance(rec, dict):
+        return
+    contents = rec.get("heavy_think_content")
+    if isinstance(contents, list):
+        details = (rec.get("usage_details") or {}).get("candidate_model") or []
+        for k, c in enumerate(contents):
+            if isinstance(c, dict):
+                u = details[k] if k < len(details) else {}
+                _merge_replica(stats, c.get("replica"), c.get("latency"), u)
+        _merge_replica(
+            stats, rec.get("replica"), rec.get("latency"), rec.get("summary_usage")
+        )
+        return
+    _merge_replica(stats, rec.get("replica"), rec.get("latency"), rec.get("usage"))
+
+
+def _observe_call(model: LatencyModel, qtype: str, chars: int, latency: Any, usage: Any):
+    model.cost_model.observe(qtype, chars, usage)
+    model.observe(qtype, chars, latency, usage)
+
+
+def _observe_record(
+    cand_model: LatencyModel, summary_model: LatencyModel, rec: Any
+):
+    # 用已有结果中的 usage 与 latency 学习各题型的期望 token 开销与耗时
+    # （用于 token 预算准入与“最长预计耗时优先”排序）。
+    if not isinstance(rec, dict):
+        return
+    qtype = str(rec.get("题型"))
+    contents = rec.get("heavy_think_content")
+    if isinstance(contents, list):
+        details = (rec.get("usage_details") or {}).get("candidate_model") or []
+        for k, c in enumerate(contents):
+            if isinstance(c, dict) and k < len(details):
+                _observe_call(
+                    cand_model,
+                    qtype,
+                    len(c.get("提示词") or ""),
+                    c.get("latency"),
+                    details[k],
+                )
+        _observe_call(
+            summary_model,
+            qtype,
+            len(rec.get("提示词") or ""),
+            rec.get("latency"),
+            rec.get("summary_usage"),
+        )
+        return
+    _observe_call(
+        cand_model, qtype, len(rec.get("提示词") or ""), rec.get("latency"), rec.get("usage")
+    )
+
+
+def _load_existing(out_path: str) -> Any:
+    if not os.path.exists(out_path) or os.path.getsize(out_path) <= 0:
+        return None
+    try:
+        return load_file(out_path)
+    except Exception:
+        return None
+
+
+def _reuse_records(
+    existing: Any,
+    items: List[Question],
+    valid: Optional[Callable[[Dict[str, Any], Any], bool]] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    # 分轮抽样时结果文件只含此前各轮评测过的题目：按 (id, 题型, 题干) 对应到本次的题目，
+    # 已有（且通过 valid 校验的）结果直接复用，其余位置为 None，需要评测。
+    by_key: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+    if isinstance(existing, list):
+        for rec in existing:
+            if isinstance(rec, dict):
+                by_key.setdefault((str(rec.get("id")),) + exact_key(rec), []).append(rec)
+    out: List[Optional[Dict[str, Any]]] = []
+    for it in items:
+        recs = by_key.get((str(it.get("id")),) + exact_key(it))
+        rec = recs.pop(0) if recs else None
+        if rec is not None and valid is not None and not valid(rec, it):
+            rec = None
+        out.append(rec)
+    return out
+
+
+def _template_of(item: Dict[str, Any], model_cfg: Dict[str, Any]) -> Any:
+    # 开启 prefix_cache_layout 时按题型（即提示词模板）分组发送，
+    # 使相同 system 前缀的请求集中到达服务端，提高前缀缓存命中率。
+    if model_cfg.get("prefix_cache_layout"):
+        return str(item.get("题型"))
+    return None
+
+
+def _split_duplicates(
+    entries: List[T], item_of: Callable[[T], Any]
+) -> Tuple[List[T], Dict[Tuple[str, str], List[T]]]:
+    # 完全重复（题型与题干相同，即提示词相同）的题目只保留第一道作为代表题调用模型，
+    # 其余按 exact_key 挂在代表题下，结果由 _fan_out 复制。
+    reps: List[T] = []
+    followers: Dict[Tuple[str, str], List[T]] = {}
+    seen = set()
+    for e in entries:
+        key = exact_key(item_of(e))
+        if key in seen:
+            followers.setdefault(key, []).append(e)
+        else:
+            seen.add(key)
+            reps.append(e)
+    return reps, followers
+
+
+def _fan_out(res: Dict[str, Any], rep: Any, rep_rel: str, item: Any) -> Dict[str, Any]:
+    # 复制代表题的模型输出到重复题：保留本题自身字段，token 用量记为 0 以免重复统计，
+    # 并去掉副本与耗时信息（不是一次真实调用）。
+    out = item.to_dict() if isinstance(item, Question) else dict(item)
+    for k, v in res.items():
+        if k not in rep and k not in ("replica", "latency"):
+            out[k] = v
+    if isinstance(out.get("heavy_think_content"), list):
+        out["heavy_think_content"] = [
+            {k: v for k, v in c.items() if k not in ("replica", "latency")}
+            for c in out["heavy_think_content"]
+        ]
+    for k in ("usage", "candidate_usage", "summary_usage"):
+        if k in out:
+            out[k] = _empty_usage()
+    details = out.get("usage_details")
+    if isinstance(details, dict):
+        out["usage_details"] = {
+            "candidate_model": [
+                {**d, **_empty_usage()} for d in details.get("candidate_model") or []
+            ],
+            "summary_model": {**(details.get("summary_model") or {}), **_empty_usage()},
+        }
+    out["dedup_of"] = {"rel": rep_rel, "id": rep.get("id")}
+    return out
+
+
+def _lane_of(item: Dict[str, Any], model_cfg: Dict[str, Any]) -> str:
+    # 配置了 lane_weights 时按题型分通道，否则所有题目共用一个通道（等价于单一信号量）。
+    if model_cfg.get("lane_weights"):
+        return str(item.get("题型"))
+    return "全部"
+
+
 def _safe_rel(rel: str) -> str:
     rel = (rel or "").replace("\\", os.sep)
     rel = os.path.normpath(rel)
@@ -39,9 +237,16 @@ async def _eval_one(
     model_cfg: Dict[str, Any],
     en_mode: bool,
     prompt_override: str = None,
+    token_cost: int = 0,
+    request: Optional[Tuple[str, Optional[List[Dict[str, str]]], int]] = None,
 ) -> Dict[str, Any]:
-    prompt = prompt_override if prompt_override else _build_prompt(item, en_mode=en_mode)
+    # request 为调用方已构建的 _build_request 结果，避免重复构建提示词。
+    if prompt_override:
+        prompt, messages = prompt_override, None
+    else:
+        prompt, messages, _chars = request or _build_request(item, model_cfg, en_mode)
 
+    call_info: Dict[str, Any] = {}
     r, c, u = await async_retry_llm(
         api_key=model_cfg.get("api_key"),
         base_url=model_cfg.get("base_url"),
@@ -55,13 +260,22 @@ async def _eval_one(
         stream=bool(model_cfg.get("stream", True)),
         max_retries=model_cfg.get("max_retries") or 3,
         timeout=model_cfg.get("timeout") or 60.0,
+        routing=model_cfg.get("routing") or "least_outstanding",
+        call_info=call_info,
+        messages=messages,
+        token_cost=token_cost,
+        max_inflight_tokens=model_cfg.get("max_inflight_tokens"),
     )
     r = r or ""
     c = c or ""
-    out = dict(item)
+    out = item.to_dict() if isinstance(item, Question) else dict(item)
     out["提示词"] = prompt
     out["思考过程"] = r
     out["模型回答"] = c
+    if isinstance(model_cfg.get("base_url"), list) and call_info.get("replica"):
+        out["replica"] = call_info["replica"]
+    if "latency" in call_info:
+        out["latency"] = round(call_info["latency"], 3)
 
     usage_dict = _empty_usage()
     if u:
@@ -71,6 +285,7 @@ async def _eval_one(
                 "completion_tokens": u.completion_tokens,
                 "prompt_tokens": u.prompt_tokens,
                 "total_tokens": u.total_tokens,
+                "cached_tokens": _cached_tokens(u),
             },
         )
     out["usage"] = usage_dict
@@ -79,20 +294,24 @@ async def _eval_one(
 
 
 async def evaluate(
-    questions: List[Dict[str, Any]],
+    questions: List[Question],
     model_cfg: Dict[str, Any],
     result_root: str,
     en_mode: bool = False,
+    dedup: bool = False,
+    resume_items: bool = False,
 ) -> Tuple[List[str], Dict[str, Any]]:
+    # resume_items=True 时（分轮抽样）已有结果文件不再整体跳过：逐题复用已有结果，
+    # 只评测缺失的题目，完成后按本次的题目重写该文件。
     os.makedirs(result_root, exist_ok=True)
-    groups: Dict[str, List[Dict[str, Any]]] = {}
-    for rec in questions:
+    groups: Dict[str, List[Question]] = {}
+    for q in questions:
         rel = (
-            _safe_rel(rec.get("rel") or "")
-            if rec.get("rel")
-            else _safe_rel(os.path.basename(rec.get("src") or "unknown.json"))
+            _safe_rel(q.rel or "")
+            if q.rel
+            else _safe_rel(os.path.basename(q.src or "unknown.json"))
         )
-        groups.setdefault(rel, []).append(rec["item"])
+        groups.setdefault(rel, []).append(q)
 
     is_heavy = bool(model_cfg.get("heavy_think", False))
     h_think_times = max(1, int(model_cfg.get("h_think_times") or 1))
@@ -100,51 +319,137 @@ async def evaluate(
     if is_heavy and not summary_cfg:
         summary_cfg = model_cfg
 
+    # token 预算准入：每次调用的期望 token 数传给 async_retry_llm，按端点（每个副本）限制在途总量
+    # （未配置 max_inflight_tokens 时不限制）。
+    cand_cost = CostModel(model_cfg.get("max_tokens") or 32768)
+    summary_cost = (
+        CostModel((summary_cfg or {}).get("max_tokens") or 32768)
+        if summary_cfg is not model_cfg
+        else cand_cost
+    )
+
+    # 按历史耗时估计每次调用的开销，用于“最长预计耗时优先”排序：
+    # 先用该模型以往运行的统计（见 scheduler.HistoryPath）初始化，再叠加本结果目录中已有的记录。
+    policy = str(model_cfg.get("schedule_order") or "longest_first")
+    cand_latency = LatencyModel(cand_cost)
+    summary_latency = (
+        LatencyModel(summary_cost) if summary_cost is not cand_cost else cand_latency
+    )
+    cand_key = str(model_cfg.get("model_name"))
+    summary_key = str((summary_cfg or {}).get("model_name"))
+    load_history(cand_key, cand_latency)
+    if summary_latency is not cand_latency:
+        load_history(summary_key, summary_latency)
+
     if not is_heavy:
-        sem = asyncio.Semaphore(int(model_cfg.get("concurrency") or 4))
+        lanes = LaneScheduler(
+            int(model_cfg.get("concurrency") or 4), model_cfg.get("lane_weights")
+        )
         total_items = len(questions)
         pbar = tqdm(total=total_items, desc="Evaluating", unit="q")
         total_usage = _empty_usage()
+        replicas: Dict[str, Dict[str, Any]] = {}
+
+        paths: List[str] = []
+        pending: List[Tuple[str, int, Dict[str, Any]]] = []
+        results_by_rel: Dict[str, List[Any]] = {}
+        remaining: Dict[str, int] = {}
 
-        async def run_group(rel: str, items: List[Dict[str, Any]]):
+        for rel, items in groups.items():
             out_path = os.path.join(result_root, "raw", rel)
-            if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
-                try:
-                    with open(out_path, "r", encoding="utf-8") as f:
-                        existing_results = json.load(f)
-                    if isinstance(existing_results, list) and len(existing_results) > 0:
-                        print(
-                            f"Skipping {rel}, already done ({len(existing_results)} items)."
-                        )
-                        pbar.update(len(items))
-                        for x in existing_results:
-                            if isinstance(x, dict):
-                                _merge_usage(total_usage, x.get("usage", {}))
-                        return out_path
-                except Exception:
-                    pass
-
-            async def run_item(it: Dict[str, Any]):
-                async with sem:
-                    res = await _eval_one(it, model_cfg, en_mode=en_mode)
-                pbar.update(1)
-                return res
-
-            tasks = [run_item(it) for it in items]
-            results = await asyncio.gather(*tasks)
-
-            for res in results:
-                _merge_usage(total_usage, res.get("usage", {}))
-
-            os.makedirs(os.path.dirname(out_path), exist_ok=True)
-            with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-            return out_path
-
-        tasks = [run_group(rel, items) for rel, items in groups.items()]
-        paths = await asyncio.gather(*tasks)
+            paths.append(out_path)
+            existing_results = _load_existing(out_path)
+            if resume_items:
+                reused = _reuse_records(existing_results, items)
+                missing = [idx for idx, x in enumerate(reused) if x is None]
+                pbar.update(len(items) - len(missing))
+                for x in reused:
+                    if x is not None:
+                        _merge_usage(total_usage, x.get("usage", {}))
+                        _merge_record_replicas(replicas, x)
+                        _observe_record(cand_latency, summary_latency, x)
+                if missing:
+                    results_by_rel[rel] = reused
+                    remaining[rel] = len(missing)
+                    pending.extend((rel, idx, items[idx]) for idx in missing)
+                continue
+            if isinstance(existing_results, list) and len(existing_results) > 0:
+                print(f"Skipping {rel}, already done ({len(existing_results)} items).")
+                pbar.update(len(items))
+                for x in existing_results:
+                    if isinstance(x, dict):
+                        _merge_usage(total_usage, x.get("usage", {}))
+                        _merge_record_replicas(replicas, x)
+                        _observe_record(cand_latency, summary_latency, x)
+                continue
+            results_by_rel[rel] = [None for _ in items]
+            remaining[rel] = len(items)
+            pending.extend((rel, idx, it) for idx, it in enumerate(items))
+
+        followers: Dict[Tuple[str, str], List[Tuple[str, int, Any]]] = {}
+        if dedup:
+            pending, followers = _split_duplicates(pending, lambda e: e[2])
+            n_dup = sum(len(v) for v in followers.values())
+            if n_dup:
+                print(f"Dedup: {n_dup} duplicate questions reuse {len(followers)} answers.")
+
+        def finish(rel: str, idx: int, res: Dict[str, Any]):
+            # 某个来源文件的题目全部完成后立即落盘，便于中断后续跑。
+            pbar.update(1)
+            results_by_rel[rel][idx] = res
+            remaining[rel] -= 1
+            if remaining[rel] == 0:
+                out_path = os.path.join(result_root, "raw", rel)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                with open(out_path, "w", encoding="utf-8") as f:
+                    json.dump(results_by_rel[rel], f, ensure_ascii=False, indent=2)
+
+        requests = {
+            (rel, idx): _build_request(it, model_cfg, en_mode) for rel, idx, it in pending
+        }
+
+        async def run_item(rel: str, idx: int, it: Dict[str, Any]):
+            request = requests[(rel, idx)]
+            cost = cand_cost.expected(str(it.get("题型")), request[2])
+            async with lanes.slot(_lane_of(it, model_cfg)):
+                res = await _eval_one(
+                    it, model_cfg, en_mode=en_mode, token_cost=cost, request=request
+                )
+            _observe_record(cand_latency, summary_latency, res)
+            _merge_usage(total_usage, res.get("usage", {}))
+            _merge_record_replicas(replicas, res)
+            finish(rel, idx, res)
+            for f_rel, f_idx, f_it in followers.get(exact_key(it), ()):
+                finish(f_rel, f_idx, _fan_out(res, it, rel, f_it))
+
+        # 预计耗时最长的题目先开始，缩短整轮测评的尾部。
+        est = {
+            (rel, idx): cand_latency.estimate(str(it.get("题型")), requests[(rel, idx)][2])
+            for rel, idx, it in pending
+        }
+        ordered = order_by_cost(
+            pending,
+            lambda e: est[(e[0], e[1])],
+            policy,
+            group_fn=lambda e: _template_of(e[2], model_cfg),
+        )
+        sched = ScheduleLog(
+            "evaluate",
+            policy,
+            [est[(e[0], e[1])] for e in ordered],
+            lanes.total,
+            history=cand_latency.has_history(),
+        )
+        await asyncio.gather(*[run_item(rel, idx, it) for rel, idx, it in ordered])
+        if ordered:
+            sched.finish()
+            save_history(cand_key, cand_latency)
         pbar.close()
-        return list(paths), total_usage
+        if replicas:
+            total_usage["replicas"] = replicas
+        if model_cfg.get("lane_weights"):
+            total_usage["lanes"] = {"evaluate": lanes.stats()}
+        return paths, total_usage
 
     def is_valid_heavy_record(x: Any, it: Dict[str, Any]) -> bool:
         if not isinstance(x, dict):
@@ -183,6 +488,7 @@ async def evaluate(
     total_usage: Dict[str, Any] = _empty_usage()
     total_usage["candidate_usage"] = _empty_usage()
     total_usage["summary_usage"] = _empty_usage()
+    replicas: Dict[str, Dict[str, Any]] = {}
 
     to_run: List[Dict[str, Any]] = []
     results_by_rel: Dict[str, List[Any]] = {}
@@ -192,27 +498,43 @@ async def evaluate(
         out_path = os.path.join(result_root, "raw", rel)
         paths.append(out_path)
         results_by_rel[rel] = [None for _ in items]
-        if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
-            try:
-                with open(out_path, "r", encoding="utf-8") as f:
-                    existing = json.load(f)
-                if is_valid_heavy_file(existing, items):
-                    for idx, rec in enumerate(existing):
-                        results_by_rel[rel][idx] = rec
-                        _merge_usage(total_usage, rec.get("usage", {}))
-                        _merge_usage(total_usage["candidate_usage"], rec.get("candidate_usage", {}))
-                        _merge_usage(total_usage["summary_usage"], rec.get("summary_usage", {}))
-                    continue
-            except Exception:
-                pass
-
-        for idx, it in enumerate(items):
-            to_run.append({"rel": rel, "idx": idx, "item": it})
+        existing = _load_existing(out_path)
+        if resume_items:
+            reused = _reuse_records(existing, items, is_valid_heavy_record)
+        elif is_valid_heavy_file(existing, items):
+            reused = existing
+        else:
+            reused = [None for _ in items]
+        for idx, rec in enumerate(reused):
+            if rec is None:
+                to_run.append({"rel": rel, "idx": idx, "item": items[idx]})
+                continue
+            results_by_rel[rel][idx] = rec
+            _merge_usage(total_usage, rec.get("usage", {}))
+            _merge_usage(total_usage["candidate_usage"], rec.get("candidate_usage", {}))
+            _merge_usage(total_usage["summary_usage"], rec.get("summary_usage", {}))
+            _merge_record_replicas(replicas, rec)
+            _observe_record(cand_latency, summary_latency, rec)
+
+    heavy_followers: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    if dedup:
+        to_run, heavy_followers = _split_duplicates(to_run, lambda e: e["item"])
+        n_dup = sum(len(v) for v in heavy_followers.values())
+        if n_dup:
+            print(
+                f"Dedup: {n_dup} duplicate questions reuse "
+                f"{len(heavy_followers)} answers."
+            )
+    item_of = {(e["rel"], e["idx"]): e["item"] for e in to_run}
 
     if not to_run:
+        if replicas:
+            total_usage["replicas"] = replicas
         return paths, total_usage
 
-    cand_sem = asyncio.Semaphore(int(model_cfg.get("concurrency") or 4))
+    cand_lanes = LaneScheduler(
+        int(model_cfg.get("concurrency") or 4), model_cfg.get("lane_weights")
+    )
     pbar1 = tqdm(
         total=len(to_run) * h_think_times,
         desc="Evaluating Round-1 Candidate",
@@ -223,48 +545,117 @@ async def evaluate(
     for e in to_run:
         stage1_map[(e["rel"], e["idx"])] = [None for _ in range(h_think_times)]
 
+    # 同一道题的 h_think_times 次候选调用共用一次构建的请求。
+    cand_requests = {
+        (e["rel"], e["idx"]): _build_request(e["item"], model_cfg, en_mode) for e in to_run
+    }
+
     async def run_candidate(rel: str, idx: int, it: Dict[str, Any], k: int):
-        async with cand_sem:
-            res = await _eval_one(it, model_cfg, en_mode=en_mode)
+        request = cand_requests[(rel, idx)]
+        qtype = str(it.get("题型"))
+        cost = cand_cost.expected(qtype, request[2])
+        async with cand_lanes.slot(_lane_of(it, model_cfg)):
+            res = await _eval_one(
+                it, model_cfg, en_mode=en_mode, token_cost=cost, request=request
+            )
+        _observe_call(cand_latency, qtype, request[2], res.get("latency"), res.get("usage"))
         pbar1.update(1)
         return rel, idx, k, res
 
+    cand_est = {
+        (e["rel"], e["idx"]): cand_latency.estimate(
+            str(e["item"].get("题型")), cand_requests[(e["rel"], e["idx"])][2]
+        )
+        for e in to_run
+    }
+    cand_order = order_by_cost(
+        [(e, k) for e in to_run for k in range(h_think_times)],
+        lambda x: cand_est[(x[0]["rel"], x[0]["idx"])],
+        policy,
+        group_fn=lambda x: _template_of(x[0]["item"], model_cfg),
+    )
+    sched1 = ScheduleLog(
+        "heavy_think round1",
+        policy,
+        [cand_est[(e["rel"], e["idx"])] for e, _k in cand_order],
+        cand_lanes.total,
+        history=cand_latency.has_history(),
+    )
     cand_tasks = [
         asyncio.create_task(run_candidate(e["rel"], e["idx"], e["item"], k))
-        for e in to_run
-        for k in range(h_think_times)
+        for e, k in cand_order
     ]
     cand_results = await asyncio.gather(*cand_tasks)
     for rel, idx, k, res in cand_results:
         stage1_map[(rel, idx)][k] = res
 
     pbar1.close()
-
-    summary_sem = asyncio.Semaphore(
-        int((summary_cfg or {}).get("concurrency") or model_cfg.get("concurrency") or 4)
+    sched1.finish()
+
+    summary_lane_cfg = {
+        "lane_weights": (summary_cfg or {}).get("lane_weights")
+        or model_cfg.get("lane_weights")
+    }
+    summary_lanes = LaneScheduler(
+        int((summary_cfg or {}).get("concurrency") or model_cfg.get("concurrency") or 4),
+        summary_lane_cfg["lane_weights"],
     )
     pbar2 = tqdm(total=len(to_run), desc="Evaluating Round-2 Summary", unit="call")
 
-    async def run_summary(rel: str, idx: int, it: Dict[str, Any]):
-        stage1_results = stage1_map[(rel, idx)]
+    summary_prompts: Dict[Tuple[str, int], str] = {}
+    for e in to_run:
         candidate_answers = []
-        for r in stage1_results:
+        for r in stage1_map[(e["rel"], e["idx"])]:
             if not isinstance(r, dict):
                 continue
             think = str((r or {}).get("思考过程", "") or "").strip()
             ans = str((r or {}).get("模型回答", "") or "").strip()
             candidate_answers.append((think + "\n" + ans).strip())
-        summary_prompt = format_summary_prompt(it, candidate_answers, en_mode=en_mode)
-        async with summary_sem:
-            res = await _eval_one(it, summary_cfg, en_mode=en_mode, prompt_override=summary_prompt)
+        summary_prompts[(e["rel"], e["idx"])] = format_summary_prompt(
+            e["item"], candidate_answers, en_mode=en_mode
+        )
+
+    async def run_summary(rel: str, idx: int, it: Dict[str, Any]):
+        summary_prompt = summary_prompts[(rel, idx)]
+        qtype = str(it.get("题型"))
+        cost = summary_cost.expected(qtype, len(summary_prompt))
+        async with summary_lanes.slot(_lane_of(it, summary_lane_cfg)):
+            res = await _eval_one(
+                it,
+                summary_cfg,
+                en_mode=en_mode,
+                prompt_override=summary_prompt,
+                token_cost=cost,
+            )
+        _observe_call(
+            summary_latency, qtype, len(summary_prompt), res.get("latency"), res.get("usage")
+        )
         pbar2.update(1)
         return rel, idx, res
 
+    sum_est = {
+        (e["rel"], e["idx"]): summary_latency.estimate(
+            str(e["item"].get("题型")), len(summary_prompts[(e["rel"], e["idx"])])
+        )
+        for e in to_run
+    }
+    sum_order = order_by_cost(to_run, lambda e: sum_est[(e["rel"], e["idx"])], policy)
+    sched2 = ScheduleLog(
+        "heavy_think round2",
+        policy,
+        [sum_est[(e["rel"], e["idx"])] for e in sum_order],
+        summary_lanes.total,
+        history=summary_latency.has_history(),
+    )
     sum_tasks = [
-        asyncio.create_task(run_summary(e["rel"], e["idx"], e["item"])) for e in to_run
+        asyncio.create_task(run_summary(e["rel"], e["idx"], e["item"])) for e in sum_order
     ]
     sum_results = await asyncio.gather(*sum_tasks)
     pbar2.close()
+    sched2.finish()
+    save_history(cand_key, cand_latency)
+    if summary_latency is not cand_latency:
+        save_history(summary_key, summary_latency)
 
     for rel, idx, summary_res in sum_results:
         stage1_results = stage1_map[(rel, idx)]
@@ -282,15 +673,18 @@ async def evaluate(
                     "completion_tokens": call_usage["completion_tokens"],
                     "prompt_tokens": call_usage["prompt_tokens"],
                     "total_tokens": call_usage["total_tokens"],
+                    "cached_tokens": call_usage["cached_tokens"],
                 }
             )
-            heavy_think_content.append(
-                {
-                    "提示词": (stage_res or {}).get("提示词", ""),
-                    "思考过程": (stage_res or {}).get("思考过程", ""),
-                    "模型回答": (stage_res or {}).get("模型回答", ""),
-                }
-            )
+            content = {
+                "提示词": (stage_res or {}).get("提示词", ""),
+                "思考过程": (stage_res or {}).get("思考过程", ""),
+                "模型回答": (stage_res or {}).get("模型回答", ""),
+            }
+            for k in ("replica", "latency"):
+                if k in (stage_res or {}):
+                    content[k] = stage_res[k]
+            heavy_think_content.append(content)
 
         summary_usage = _merge_usage(_empty_usage(), (summary_res or {}).get("usage", {}))
         total_call_usage = _merge_usage(
@@ -309,6 +703,7 @@ async def evaluate(
                 "completion_tokens": summary_usage["completion_tokens"],
                 "prompt_tokens": summary_usage["prompt_tokens"],
                 "total_tokens": summary_usage["total_tokens"],
+                "cached_tokens": summary_usage["cached_tokens"],
             },
         }
         out["candidate_usage"] = candidate_total_usage
@@ -318,6 +713,18 @@ async def evaluate(
         _merge_usage(total_usage, out.get("usage", {}))
         _merge_usage(total_usage["candidate_usage"], out.get("candidate_usage", {}))
         _merge_usage(total_usage["summary_usage"], out.get("summary_usage", {}))
+        _merge_record_replicas(replicas, out)
+        rep = item_of[(rel, idx)]
+        for f in heavy_followers.get(exact_key(rep), ()):
+            results_by_rel[f["rel"]][f["idx"]] = _fan_out(out, rep, rel, f["item"])
+
+    if replicas:
+        total_usage["replicas"] = replicas
+    if summary_lane_cfg["lane_weights"]:
+        total_usage["lanes"] = {
+            "round1_candidate": cand_lanes.stats(),
+            "round2_summary": summary_lanes.stats(),
+        }
 
     for rel, results in results_by_rel.items():
         if any(x is None for x in results):
@@ -0,0 +1,85 @@
+import os
+import json
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple, TypeVar
+
+try:
+    import orjson
+except ImportError:  # 可选依赖：未安装时使用标准库 json
+    orjson = None
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 默认并行度；单核环境下为 1，即顺序解析、不创建线程池。
+_DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def loads(data: bytes, use_orjson: bool = True) -> Any:
+    """
+    解析 UTF-8 编码的 JSON，结果与 json.loads 相同。
+
+    - 安装了 orjson 且 use_orjson 为 True 时优先使用；orjson 不接受的输入（NaN、超出 64 位的整数等）回退到标准库；
+    - 解析失败时抛出 json.JSONDecodeError（或 UnicodeDecodeError），与 json.load 一致。
+    """
+    if use_orjson and orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data.decode("utf-8"))
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def load_file(path: str, use_orjson: bool = True) -> Any:
+    return loads(read_bytes(path), use_orjson=use_orjson)
+
+
+def _load_or_error(path: str, use_orjson: bool = True) -> Tuple[Any, Optional[Exception]]:
+    try:
+        return load_file(path, use_orjson=use_orjson), None
+    except Exception as e:
+        return None, e
+
+
+def map_ordered(
+    fn: Callable[[T], R],
+    args: Sequence[T],
+    workers: Optional[int] = None,
+    processes: bool = False,
+) -> Iterator[R]:
+    """按 args 的顺序产出 fn(arg)；workers 为 1 或只有一个参数时在当前线程顺序执行。"""
+    workers = workers or _DEFAULT_WORKERS
+    if workers <= 1 or len(args) <= 1:
+        for a in args:
+            yield fn(a)
+        return
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_cls(max_workers=min(workers, len(args))) as pool:
+        yield from pool.map(fn, args)
+
+
+def load_files(
+    paths: Sequence[str],
+    workers: Optional[int] = None,
+    processes: bool = False,
+    use_orjson: bool = True,
+) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+    """
+    并行解析多个 JSON 文件，按 paths 的顺序产出 (path, data, error)。
+
+    - 单个文件读取或解析失败时 data 为 None、error 为对应异常，不影响其他文件；
+    - workers 默认取 min(8, CPU 数)；为 1 或只有一个文件时顺序解析；
+    - processes=True 时使用进程池（解析结果需在进程间序列化，只适合极大文件）；
+    - use_orjson=False 时只用标准库解析（如用于对比两者耗时）。
+    """
+    fn = partial(_load_or_error, use_orjson=use_orjson)
+    results = map_ordered(fn, paths, workers=workers, processes=processes)
+    for p, (data, err) in zip(paths, results):
+        yield p, data, err
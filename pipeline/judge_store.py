@@ -0,0 +1,418 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+from .jsonio import load_file
+from .judger import sampling_params
+from .prompt import (
+    format_qa_batch_judge_prompt,
+    format_qa_judge_prompt,
+    qa_batch_judge_item,
+    qa_batch_judge_item_en,
+    qa_batch_judge_prompt,
+    qa_batch_judge_prompt_en,
+    qa_judge_prompt,
+    qa_judge_prompt_en,
+)
+from .result_index import load_scoring_files
+
+
+Root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+ScoreCachePath = os.path.join(Root, ".cache", "judge", "scores.sqlite3")
+
+# 库结构变化时递增，其他版本的库打开时整体重建。
+_STORE_VERSION = 1
+
+_USAGE_KEYS = ("completion_tokens", "prompt_tokens", "total_tokens", "cached_tokens")
+
+# 导出时评审详情的字段顺序（与 judge_one 产出的 detail 一致）。
+_DETAIL_ORDER = ("提示词", "思考过程", "模型回答", "模型回答_int", "usage")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    rel TEXT NOT NULL, id TEXT NOT NULL, model TEXT NOT NULL,
+    answer_hash TEXT NOT NULL, en_mode INTEGER NOT NULL,
+    detail TEXT NOT NULL, usage TEXT NOT NULL,
+    PRIMARY KEY (rel, id, model)
+);
+CREATE TABLE IF NOT EXISTS imports (rel TEXT PRIMARY KEY, signature TEXT NOT NULL);
+"""
+
+# 每条评审结果对应的缓存值：(答案哈希, 评审详情, token 用量)。
+Cached = Tuple[str, Dict[str, Any], Dict[str, int]]
+
+
+def judge_store_path(result_root: str) -> str:
+    return os.path.join(result_root, "judge.sqlite3")
+
+
+def _dumps(x: Any) -> str:
+    return json.dumps(x, ensure_ascii=False)
+
+
+def _usage(u: Any) -> Dict[str, int]:
+    u = u if isinstance(u, dict) else {}
+    return {k: int(u.get(k, 0) or 0) for k in _USAGE_KEYS}
+
+
+def _signature(fp: str) -> List[int]:
+    st = os.stat(fp)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _judge_inputs(item: Any) -> Tuple[str, str, str]:
+    # 评审提示词由题干、评分标准与模型回答生成（与 judge_one 的取值方式一致）。
+    return (
+        str(item.get("问题") or ""),
+        str(item.get("得分比例") or ""),
+        str(item.get("模型回答") or ""),
+    )
+
+
+def answer_hash(item: Any) -> str:
+    """评审输入（题干、评分标准、模型回答）的 sha1；结果文件中的回答变化后，旧评审不再复用。"""
+    return hashlib.sha1(_dumps(_judge_inputs(item)).encode("utf-8")).hexdigest()
+
+
+def judge_prompt(item: Any, en_mode: bool) -> str:
+    """按需重建评审提示词：存储中不保存提示词，导出时由结果文件中的题目重新生成。"""
+    return format_qa_judge_prompt(*_judge_inputs(item), en_mode=en_mode)
+
+
+def _template_version(en_mode: bool, batched: bool = False) -> str:
+    # 评审提示词模板的版本：模板文本的 sha1，修改模板后全局缓存中的旧分数自然失效。
+    # 批量评审用另一套模板，与逐题评审的分数分开缓存。
+    if batched:
+        template = (
+            qa_batch_judge_prompt_en + qa_batch_judge_item_en
+            if en_mode
+            else qa_batch_judge_prompt + qa_batch_judge_item
+        )
+    else:
+        template = qa_judge_prompt_en if en_mode else qa_judge_prompt
+    return hashlib.sha1(template.encode("utf-8")).hexdigest()[:16]
+
+
+def _judge_identity(judge: Dict[str, Any]) -> List[Any]:
+    # 影响评审输出的设置：模型名、端点（多副本时按排序后的列表）与采样/思考设置；
+    # 同名模型换了端点（可能是另一个检查点）或设置不同时不复用分数。
+    base_url = judge.get("base_url")
+    urls = sorted(str(u) for u in base_url) if isinstance(base_url, list) else [str(base_url)]
+    return [str(judge.get("model_name")), urls, sampling_params(judge)]
+
+
+def content_key(
+    judge: Dict[str, Any], item: Any, en_mode: bool, batched: bool = False
+) -> str:
+    """全局评审缓存的键：(评审模型及其端点与采样设置, 题干, 评分标准, 模型回答, 提示词模板版本) 的 sha1。"""
+    parts = [
+        _judge_identity(judge),
+        *_judge_inputs(item),
+        _template_version(en_mode, batched),
+    ]
+    return hashlib.sha1(_dumps(parts).encode("utf-8")).hexdigest()
+
+
+def _slim(detail: Dict[str, Any]) -> Dict[str, Any]:
+    # 只保留评审模型的思考过程、回答、分数与调用信息；提示词可重建，用量单独成列。
+    return {k: v for k, v in detail.items() if k not in ("提示词", "usage")}
+
+
+def _file_size(fp: str) -> int:
+    return sum(
+        os.path.getsize(p) for p in (fp, fp + "-wal") if os.path.exists(p)
+    )
+
+
+class JudgeStore:
+    """
+    评审结果的本地 SQLite 存储（result_root/judge.sqlite3，WAL 模式），取代 judge/<rel> 下的 JSON 缓存。
+
+    - results 表每个 (rel, id, 评审模型) 一行：评审输入的哈希（answer_hash）、是否英文模板、
+      评审详情（思考过程、回答、分数，不含提示词）与 token 用量；题目字段不复制，以结果文件为准；
+    - 每次评审完成即写入并提交，评审中途崩溃或 Ctrl-C 时已完成的结果不会丢失；
+    - 打开时导入 judge/ 下的旧 JSON 缓存（已有的行不覆盖），按文件的 mtime 与大小只导入一次，
+      并打印迁移前后的磁盘占用；
+    - export 由结果文件与存储重建原 judge/<rel> 的 JSON 布局（含提示词），供依赖该布局的工具使用。
+    """
+
+    def __init__(self, result_root: str):
+        self.root = result_root
+        self.path = judge_store_path(result_root)
+        os.makedirs(result_root, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != _STORE_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS results; DROP TABLE IF EXISTS imports;"
+            )
+        self.conn.executescript(_SCHEMA + f"PRAGMA user_version = {_STORE_VERSION};")
+        self._import_json()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def commit(self):
+        self.conn.commit()
+
+    def _report(self, what: str, before: int):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        after = _file_size(self.path)
+        print(
+            f"Judge store: migrated {what}, {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+            f"(saved {(before - after) / 1e6:.1f} MB)."
+        )
+
+    def _json_files(self) -> List[str]:
+        base = os.path.join(self.root, "judge")
+        out: List[str] = []
+        for r, _d, names in os.walk(base):
+            for fn in names:
+                if fn.endswith(".json"):
+                    out.append(os.path.normpath(os.path.relpath(os.path.join(r, fn), base)))
+        return out
+
+    def _import_json(self):
+        # 旧版本的 judge/<rel> 缓存：条目中值为带“模型回答_int”的 dict 的键视为评审模型，
+        # 用量优先取 usage_details[模型]，其次取详情中的 usage。
+        imported = dict(self.conn.execute("SELECT rel, signature FROM imports"))
+        before = _file_size(self.path)
+        n = 0
+        for rel in self._json_files():
+            fp = os.path.join(self.root, "judge", rel)
+            try:
+                signature = _dumps(_signature(fp))
+                if imported.get(rel) == signature:
+                    continue
+                size = os.path.getsize(fp)
+                data = load_file(fp)
+            except Exception:
+                continue
+            rows = []
+            for entry in data if isinstance(data, list) else []:
+                if not isinstance(entry, dict) or entry.get("id") is None:
+                    continue
+                h = answer_hash(entry)
+                usage_details = entry.get("usage_details")
+                if not isinstance(usage_details, dict):
+                    usage_details = {}
+                for model, d in entry.items():
+                    if not (isinstance(d, dict) and "模型回答_int" in d):
+                        continue
+                    en = d.get("提示词") == judge_prompt(entry, True)
+                    usage = _usage(usage_details.get(model) or d.get("usage"))
+                    rows.append(
+                        (
+                            rel,
+                            str(entry["id"]),
+                            model,
+                            h,
+                            int(en),
+                            _dumps(_slim(d)),
+                            _dumps(usage),
+                        )
+                    )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO imports VALUES (?, ?)", (rel, signature)
+            )
+            self.conn.commit()
+            before += size
+            n += 1
+        if n:
+            self._report(f"{n} judge/ JSON files (they can now be deleted)", before)
+
+    def put_result(
+        self,
+        rel: str,
+        qid: str,
+        model: str,
+        item: Any,
+        en_mode: bool,
+        detail: Dict[str, Any],
+        usage: Dict[str, int],
+    ):
+        """保存一次评审结果（按 item 计算答案哈希）并立即提交。"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                rel,
+                qid,
+                model,
+                answer_hash(item),
+                int(bool(en_mode)),
+                _dumps(_slim(detail)),
+                _dumps(_usage(usage)),
+            ),
+        )
+        self.conn.commit()
+
+    def results(self, rel: str) -> Dict[Tuple[str, str], Cached]:
+        """rel 下的评审结果 {(id, 评审模型): (答案哈希, 评审详情, 用量)}。"""
+        return {
+            (qid, model): (h, json.loads(detail), json.loads(usage))
+            for qid, model, h, detail, usage in self.conn.execute(
+                "SELECT id, model, answer_hash, detail, usage FROM results WHERE rel = ?",
+                (rel,),
+            )
+        }
+
+    def signature(self, rel: str) -> Optional[List[int]]:
+        """rel 下评审结果的版本：行数与最大 rowid，任何写入都会改变；没有结果时为 None。"""
+        n, last = self.conn.execute(
+            "SELECT count(*), max(rowid) FROM results WHERE rel = ?", (rel,)
+        ).fetchone()
+        return [n, last] if n else None
+
+    def rels(self) -> List[str]:
+        rows = self.conn.execute("SELECT DISTINCT rel FROM results ORDER BY rel")
+        return [r for (r,) in rows]
+
+    def entries(self, rel: str, items: List[Any]) -> List[Dict[str, Any]]:
+        """
+        按原 judge/<rel> JSON 的布局重建 rel 的条目：题目字段（取自结果文件中的 items）、
+        usage_details、usage 与各评审模型的详情（提示词按需重建）。
+
+        条目按 items 的顺序排列；结果文件中已没有的题目只保留 id，回答已变化的评审不输出提示词。
+        批量评审的提示词按 detail["batch"]["ids"] 重建整批的提示词，批内有题目缺失或回答已变化时不输出。
+        """
+        rows: Dict[str, List[Tuple[str, str, bool, Dict[str, Any], Dict[str, int]]]] = {}
+        for qid, model, h, en, detail, usage in self.conn.execute(
+            "SELECT id, model, answer_hash, en_mode, detail, usage FROM results "
+            "WHERE rel = ? ORDER BY rowid",
+            (rel,),
+        ):
+            rows.setdefault(qid, []).append(
+                (model, h, bool(en), json.loads(detail), json.loads(usage))
+            )
+        by_id = {str(it.get("id")): it for it in items}
+        hashes = {(qid, r[0]): r[1] for qid, rs in rows.items() for r in rs}
+
+        def prompt_of(item: Any, model: str, en: bool, detail: Dict[str, Any]) -> Optional[str]:
+            batch = detail.get("batch")
+            if not isinstance(batch, dict):
+                return judge_prompt(item, en)
+            members = [by_id.get(str(q)) for q in batch.get("ids") or []]
+            if not members or any(
+                m is None or hashes.get((str(m.get("id")), model)) != answer_hash(m)
+                for m in members
+            ):
+                return None
+            return format_qa_batch_judge_prompt(
+                [_judge_inputs(m) for m in members], en_mode=en
+            )
+
+        order = [q for q in by_id if q in rows] + [q for q in rows if q not in by_id]
+        out: List[Dict[str, Any]] = []
+        for qid in order:
+            item = by_id.get(qid)
+            entry: Dict[str, Any] = dict(item.items()) if item is not None else {"id": qid}
+            entry["usage_details"] = {}
+            entry["usage"] = _usage(None)
+            for model, h, en, detail, usage in rows[qid]:
+                entry["usage_details"][model] = usage
+                for k in _USAGE_KEYS:
+                    entry["usage"][k] += usage[k]
+                full = dict(detail, usage=usage)
+                if item is not None and h == answer_hash(item):
+                    prompt = prompt_of(item, model, en, detail)
+                    if prompt is not None:
+                        full["提示词"] = prompt
+                entry[model] = {
+                    **{k: full[k] for k in _DETAIL_ORDER if k in full},
+                    **{k: v for k, v in full.items() if k not in _DETAIL_ORDER},
+                }
+            out.append(entry)
+        return out
+
+    def export(self, out_dir: Optional[str] = None) -> List[str]:
+        """按原 judge/<rel> 的布局导出全部条目（默认导出到 result_root/judge），返回写出的文件。"""
+        judge_dir = os.path.join(self.root, "judge")
+        out_dir = out_dir or judge_dir
+        rels = self.rels()
+        files = [(os.path.join(self.root, "raw", rel), rel) for rel in rels]
+        written: List[str] = []
+        for rel, items in zip(rels, load_scoring_files(self.root, files)):
+            fp = os.path.join(out_dir, rel)
+            os.makedirs(os.path.dirname(fp), exist_ok=True)
+            with open(fp, "w", encoding="utf-8") as f:
+                json.dump(self.entries(rel, items or []), f, ensure_ascii=False, indent=2)
+            written.append(fp)
+            if os.path.abspath(out_dir) == os.path.abspath(judge_dir):
+                # 导出的文件与库内容一致，下次打开时不再重复导入。
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO imports VALUES (?, ?)",
+                    (rel, _dumps(_signature(fp))),
+                )
+        self.conn.commit()
+        return written
+
+
+class JudgeScoreCache:
+    """
+    跨 result_root 的全局评审分数缓存（默认 .cache/judge/scores.sqlite3，WAL 模式），按内容寻址。
+
+    - 键为 content_key：同一评审模型（同一端点与采样/思考设置）对完全相同的题干、评分标准与回答
+      （同一提示词模板）只评审一次，
+      换待测模型、换 result_root 或同一模型的不同检查点给出相同回答时直接复用；
+    - 值为评审详情（不含提示词）与当时的 token 用量；只缓存得到整数分数的评审；
+    - 可被多个进程同时使用（SQLite 文件锁），每次写入立即提交。
+    """
+
+    def __init__(self, path: str = ScoreCachePath):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, detail TEXT NOT NULL, usage TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def get_many(
+        self, keys: List[str]
+    ) -> Dict[str, Tuple[Dict[str, Any], Dict[str, int]]]:
+        """keys 中已缓存的 {键: (评审详情, 用量)}。"""
+        out: Dict[str, Tuple[Dict[str, Any], Dict[str, int]]] = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), 500):
+            chunk = unique[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, detail, usage in self.conn.execute(
+                f"SELECT key, detail, usage FROM scores WHERE key IN ({marks})", chunk
+            ):
+                out[key] = (json.loads(detail), json.loads(usage))
+        return out
+
+    def put(self, key: str, model: str, detail: Dict[str, Any], usage: Dict[str, int]):
+        if not isinstance(detail.get("模型回答_int"), int):
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+            (key, model, _dumps(_slim(detail)), _dumps(_usage(usage))),
+        )
+        self.conn.commit()
+
+
+if __name__ == "__main__":
+    # 把评审存储导出为原 judge/<rel> JSON 布局：python -m pipeline.judge_store <result_root> [输出目录]
+    if len(sys.argv) < 2:
+        print("usage: python -m pipeline.judge_store <result_root> [out_dir]")
+        sys.exit(1)
+    store = JudgeStore(sys.argv[1])
+    files = store.export(sys.argv[2] if len(sys.argv) > 2 else None)
+    store.close()
+    print(f"Exported {len(files)} judge files.")
@@ -1,8 +1,31 @@
 from typing import Any, Dict, List, Optional, Tuple
+import json
+import math
 import asyncio
 from tqdm import tqdm
-from .llm import async_retry_llm
-from .prompt import format_qa_judge_prompt
+from .llm import _cached_tokens, async_retry_llm
+from .prompt import format_qa_batch_judge_prompt, format_qa_judge_prompt
+
+
+# 批量评审只把同一叶子（同一分类路径）的题目放入同一个请求。
+_LEAF_FIELDS = (
+    "领域",
+    "安全类型",
+    "安全专项",
+    "分部工程",
+    "子分部工程",
+    "分项工程",
+    "板块类型",
+    "专项",
+    "专业类别",
+    "专业专项",
+    "子专业专项",
+    "细分子专业",
+)
+
+
+def leaf_key(item: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(str(item.get(k) or "") for k in _LEAF_FIELDS)
 
 
 def _parse_int(s: str) -> Optional[int]:
@@ -25,37 +48,95 @@ def _parse_int(s: str) -> Optional[int]:
         return None
 
 
-async def judge_one(
-    item: Dict[str, Any], judge_cfg: Dict[str, Any], en_mode: bool
-) -> Tuple[Optional[int], Dict[str, Any], Dict[str, int]]:
-    q = str(item.get("问题") or "")
-    rubric = str(item.get("得分比例") or "")
-    ans = str(item.get("模型回答") or "")
-    prompt = format_qa_judge_prompt(q, rubric, ans, en_mode=en_mode)
+def _parse_scores(s: str, n: int) -> Optional[List[int]]:
+    # 批量评审的输出：{"scores": [...]} 或直接为列表，取第一个 JSON 对象/数组；
+    # 数量与题数不一致、含非数值或非有限值（Infinity/NaN）时返回 None（由调用方改为逐题评审）。
+    if "</think>" in s:
+        s = s.split("</think>")[-1]
+    s = s.strip()
+    data = None
+    for open_ch, close_ch in (("{", "}"), ("[", "]")):
+        start, end = s.find(open_ch), s.rfind(close_ch)
+        if start < 0 or end <= start:
+            continue
+        try:
+            data = json.loads(s[start : end + 1])
+            break
+        except ValueError:
+            continue
+    if isinstance(data, dict):
+        data = data.get("scores")
+    if not isinstance(data, list) or len(data) != n:
+        return None
+    out: List[int] = []
+    for v in data:
+        if isinstance(v, bool) or not isinstance(v, (int, float, str)):
+            return None
+        try:
+            f = float(v)
+        except (ValueError, OverflowError):
+            return None
+        if not math.isfinite(f):
+            return None
+        out.append(min(100, max(0, int(f))))
+    return out
+
+
+def sampling_params(judge_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """评审调用的采样与思考设置（缺省值已填入）；全局评审缓存的键也包含这些设置（见 content_key）。"""
+    top_k = judge_cfg.get("top_k")
+    return {
+        "max_tokens": int(judge_cfg.get("max_tokens") or 1024),
+        "temperature": float(judge_cfg.get("temperature") or 0.0),
+        "top_p": float(judge_cfg.get("top_p") or 0.0),
+        "top_k": int(top_k) if top_k is not None else None,
+        "enable_thinking": bool(judge_cfg.get("enable_thinking")),
+    }
+
 
+async def _call_judge(
+    prompt: str, judge_cfg: Dict[str, Any], token_cost: int = 0
+) -> Tuple[str, str, Dict[str, int], Dict[str, Any]]:
+    call_info: Dict[str, Any] = {}
     r, c, u = await async_retry_llm(
         api_key=judge_cfg.get("api_key"),
         base_url=judge_cfg.get("base_url"),
         prompt=prompt,
         model=judge_cfg.get("model_name"),
-        max_tokens=judge_cfg.get("max_tokens") or 1024,
-        temperature=judge_cfg.get("temperature") or 0.0,
-        top_p=judge_cfg.get("top_p") or 0.0,
-        top_k=judge_cfg.get("top_k"),
-        enable_thinking=bool(judge_cfg.get("enable_thinking")),
+        **sampling_params(judge_cfg),
         stream=bool(judge_cfg.get("stream", True)),
         max_retries=judge_cfg.get("max_retries") or 3,
         timeout=judge_cfg.get("timeout") or 60.0,
+        routing=judge_cfg.get("routing") or "least_outstanding",
+        call_info=call_info,
+        token_cost=token_cost,
+        max_inflight_tokens=judge_cfg.get("max_inflight_tokens"),
     )
-    r = r or ""
-    c = c or ""
-    usage_dict = {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0}
+    usage_dict = {
+        "completion_tokens": 0,
+        "prompt_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+    }
     if u:
         usage_dict = {
             "completion_tokens": int(u.completion_tokens or 0),
             "prompt_tokens": int(u.prompt_tokens or 0),
             "total_tokens": int(u.total_tokens or 0),
+            "cached_tokens": _cached_tokens(u),
         }
+    return r or "", c or "", usage_dict, call_info
+
+
+async def judge_one(
+    item: Dict[str, Any], judge_cfg: Dict[str, Any], en_mode: bool, token_cost: int = 0
+) -> Tuple[Optional[int], Dict[str, Any], Dict[str, int]]:
+    q = str(item.get("问题") or "")
+    rubric = str(item.get("得分比例") or "")
+    ans = str(item.get("模型回答") or "")
+    prompt = format_qa_judge_prompt(q, rubric, ans, en_mode=en_mode)
+
+    r, c, usage_dict, call_info = await _call_judge(prompt, judge_cfg, token_cost)
     score = _parse_int(c)
     detail = {
         "提示词": prompt,
@@ -64,9 +145,72 @@ async def judge_one(
         "模型回答_int": score,
         "usage": usage_dict,
     }
+    if isinstance(judge_cfg.get("base_url"), list) and call_info.get("replica"):
+        detail["replica"] = call_info["replica"]
+    if "latency" in call_info:
+        detail["latency"] = round(call_info["latency"], 3)
     return score, detail, usage_dict
 
 
+def _split_usage(usage: Dict[str, int], n: int) -> List[Dict[str, int]]:
+    # 把一次批量调用的用量平均分到 n 道题，余数计入前几道，合计与原用量一致。
+    out: List[Dict[str, int]] = [{} for _ in range(n)]
+    for k, v in usage.items():
+        q, r = divmod(int(v), n)
+        for i in range(n):
+            out[i][k] = q + (i < r)
+    return out
+
+
+async def judge_batch(
+    items: List[Dict[str, Any]],
+    judge_cfg: Dict[str, Any],
+    en_mode: bool,
+    token_cost: int = 0,
+) -> Tuple[Optional[List[Tuple[int, Dict[str, Any], Dict[str, int]]]], Dict[str, int]]:
+    """
+    一次请求评审多道问答题，返回 (逐题 (分数, 详情, 用量)，本次调用的总用量)。
+
+    - 提示词见 format_qa_batch_judge_prompt，评审模型按题号输出 JSON 分数列表；
+    - 输出无法解析或分数个数不符时逐题结果为 None，由调用方改为逐题评审（总用量仍需计入）；
+    - 用量按题平均分摊；思考过程只保存在第一道题的详情中，
+      各题详情的 "batch" 记录批量大小、题号、批内各题 id（按题号顺序）与整次调用的耗时。
+    """
+    prompt = format_qa_batch_judge_prompt(
+        [
+            (
+                str(it.get("问题") or ""),
+                str(it.get("得分比例") or ""),
+                str(it.get("模型回答") or ""),
+            )
+            for it in items
+        ],
+        en_mode=en_mode,
+    )
+    r, c, usage_dict, call_info = await _call_judge(prompt, judge_cfg, token_cost)
+    ids = [str(it.get("id")) for it in items]
+    scores = _parse_scores(c, len(items))
+    if scores is None:
+        return None, usage_dict
+    out: List[Tuple[int, Dict[str, Any], Dict[str, int]]] = []
+    for k, (score, usage) in enumerate(zip(scores, _split_usage(usage_dict, len(items)))):
+        batch: Dict[str, Any] = {"size": len(items), "index": k, "ids": ids}
+        if "latency" in call_info:
+            batch["latency"] = round(call_info["latency"], 3)
+        detail = {
+            "提示词": prompt,
+            "思考过程": r if k == 0 else "",
+            "模型回答": c,
+            "模型回答_int": score,
+            "usage": usage,
+            "batch": batch,
+        }
+        if isinstance(judge_cfg.get("base_url"), list) and call_info.get("replica"):
+            detail["replica"] = call_info["replica"]
+        out.append((score, detail, usage))
+    return out, usage_dict
+
+
 async def judge_items(
     items: List[Dict[str, Any]], judges: List[Dict[str, Any]], en_mode: bool = False
 ) -> Tuple[List[Optional[float]], Dict[str, Dict[str, int]]]:
@@ -78,7 +222,12 @@ async def judge_items(
     pbar = tqdm(total=total_tasks, desc="Judging QA", unit="task")
 
     judge_usages = {
-        j["model_name"]: {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0}
+        j["model_name"]: {
+            "completion_tokens": 0,
+            "prompt_tokens": 0,
+            "total_tokens": 0,
+            "cached_tokens": 0,
+        }
         for j in judges
     }
 
@@ -103,6 +252,7 @@ async def judge_items(
                 )
                 judge_usages[model_name]["prompt_tokens"] += u.get("prompt_tokens", 0)
                 judge_usages[model_name]["total_tokens"] += u.get("total_tokens", 0)
+                judge_usages[model_name]["cached_tokens"] += u.get("cached_tokens", 0)
 
         if not scores:
             return None
@@ -1,8 +1,17 @@
-from typing import Any, Dict, Optional, Tuple
+import time
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from openai import AsyncOpenAI, OpenAI
+from .scheduler import admitted, get_token_budget
 
 _CLIENT_CACHE: Dict[Tuple[str, str], OpenAI] = {}
 _ASYNC_CLIENT_CACHE: Dict[Tuple[str, str], AsyncOpenAI] = {}
+_REPLICA_POOLS: Dict[Tuple[Tuple[str, ...], str, str], "_ReplicaPool"] = {}
+
+# 副本失败后的冷却时间（秒），冷却期内不再向该副本路由请求。
+_REPLICA_COOLDOWN = 30.0
+# 延迟 EWMA 的平滑系数。
+_LATENCY_ALPHA = 0.2
 
 
 def _get_client(api_key: str, base_url: str, timeout: float) -> OpenAI:
@@ -23,6 +32,121 @@ def _get_async_client(api_key: str, base_url: str, timeout: float) -> AsyncOpenA
     return client
 
 
+class _ReplicaPool:
+    """
+    同一逻辑模型的多个推理副本（多个 base_url）。
+
+    路由策略：
+    - least_outstanding：优先选择在途请求最少的副本（相同时取平均延迟更低者）；
+    - latency：按 (在途请求数 + 1) * 平均延迟 选择预计等待最短的副本。
+    失败的副本进入冷却期，冷却期内请求会转移到其他健康副本。
+    """
+
+    def __init__(self, base_urls: Sequence[str], api_key: str, routing: str):
+        self.base_urls = list(base_urls)
+        self.api_key = api_key
+        self.routing = routing or "least_outstanding"
+        self.outstanding = {u: 0 for u in self.base_urls}
+        self.latency: Dict[str, Optional[float]] = {u: None for u in self.base_urls}
+        self.down_until = {u: 0.0 for u in self.base_urls}
+        self.stats = {
+            u: {"calls": 0, "failures": 0, "busy_seconds": 0.0} for u in self.base_urls
+        }
+        self._probed = False
+        self._probe_lock: Optional[asyncio.Lock] = None
+
+    def _cost(self, url: str) -> Tuple[float, float]:
+        lat = self.latency[url] or 0.0
+        if self.routing == "latency":
+            return (self.outstanding[url] + 1) * lat, self.outstanding[url]
+        return self.outstanding[url], lat
+
+    def pick(
+        self, exclude: Sequence[str] = (), fits: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        # fits 非空时优先选择 token 预算还能直接放行本次请求的副本。
+        now = time.monotonic()
+        pool = [u for u in self.base_urls if u not in exclude] or list(self.base_urls)
+        healthy = [u for u in pool if self.down_until[u] <= now] or pool
+        if fits is not None:
+            healthy = [u for u in healthy if fits(u)] or healthy
+        url = min(healthy, key=self._cost)
+        self.outstanding[url] += 1
+        return url
+
+    def release(self, url: str, ok: bool, elapsed: float):
+        self.outstanding[url] = max(0, self.outstanding[url] - 1)
+        st = self.stats[url]
+        st["busy_seconds"] += elapsed
+        if not ok:
+            st["failures"] += 1
+            self.down_until[url] = time.monotonic() + _REPLICA_COOLDOWN
+            return
+        st["calls"] += 1
+        self.down_until[url] = 0.0
+        prev = self.latency[url]
+        self.latency[url] = (
+            elapsed if prev is None else prev + _LATENCY_ALPHA * (elapsed - prev)
+        )
+
+    async def health_check(self, timeout: float):
+        # 首次使用时对所有副本做一次 /models 探活，不可用的副本先进入冷却。
+        if self._probed:
+            return
+        if self._probe_lock is None:
+            self._probe_lock = asyncio.Lock()
+        async with self._probe_lock:
+            if self._probed:
+                return
+
+            async def probe(url: str):
+                try:
+                    client = _get_async_client(self.api_key, url, timeout)
+                    await client.models.list(timeout=min(timeout, 10.0))
+                except Exception as e:
+                    print(f"Replica {url} failed health check: {e}")
+                    self.down_until[url] = time.monotonic() + _REPLICA_COOLDOWN
+
+            await asyncio.gather(*[probe(u) for u in self.base_urls])
+            self._probed = True
+
+
+def _get_replica_pool(
+    base_urls: Sequence[str], api_key: str, routing: str
+) -> _ReplicaPool:
+    # routing 也是键的一部分：同一组副本在不同配置中使用不同路由策略时各自一个池，
+    # 不会因为先创建的池而忽略后者的策略。
+    key = (tuple(str(u) for u in base_urls), str(api_key or ""), str(routing or ""))
+    pool = _REPLICA_POOLS.get(key)
+    if pool is None:
+        pool = _ReplicaPool(key[0], api_key, routing)
+        _REPLICA_POOLS[key] = pool
+    return pool
+
+
+def _cached_tokens(usage: Any) -> int:
+    # 服务端前缀缓存命中的提示词 token 数（usage.prompt_tokens_details.cached_tokens），
+    # 不同服务端返回对象或 dict，未提供时为 0。
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None and isinstance(usage, dict):
+        details = usage.get("prompt_tokens_details")
+    if isinstance(details, dict):
+        return int(details.get("cached_tokens", 0) or 0)
+    return int(getattr(details, "cached_tokens", 0) or 0)
+
+
+def _split_think(reasoning_content: str, answer_content: str) -> Tuple[str, str]:
+    ## 兼容qwen3系列本地部署
+    if reasoning_content == "" and "</think>\n\n" in answer_content:
+        reasoning_content = answer_content.split("</think>\n\n")[0]
+        answer_content = answer_content.split("</think>\n\n")[1]
+    ## 兼容自有模型本地部署
+    if reasoning_content == "" and "</think>\n" in answer_content:
+        reasoning_content = answer_content.split("</think>\n")[0]
+        answer_content = answer_content.split("</think>\n")[1]
+    return reasoning_content, answer_content
+
+
 def openai_interface(
     api_key: str,
     base_url: str,
@@ -35,6 +159,7 @@ def openai_interface(
     enable_thinking: bool = False,
     stream: bool = True,
     timeout: float = 60.0,
+    messages: Optional[List[Dict[str, str]]] = None,
 ):
     client = _get_client(api_key=api_key, base_url=base_url, timeout=timeout)
 
@@ -50,7 +175,7 @@ def openai_interface(
 
     create_kwargs = dict(
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        messages=messages or [{"role": "user", "content": prompt}],
         temperature=temperature,
         max_tokens=max_tokens,
         top_p=top_p,
@@ -123,6 +248,7 @@ async def async_openai_interface(
     enable_thinking: bool = False,
     stream: bool = True,
     timeout: float = 60.0,
+    messages: Optional[List[Dict[str, str]]] = None,
 ):
     client = _get_async_client(api_key=api_key, base_url=base_url, timeout=timeout)
 
@@ -138,7 +264,7 @@ async def async_openai_interface(
 
     create_kwargs = dict(
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        messages=messages or [{"role": "user", "content": prompt}],
         temperature=temperature,
         max_tokens=max_tokens,
         top_p=top_p,
@@ -187,9 +313,15 @@ async def async_openai_interface(
     return reasoning_content, content, usage_info
 
 
+def _replica_list(base_url: Union[str, Sequence[str], None]) -> List[str]:
+    if isinstance(base_url, (list, tuple)):
+        return [str(u) for u in base_url if u]
+    return [base_url] if base_url else []
+
+
 def retry_llm(
     api_key: str,
-    base_url: str,
+    base_url: Union[str, Sequence[str]],
     prompt: str,
     model: str,
     max_tokens: int = 32768,
@@ -200,12 +332,21 @@ def retry_llm(
     stream: bool = True,
     max_retries: int = 3,
     timeout: float = 60.0,
+    routing: str = "least_outstanding",
+    call_info: Optional[Dict[str, Any]] = None,
+    messages: Optional[List[Dict[str, str]]] = None,
 ):
+    replicas = _replica_list(base_url)
+    pool = _get_replica_pool(replicas, api_key, routing) if len(replicas) > 1 else None
+    tried: List[str] = []
     for attempt in range(1, max_retries + 1):
+        url = pool.pick(exclude=tried) if pool else (replicas[0] if replicas else None)
+        started = time.monotonic()
+        ok = False
         try:
             reasoning_content, answer_content, usage = openai_interface(
                 api_key=api_key,
-                base_url=base_url,
+                base_url=url,
                 prompt=prompt,
                 model=model,
                 max_tokens=max_tokens,
@@ -215,21 +356,27 @@ def retry_llm(
                 enable_thinking=enable_thinking,
                 stream=stream,
                 timeout=timeout,
+                messages=messages,
             )
 
             if reasoning_content is not None and answer_content is not None:
-                ## 兼容qwen3系列本地部署
-                if reasoning_content == "" and "</think>\n\n" in answer_content:
-                    reasoning_content = answer_content.split("</think>\n\n")[0]
-                    answer_content = answer_content.split("</think>\n\n")[1]
-                ## 兼容自有模型本地部署
-                if reasoning_content == "" and "</think>\n" in answer_content:
-                    reasoning_content = answer_content.split("</think>\n")[0]
-                    answer_content = answer_content.split("</think>\n")[1]
+                ok = True
+                reasoning_content, answer_content = _split_think(
+                    reasoning_content, answer_content
+                )
+                if call_info is not None:
+                    call_info["replica"] = url
+                    call_info["latency"] = time.monotonic() - started
+                    call_info["attempts"] = attempt
                 return reasoning_content, answer_content, usage
 
         except Exception as e:
-            print(f"Attempt {attempt}/{max_retries} failed: {e}")
+            print(f"Attempt {attempt}/{max_retries} failed ({url}): {e}")
+        finally:
+            if pool:
+                pool.release(url, ok, time.monotonic() - started)
+        if pool and url:
+            tried.append(url)
 
     print(f"Warning: Failed after {max_retries} retries.")
     return None, None, None
@@ -237,7 +384,7 @@ def retry_llm(
 
 async def async_retry_llm(
     api_key: str,
-    base_url: str,
+    base_url: Union[str, Sequence[str]],
     prompt: str,
     model: str,
     max_tokens: int = 32768,
@@ -248,33 +395,74 @@ async def async_retry_llm(
     stream: bool = True,
     max_retries: int = 3,
     timeout: float = 60.0,
+    routing: str = "least_outstanding",
+    call_info: Optional[Dict[str, Any]] = None,
+    messages: Optional[List[Dict[str, str]]] = None,
+    token_cost: int = 0,
+    max_inflight_tokens: Optional[int] = None,
 ):
+    """
+    带重试的异步调用。base_url 可以是单个地址，也可以是同一模型多个副本的地址列表：
+    多副本时每次尝试按 routing 策略选择副本，失败后下一次尝试切换到其他副本。
+    call_info 非空时写入本次成功调用的 replica / latency / attempts。
+
+    配置了 max_inflight_tokens 时，每个端点（每个副本）各有一个 token 预算：
+    选定副本后按 token_cost（期望 token 数）准入，优先选择预算还有余量的副本。
+    """
+    replicas = _replica_list(base_url)
+    pool = _get_replica_pool(replicas, api_key, routing) if len(replicas) > 1 else None
+    if pool:
+        await pool.health_check(timeout)
+
+    def fits(url: str) -> bool:
+        budget = get_token_budget(url, model, max_inflight_tokens)
+        return budget is None or budget.fits(token_cost)
+
+    tried: List[str] = []
     for attempt in range(1, max_retries + 1):
+        url = (
+            pool.pick(exclude=tried, fits=fits)
+            if pool
+            else (replicas[0] if replicas else None)
+        )
+        budget = get_token_budget(url, model, max_inflight_tokens)
+        started = time.monotonic()
+        ok = False
         try:
-            reasoning_content, answer_content, usage = await async_openai_interface(
-                api_key=api_key,
-                base_url=base_url,
-                prompt=prompt,
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                top_k=top_k,
-                enable_thinking=enable_thinking,
-                stream=stream,
-                timeout=timeout,
-            )
+            async with admitted(budget, token_cost):
+                started = time.monotonic()
+                reasoning_content, answer_content, usage = await async_openai_interface(
+                    api_key=api_key,
+                    base_url=url,
+                    prompt=prompt,
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    top_p=top_p,
+                    top_k=top_k,
+                    enable_thinking=enable_thinking,
+                    stream=stream,
+                    timeout=timeout,
+                    messages=messages,
+                )
 
             if reasoning_content is not None and answer_content is not None:
-                if reasoning_content == "" and "</think>\n\n" in answer_content:
-                    reasoning_content = answer_content.split("</think>\n\n")[0]
-                    answer_content = answer_content.split("</think>\n\n")[1]
-                if reasoning_content == "" and "</think>\n" in answer_content:
-                    reasoning_content = answer_content.split("</think>\n")[0]
-                    answer_content = answer_content.split("</think>\n")[1]
+                ok = True
+                reasoning_content, answer_content = _split_think(
+                    reasoning_content, answer_content
+                )
+                if call_info is not None:
+                    call_info["replica"] = url
+                    call_info["latency"] = time.monotonic() - started
+                    call_info["attempts"] = attempt
                 return reasoning_content, answer_content, usage
         except Exception as e:
-            print(f"Attempt {attempt}/{max_retries} failed: {e}")
+            print(f"Attempt {attempt}/{max_retries} failed ({url}): {e}")
+        finally:
+            if pool:
+                pool.release(url, ok, time.monotonic() - started)
+        if pool and url:
+            tried.append(url)
 
     print(f"Warning: Failed after {max_retries} retries.")
     return None, None, None
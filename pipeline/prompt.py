@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Tuple
 
 single_choice_prompt = """
 # 角色
@@ -179,22 +179,104 @@ qa_judge_prompt_en = """
 """
 
 
+qa_batch_judge_prompt = """
+# 角色
+    你是一名超过20年经验的资深注册监理工程师裁判，依据规范和评分细则进行严格量化评分。
+
+## 任务
+    下面共有{n}道题，每道题包含题目、评分细则与模型作答。逐题独立评分，题目之间互不影响，
+    每道题返回0到100之间的整数分值。
+
+{items}## 输出要求
+    仅输出一个JSON对象：{{"scores": [第1题分值, 第2题分值, ...]}}，按题号顺序给出{n}个0~100的整数，不输出其他内容。
+"""
+
+qa_batch_judge_item = """## 第{}题
+### 题目
+{}
+
+### 评分细则
+{}
+
+### 模型作答
+{}
+
+"""
+
+qa_batch_judge_prompt_en = """
+# Role
+    You are an experienced senior registered supervision engineer acting as a judge. You must score strictly according to standards/codes and the scoring rubric.
+
+## Task
+    There are {n} questions below, each with a question, a scoring rubric and a model answer. Score each answer independently of the others as an integer from 0 to 100.
+
+{items}## Output Requirement
+    Output only a JSON object {{"scores": [score of answer 1, score of answer 2, ...]}} with {n} integers in the range 0 to 100 in answer order, and nothing else.
+"""
+
+qa_batch_judge_item_en = """## Answer {}
+### Question
+{}
+
+### Scoring Rubric
+{}
+
+### Model Answer
+{}
+
+"""
+
+
 def format_question_prompt(item, en_mode: bool = False) -> str:
     t = str(item.get("题型"))
     q = str(item.get("问题"))
+    return _question_template(t, en_mode).format(q)
+
+
+def _question_template(t: str, en_mode: bool) -> str:
     if t == "单选题":
-        return (single_choice_prompt_en if en_mode else single_choice_prompt).format(q)
+        return single_choice_prompt_en if en_mode else single_choice_prompt
     if t == "多选题":
-        return (multi_choice_prompt_en if en_mode else multi_choice_prompt).format(q)
+        return multi_choice_prompt_en if en_mode else multi_choice_prompt
     if t == "判断题":
-        return (judge_prompt_en if en_mode else judge_prompt).format(q)
-    return (qa_prompt_en if en_mode else qa_prompt).format(q)
+        return judge_prompt_en if en_mode else judge_prompt
+    return qa_prompt_en if en_mode else qa_prompt
+
+
+def _split_question_template(template: str, en_mode: bool) -> Tuple[str, str]:
+    # 把模板拆成固定部分（角色/任务/要求）与题目部分，固定部分放入 system 消息，
+    # 使同一模板的所有请求共享相同前缀，便于服务端前缀缓存命中。
+    marker = "## Question\n{}\n" if en_mode else "## 题目\n{}\n"
+    head, tail = template.split(marker, 1)
+    system = (head.strip() + "\n\n" + tail.strip()).strip()
+    return system, marker.replace("{}\n", "{}")
+
+
+def format_question_messages(item, en_mode: bool = False) -> List[Dict[str, str]]:
+    """与 format_question_prompt 内容相同，但固定的角色与要求放在 system 消息中。"""
+    template = _question_template(str(item.get("题型")), en_mode)
+    system, user = _split_question_template(template, en_mode)
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user.format(str(item.get("问题")))},
+    ]
 
 
 def format_qa_judge_prompt(q: str, rubric: str, ans: str, en_mode: bool = False) -> str:
     return (qa_judge_prompt_en if en_mode else qa_judge_prompt).format(q, rubric, ans)
 
 
+def format_qa_batch_judge_prompt(
+    cases: List[Tuple[str, str, str]], en_mode: bool = False
+) -> str:
+    """把多道问答题的 (题目, 评分细则, 模型作答) 放入同一个评审提示词，要求按题号输出 JSON 分数列表。"""
+    item = qa_batch_judge_item_en if en_mode else qa_batch_judge_item
+    return (qa_batch_judge_prompt_en if en_mode else qa_batch_judge_prompt).format(
+        n=len(cases),
+        items="".join(item.format(i + 1, q, r, a) for i, (q, r, a) in enumerate(cases)),
+    )
+
+
 summary_prompt = """
 # 角色
 你是一名资深的总监理工程师（具有最终决策权与审核权）。你精通中国现行各项建设工程法律法规（如《建筑法》、《建设工程安全生产管理条例》、《建设工程监理规范》等）及相关强制性标准，擅长在复杂甚至矛盾的多方专家意见中，依据规范准绳和题干客观约束，做出唯一、权威且精准的最终裁断。
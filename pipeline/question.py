@@ -0,0 +1,113 @@
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# 分类字段取值种类很少，解析后统一 intern，使相同取值的题目共享同一个字符串对象。
+_CATEGORICAL_FIELDS = frozenset(
+    (
+        "题型",
+        "领域",
+        "工程类别",
+        "安全类型",
+        "安全专项",
+        "分部工程",
+        "子分部工程",
+        "分项工程",
+        "板块类型",
+        "专项",
+        "专业类别",
+        "专业专项",
+        "子专业专项",
+        "细分子专业",
+    )
+)
+
+TYPE_CODES: Dict[str, int] = {"单选题": 0, "多选题": 1, "判断题": 2, "问答题": 3}
+
+# 相同字段顺序的题目共享同一个键元组与键→下标索引。
+_LAYOUTS: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], Dict[str, int]]] = {}
+
+
+def _layout(keys: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Dict[str, int]]:
+    layout = _LAYOUTS.get(keys)
+    if layout is None:
+        keys = tuple(sys.intern(k) for k in keys)
+        layout = (keys, {k: i for i, k in enumerate(keys)})
+        _LAYOUTS[keys] = layout
+    return layout
+
+
+class Question:
+    """
+    一道题目（或一条测评结果）的紧凑只读表示，替代在各阶段间传递的普通 dict。
+
+    - 字段名元组按字段顺序共享，取值存于元组中，分类字段的字符串已 intern；
+    - type_code 为题型的整数编码（见 TYPE_CODES，未知题型为 -1）；
+    - src / rel 为来源文件路径及其相对路径（原先的 {"src","rel","item"} 包装），
+      需要其他来源时用 with_source 得到副本，不修改已有对象（DatasetStore 中的对象是共享的）；
+    - 支持 get / [] / in / keys / values / items，dict(q) 或 q.to_dict() 得到原 JSON 结构，仅在读写文件时转换。
+    """
+
+    __slots__ = ("_keys", "_index", "_values", "type_code", "src", "rel")
+
+    def __init__(
+        self,
+        data: Dict[str, Any],
+        src: Optional[str] = None,
+        rel: Optional[str] = None,
+    ):
+        self._keys, self._index = _layout(tuple(data.keys()))
+        self._values = tuple(
+            sys.intern(v) if k in _CATEGORICAL_FIELDS and type(v) is str else v
+            for k, v in data.items()
+        )
+        self.type_code = TYPE_CODES.get(self.get("题型"), -1)
+        self.src = src
+        self.rel = rel
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self._index.get(key)
+        return default if i is None else self._values[i]
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._index[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._keys
+
+    def values(self) -> Tuple[Any, ...]:
+        return self._values
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self._keys, self._values)
+
+    def with_source(self, src: Optional[str], rel: Optional[str]) -> "Question":
+        """来源改为 (src, rel) 的副本，共享字段与取值；缓存中的对象不被修改。"""
+        q = Question.__new__(Question)
+        q._keys, q._index, q._values = self._keys, self._index, self._values
+        q.type_code = self.type_code
+        q.src = src
+        q.rel = rel
+        return q
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._keys, self._values))
+
+    def __repr__(self) -> str:
+        return f"Question(rel={self.rel!r}, id={self.get('id')!r}, 题型={self.get('题型')!r})"
+
+
+def to_questions(
+    items: List[Any], src: Optional[str] = None, rel: Optional[str] = None
+) -> List[Question]:
+    """把 JSON 文件中的题目列表转换为 Question，跳过非 dict 的元素。"""
+    return [Question(it, src=src, rel=rel) for it in items if isinstance(it, dict)]
@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 
 def _pick(rows: List[Dict[str, Any]], part: str, level: str) -> List[Dict[str, Any]]:
@@ -13,20 +13,90 @@ def _top_bottom(
     return s[-k:] if len(s) >= k else s, s[:k]
 
 
+def _interval(r: Optional[Dict[str, Any]]) -> str:
+    # 行带有置信区间时返回“ [下限, 上限]”，否则为空。
+    if not r or r.get("下限") is None or r.get("上限") is None:
+        return ""
+    return f" [{r['下限']}, {r['上限']}]"
+
+
+def _named(rows: List[Dict[str, Any]]) -> str:
+    return ", ".join([f"{r['名称']}({r['分数']}{_interval(r)})" for r in rows])
+
+
+# 总览中各项对应的汇总行 (部分, 层级, 名称)。
+_TOTAL_ROWS = {
+    "总分": ("整体", "总分", "总分"),
+    "专业技术": ("1专业技术", "整体", "专业技术"),
+    "安全": ("1-1安全", "整体", "安全"),
+    "质量": ("1-2质量", "整体", "质量"),
+    "通用综合": ("2通用综合", "整体", "通用综合"),
+    "特色场景": ("3特色场景", "整体", "特色场景"),
+}
+
+
+def _cache_line(usage: Dict[str, Any]) -> str:
+    # 服务端前缀缓存命中的提示词 token 数即节省的提示词计算量，命中率按 prompt tokens 计。
+    prompt = int(usage.get("prompt_tokens", 0) or 0)
+    cached = int(usage.get("cached_tokens", 0) or 0)
+    rate = cached / prompt if prompt else 0.0
+    return f"- Cached Prompt Tokens: {cached} (命中率 {rate:.1%})"
+
+
+def _sampling_lines(sampling: Dict[str, Any]) -> List[str]:
+    # 分轮抽样时各轮累计题数与总览各项的得分、区间宽度（见 sampling.evaluate_in_rounds）。
+    rounds = sampling["rounds"]
+    names = [k for k in _TOTAL_ROWS if k in rounds[-1]["scores"]]
+    total = int(sampling.get("total") or 0)
+    spent = int(rounds[-1]["questions"])
+    stopped = {"converged": "已达到目标宽度", "exhausted": "题目已用完，未达到目标宽度"}
+    lines = [
+        "",
+        "## 抽样精度",
+        f"- 分层抽样（{sampling.get('strata', 0)} 层）：共 {total} 道题，"
+        f"评测 {spent} 道（{spent / total if total else 0.0:.1%}）。",
+        f"- 目标区间宽度 {sampling.get('target_width')}，"
+        f"{stopped.get(sampling.get('stopped'), '未完成')}；括号内为区间宽度。",
+        "| 轮次 | 题数 | " + " | ".join(names) + " |",
+        "| --- | --- | " + " | ".join("---" for _ in names) + " |",
+    ]
+    for r in rounds:
+        cells = []
+        for k in names:
+            score, lo, hi = r["scores"].get(k) or (None, None, None)
+            if score is None:
+                cells.append("-")
+            elif lo is None or hi is None:
+                cells.append(f"{score}")
+            else:
+                cells.append(f"{score} ({hi - lo:.2f})")
+        lines.append(f"| {r['round']} | {r['questions']} | " + " | ".join(cells) + " |")
+    return lines
+
+
 def build_report(
     rows: List[Dict[str, Any]],
     totals: Dict[str, float],
     eval_usage: Dict[str, Any],
     judge_usage: Dict[str, Dict[str, int]],
     eval_model_name: str,
+    ci_level: float = 0.95,
+    sampling: Optional[Dict[str, Any]] = None,
 ) -> str:
+    by_key = {(r.get("部分"), r.get("层级"), r.get("名称")): r for r in rows}
     lines: List[str] = []
     lines.append("# 模型测评分析报告")
     lines.append("")
     lines.append("## 总览")
     for k in ["总分", "专业技术", "安全", "质量", "通用综合", "特色场景"]:
         v = totals.get(k)
-        lines.append(f"- {k}：{round(v, 2) if v is not None else 0.0}")
+        ci = _interval(by_key.get(_TOTAL_ROWS[k]))
+        lines.append(f"- {k}：{round(v, 2) if v is not None else 0.0}{ci}")
+    if any(r.get("下限") is not None for r in rows):
+        lines.append(f"- 方括号内为 {ci_level:.0%} bootstrap 置信区间。")
+
+    if sampling and sampling.get("rounds"):
+        lines.extend(_sampling_lines(sampling))
 
     lines.append("")
     lines.append("## Token 消耗统计")
@@ -39,28 +109,59 @@ def build_report(
         lines.append("#### Candidate Model Usage")
         lines.append(f"- Completion Tokens: {c_u.get('completion_tokens', 0)}")
         lines.append(f"- Prompt Tokens: {c_u.get('prompt_tokens', 0)}")
+        lines.append(_cache_line(c_u))
         lines.append(f"- Total Tokens: {c_u.get('total_tokens', 0)}")
         
         lines.append("#### Summary Model Usage")
         lines.append(f"- Completion Tokens: {s_u.get('completion_tokens', 0)}")
         lines.append(f"- Prompt Tokens: {s_u.get('prompt_tokens', 0)}")
+        lines.append(_cache_line(s_u))
         lines.append(f"- Total Tokens: {s_u.get('total_tokens', 0)}")
         
         lines.append("#### Total Usage (Combined)")
         lines.append(f"- Completion Tokens: {eval_usage.get('completion_tokens', 0)}")
         lines.append(f"- Prompt Tokens: {eval_usage.get('prompt_tokens', 0)}")
+        lines.append(_cache_line(eval_usage))
         lines.append(f"- Total Tokens: {eval_usage.get('total_tokens', 0)}")
     else:
         lines.append(f"- Completion Tokens: {eval_usage.get('completion_tokens', 0)}")
         lines.append(f"- Prompt Tokens: {eval_usage.get('prompt_tokens', 0)}")
+        lines.append(_cache_line(eval_usage))
         lines.append(f"- Total Tokens: {eval_usage.get('total_tokens', 0)}")
 
+    replicas = eval_usage.get("replicas") or {}
+    if replicas:
+        lines.append("#### 副本吞吐")
+        lines.append("| 副本 | 调用次数 | Completion Tokens | 平均耗时(s) | Tokens/s |")
+        lines.append("| --- | --- | --- | --- | --- |")
+        for url, st in replicas.items():
+            calls = int(st.get("calls", 0) or 0)
+            tokens = int(st.get("completion_tokens", 0) or 0)
+            latency = float(st.get("latency", 0.0) or 0.0)
+            avg = latency / calls if calls else 0.0
+            tps = tokens / latency if latency > 0 else 0.0
+            lines.append(f"| {url} | {calls} | {tokens} | {avg:.2f} | {tps:.1f} |")
+
+    lanes = eval_usage.get("lanes") or {}
+    if lanes:
+        lines.append("#### 并发通道利用率")
+        lines.append("| 阶段 | 通道 | 保底槽位 | 调用次数 | 借用次数 | 峰值并发 | 槽位占用率 |")
+        lines.append("| --- | --- | --- | --- | --- | --- | --- |")
+        for stage, stage_lanes in lanes.items():
+            for lane, st in stage_lanes.items():
+                lines.append(
+                    f"| {stage} | {lane} | {st.get('quota', 0)} | {st.get('granted', 0)} "
+                    f"| {st.get('stolen', 0)} | {st.get('peak', 0)} "
+                    f"| {float(st.get('utilisation', 0.0)):.1%} |"
+                )
+
     lines.append("")
     lines.append("### 裁判模型")
     for model_name, usage in judge_usage.items():
         lines.append(f"#### {model_name}")
         lines.append(f"- Completion Tokens: {usage.get('completion_tokens', 0)}")
         lines.append(f"- Prompt Tokens: {usage.get('prompt_tokens', 0)}")
+        lines.append(_cache_line(usage))
         lines.append(f"- Total Tokens: {usage.get('total_tokens', 0)}")
 
     lines.append("")
@@ -70,45 +171,29 @@ def build_report(
     if sec_types:
         top, bottom = _top_bottom(sec_types)
         lines.append("### 安全类型")
-        lines.append(
-            "- 强项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in reversed(top)])
-        )
-        lines.append(
-            "- 弱项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in bottom])
-        )
+        lines.append("- 强项：" + _named(list(reversed(top))))
+        lines.append("- 弱项：" + _named(bottom))
 
     qual_subs = _pick(rows, "1-2质量", "子分部工程")
     if qual_subs:
         top, bottom = _top_bottom(qual_subs)
         lines.append("### 质量子分部工程")
-        lines.append(
-            "- 强项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in reversed(top)])
-        )
-        lines.append(
-            "- 弱项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in bottom])
-        )
+        lines.append("- 强项：" + _named(list(reversed(top))))
+        lines.append("- 弱项：" + _named(bottom))
 
     gen_blks = _pick(rows, "2通用综合", "板块类型")
     if gen_blks:
         top, bottom = _top_bottom(gen_blks)
         lines.append("### 通用综合板块类型")
-        lines.append(
-            "- 强项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in reversed(top)])
-        )
-        lines.append(
-            "- 弱项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in bottom])
-        )
+        lines.append("- 强项：" + _named(list(reversed(top))))
+        lines.append("- 弱项：" + _named(bottom))
 
     spec_cats = _pick(rows, "3特色场景", "专业类别")
     if spec_cats:
         top, bottom = _top_bottom(spec_cats)
         lines.append("### 特色场景专业类别")
-        lines.append(
-            "- 强项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in reversed(top)])
-        )
-        lines.append(
-            "- 弱项：" + ", ".join([f"{r['名称']}({r['分数']})" for r in bottom])
-        )
+        lines.append("- 强项：" + _named(list(reversed(top))))
+        lines.append("- 弱项：" + _named(bottom))
 
     return "\n".join(lines)
 
@@ -0,0 +1,185 @@
+import os
+import sys
+import csv
+import copy
+import time
+import argparse
+import itertools
+from typing import Any, Dict, List, Sequence, Tuple
+import pandas as pd
+import yaml
+from .config_loader import _build_weights, load_config
+from .result_index import read_leaf_table
+from .score_table import from_leaf_records, score_totals_batch
+
+
+TOTAL_COLUMNS = ("安全", "质量", "专业技术", "通用综合", "特色场景", "总分")
+
+
+def load_leaf_table(result_root: str) -> pd.DataFrame:
+    """读取最近一次评分保存的叶子表（result_root/leaf_table.json），不读取原始结果与评审缓存。"""
+    records = read_leaf_table(result_root)
+    if records is None:
+        fp = os.path.join(result_root, "leaf_table.json")
+        raise FileNotFoundError(f"{fp} not found; run main.py once to score the results")
+    return from_leaf_records(records)
+
+
+def _flatten(weights: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for k, v in weights.items():
+        if isinstance(v, dict):
+            out.update(_flatten(v, f"{prefix}{k}."))
+        else:
+            out[f"{prefix}{k}"] = v
+    return out
+
+
+def _override(weights: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    # 在完整权重上覆盖部分取值：嵌套块逐项合并，“专业技术.问答”形式的键指向嵌套项。
+    out = copy.deepcopy(weights)
+    for k, v in changes.items():
+        target, keys = out, str(k).split(".")
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        if isinstance(v, dict) and isinstance(target.get(keys[-1]), dict):
+            target[keys[-1]] = _override(target[keys[-1]], v)
+        else:
+            target[keys[-1]] = v
+    return _build_weights(out)
+
+
+def _parse_grid(specs: Sequence[str]) -> List[Tuple[str, List[float]]]:
+    grid: List[Tuple[str, List[float]]] = []
+    for spec in specs:
+        key, sep, values = spec.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"invalid --grid {spec!r}, expected KEY=v1,v2,...")
+        grid.append((key.strip(), [float(v) for v in values.split(",") if v.strip()]))
+    return grid
+
+
+def expand_configurations(
+    base: Sequence[Tuple[str, Dict[str, Any]]],
+    sweep: Any = None,
+    grid: Sequence[Tuple[str, List[float]]] = (),
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    展开待比较的权重配置，返回 (名称, 完整权重) 列表。
+
+    - base：各配置文件的权重（名称为文件名）；
+    - sweep：YAML 中的列表 [{name, weights}] 或映射 {名称: 权重}，每项为对第一个 base 权重的部分覆盖；
+    - grid：[(键, 取值列表)]，对以上每个配置再取全部组合，名称追加“键=取值”。
+    """
+    configs = list(base)
+    if sweep:
+        entries = sweep.items() if isinstance(sweep, dict) else (
+            (e.get("name") or f"sweep{i}", e.get("weights") or {})
+            for i, e in enumerate(sweep)
+        )
+        configs += [
+            (str(name), _override(base[0][1], changes or {})) for name, changes in entries
+        ]
+    if not grid:
+        return configs
+    out: List[Tuple[str, Dict[str, Any]]] = []
+    for name, weights in configs:
+        for combo in itertools.product(*(values for _k, values in grid)):
+            changes = {k: v for (k, _values), v in zip(grid, combo)}
+            label = ",".join(f"{k}={v:g}" for k, v in changes.items())
+            out.append((f"{name}[{label}]", _override(weights, changes)))
+    return out
+
+
+def rescore(
+    leaf: pd.DataFrame, configs: Sequence[Tuple[str, Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """对同一叶子表批量计算各配置的 totals，每个配置一行（配置名、各部分得分与展开后的权重）。"""
+    totals = score_totals_batch(leaf, [w for _name, w in configs])
+    rows: List[Dict[str, Any]] = []
+    for (name, weights), t in zip(configs, totals.itertuples(index=False)):
+        row: Dict[str, Any] = {"配置": name}
+        row.update({c: round(float(v), 2) for c, v in zip(TOTAL_COLUMNS, t)})
+        row.update(_flatten(weights))
+        rows.append(row)
+    return rows
+
+
+def write_rescore_csv(rows: List[Dict[str, Any]], out_path: str) -> str:
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    headers: List[str] = []
+    for r in rows:
+        headers += [k for k in r if k not in headers]
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=headers)
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute total scores for many weight configurations from the saved leaf table."
+    )
+    parser.add_argument(
+        "--config_yaml_path",
+        action="append",
+        default=None,
+        help="Configuration YAML whose weights block is one configuration (repeatable; default ./config/test.yaml).",
+    )
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        default=None,
+        help="YAML with a list of {name, weights} (or a name -> weights mapping) overriding the first configuration.",
+    )
+    parser.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        help="Cartesian sweep of one weight, e.g. 专业技术权重=30,40,50 or 专业技术.问答=20,30 (repeatable).",
+    )
+    parser.add_argument(
+        "--result_root",
+        type=str,
+        default=None,
+        help="Results directory (defaults to result_output_path of the first configuration).",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Output CSV (defaults to <result_root>/rescore.csv).",
+    )
+    args = parser.parse_args()
+
+    paths = args.config_yaml_path or ["./config/test.yaml"]
+    cfgs = [load_config(p) for p in paths]
+    base = [
+        (os.path.splitext(os.path.basename(p))[0], c["weights"]) for p, c in zip(paths, cfgs)
+    ]
+    sweep = None
+    if args.sweep:
+        with open(args.sweep, "r", encoding="utf-8") as f:
+            sweep = yaml.safe_load(f)
+    configs = expand_configurations(base, sweep, _parse_grid(args.grid))
+
+    result_root = args.result_root or cfgs[0].get("result_output_path") or "results"
+    try:
+        leaf = load_leaf_table(result_root)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+    started = time.perf_counter()
+    rows = rescore(leaf, configs)
+    elapsed = time.perf_counter() - started
+    out_path = args.output or os.path.join(result_root, "rescore.csv")
+    write_rescore_csv(rows, out_path)
+    print(f"Rescored {len(rows)} configurations in {elapsed * 1000:.1f} ms.")
+    print(out_path)
+
+
+if __name__ == "__main__":
+    # python -m pipeline.rescore --config_yaml_path config/a.yaml --grid 专业技术权重=30,40,50
+    main()
@@ -0,0 +1,230 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .jsonio import load_file, map_ordered
+from .question import Question, to_questions
+
+
+# 评分只用到的字段；思考过程、提示词、heavy_think_content 等大字段不进入索引。
+SCORING_FIELDS = frozenset(
+    (
+        "id",
+        "题型",
+        "答案",
+        "模型回答",
+        "得分比例",
+        "问题",
+        "领域",
+        "安全类型",
+        "安全专项",
+        "分部工程",
+        "子分部工程",
+        "分项工程",
+        "板块类型",
+        "专项",
+        "专业类别",
+        "专业专项",
+        "子专业专项",
+        "细分子专业",
+    )
+)
+
+# 索引格式或 SCORING_FIELDS 变化时递增，旧索引整体重建。
+_INDEX_VERSION = 1
+
+# 部分汇总（叶子计数表）的格式或计数列变化时递增。
+_PARTIAL_VERSION = 1
+
+
+def _signature(fp: str) -> List[int]:
+    st = os.stat(fp)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _project(data: Any) -> List[Dict[str, Any]]:
+    # 保持原字段顺序，只保留评分字段；非 dict 元素与 to_questions 一样跳过。
+    return [
+        {k: v for k, v in it.items() if k in SCORING_FIELDS}
+        for it in data
+        if isinstance(it, dict)
+    ]
+
+
+def _read_index(index_fp: str, signature: List[int]) -> Optional[List[Dict[str, Any]]]:
+    if not os.path.exists(index_fp):
+        return None
+    try:
+        data = load_file(index_fp)
+    except Exception:
+        return None
+    if (
+        isinstance(data, dict)
+        and data.get("version") == _INDEX_VERSION
+        and data.get("signature") == signature
+        and isinstance(data.get("items"), list)
+    ):
+        return data["items"]
+    return None
+
+
+def _write_index(index_fp: str, signature: List[int], items: List[Dict[str, Any]]):
+    try:
+        os.makedirs(os.path.dirname(index_fp), exist_ok=True)
+        tmp = index_fp + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": _INDEX_VERSION, "signature": signature, "items": items},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, index_fp)
+    except OSError:
+        pass
+
+
+def _load_projected(job: Tuple[str, str]) -> Optional[List[Dict[str, Any]]]:
+    # 返回某个结果文件的评分字段投影；索引过期时读取原始文件并重建索引，原始文件不可读时返回 None。
+    fp, index_fp = job
+    try:
+        signature = _signature(fp)
+    except OSError:
+        return None
+    items = _read_index(index_fp, signature)
+    if items is not None:
+        return items
+    try:
+        items = _project(load_file(fp))
+    except Exception:
+        return None
+    _write_index(index_fp, signature, items)
+    return items
+
+
+def list_result_files(root: str) -> List[Tuple[str, str]]:
+    """root/raw 下全部结果文件的 (路径, 相对 raw/ 的路径)，按遍历顺序排列。"""
+    base = os.path.join(root, "raw")
+    files: List[Tuple[str, str]] = []
+    for r, _d, names in os.walk(base):
+        for fn in names:
+            if not fn.endswith(".json"):
+                continue
+            fp = os.path.join(r, fn)
+            files.append((fp, os.path.normpath(os.path.relpath(fp, base))))
+    return files
+
+
+def load_scoring_files(
+    root: str, files: Sequence[Tuple[str, str]]
+) -> List[Optional[List[Question]]]:
+    """
+    逐个文件读取评分字段投影，与 files 等长；原始文件不可读的位置为 None。
+
+    - 每个结果文件的投影保存为 root/index/<rel>，以原始文件的 mtime 与大小判断是否过期；
+    - 索引有效时不再读取原始文件；过期时逐个文件解析并立即丢弃大字段，
+      内存中只保留投影，不随思考过程的体积增长；
+    - Question 上 src 为原始文件路径、rel 为其在 raw/ 下的相对路径。
+    """
+    index_base = os.path.join(root, "index")
+    jobs = [(fp, os.path.join(index_base, rel)) for fp, rel in files]
+    return [
+        None if items is None else to_questions(items, src=fp, rel=rel)
+        for (fp, rel), items in zip(files, map_ordered(_load_projected, jobs))
+    ]
+
+
+def read_scoring_items(root: str) -> List[Question]:
+    """读取 root/raw 下全部结果，只保留评分所需字段（SCORING_FIELDS，见 load_scoring_files）。"""
+    out: List[Question] = []
+    for items in load_scoring_files(root, list_result_files(root)):
+        if items is not None:
+            out.extend(items)
+    return out
+
+
+def partial_key(
+    fp: str,
+    judge: Optional[List[int]],
+    judge_names: Sequence[str],
+    ensemble: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """
+    结果文件部分汇总的有效性键：原始文件的 mtime/大小、该文件评审结果的版本
+    （JudgeStore.signature）、评审模型名以及自适应集成的设置（完整集成时为 None）。
+
+    未配置评审模型时问答分数与评审结果无关，judge 传入 None。
+    """
+    return {
+        "version": _PARTIAL_VERSION,
+        "raw": _signature(fp),
+        "judge": judge,
+        "judges": sorted(judge_names),
+        "ensemble": ensemble,
+    }
+
+
+def read_partial(root: str, rel: str, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """root/partials/<rel> 中与 key 一致的部分汇总，不存在、不可读或已过期时返回 None。"""
+    fp = os.path.join(root, "partials", rel)
+    if not os.path.exists(fp):
+        return None
+    try:
+        data = load_file(fp)
+    except Exception:
+        return None
+    if isinstance(data, dict) and data.get("key") == key:
+        return data
+    return None
+
+
+def _write_json(fp: str, data: Any):
+    try:
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+        tmp = fp + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp, fp)
+    except OSError:
+        pass
+
+
+def write_partial(root: str, rel: str, data: Dict[str, Any]):
+    _write_json(os.path.join(root, "partials", rel), data)
+
+
+def write_leaf_table(root: str, records: List[List[Any]]):
+    """保存最近一次评分合并后的叶子表（root/leaf_table.json），供 rescore 不读取结果直接重算。"""
+    _write_json(
+        os.path.join(root, "leaf_table.json"),
+        {"version": _PARTIAL_VERSION, "leaves": records},
+    )
+
+
+def read_leaf_table(root: str) -> Optional[List[List[Any]]]:
+    """write_leaf_table 保存的叶子行；不存在、不可读或格式版本不同时返回 None。"""
+    fp = os.path.join(root, "leaf_table.json")
+    if not os.path.exists(fp):
+        return None
+    try:
+        data = load_file(fp)
+    except Exception:
+        return None
+    if isinstance(data, dict) and data.get("version") == _PARTIAL_VERSION:
+        return data.get("leaves")
+    return None
+
+
+def write_judge_ensemble(root: str, data: Dict[str, Any]):
+    """保存自适应集成的逐题记录与汇总（root/judge_ensemble.json）。"""
+    _write_json(os.path.join(root, "judge_ensemble.json"), data)
+
+
+def read_judge_ensemble(root: str) -> Optional[Dict[str, Any]]:
+    """write_judge_ensemble 保存的记录；不存在或不可读时返回 None。"""
+    fp = os.path.join(root, "judge_ensemble.json")
+    if not os.path.exists(fp):
+        return None
+    try:
+        data = load_file(fp)
+    except Exception:
+        return None
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,118 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from .dataset_loader import stratified_order
+from .evaluator import evaluate
+from .question import Question
+from .report import _TOTAL_ROWS
+from .scoring import _empty_usage, _merge_usage, compute_scores
+
+
+def _top_level(rows: List[Dict[str, Any]]) -> Dict[str, List[Optional[float]]]:
+    # 总览各项（总分与各部分“整体”行）的 [分数, 下限, 上限]，按 _TOTAL_ROWS 的顺序。
+    by_key = {(r.get("部分"), r.get("层级"), r.get("名称")): r for r in rows}
+    out: Dict[str, List[Optional[float]]] = {}
+    for name, key in _TOTAL_ROWS.items():
+        r = by_key.get(key)
+        if r is not None:
+            out[name] = [r.get("分数"), r.get("下限"), r.get("上限")]
+    return out
+
+
+def _width(score: List[Optional[float]]) -> float:
+    _s, lo, hi = score
+    if lo is None or hi is None:
+        return float("inf")
+    return float(hi) - float(lo)
+
+
+async def evaluate_in_rounds(
+    questions: List[Question],
+    model_cfg: Dict[str, Any],
+    judges: List[Dict[str, Any]],
+    cfg: Dict[str, Any],
+    result_root: str,
+) -> Tuple[
+    List[Dict[str, Any]], Dict[str, float], Dict[str, Any], Dict[str, Any], Dict[str, Any]
+]:
+    """
+    分层抽样、分轮测评，直到总览各项的置信区间都不宽于 sampling_ci_width，或题目用完。
+
+    - 题目按 stratified_order 排序，每轮在已测题目之外再取 sampling_round_size 道
+      （累计样本仍按原题目顺序写入结果文件，已测题目逐题复用，见 evaluate 的 resume_items）；
+    - 第一轮至少包含每层 sampling_min_per_stratum 道题（层内不足时取全部）：
+      缺层时该单元按 0 分计入，部分得分偏低；只有一道题的单元重抽样没有波动，区间偏窄；
+    - 每轮评分并计算 bootstrap 区间（ci_samples 为 0 时按 10000 次）；
+    - 返回最后一轮的 (rows, totals, 测评用量, 评审用量, 抽样记录)，
+      抽样记录同时保存为 result_root/sampling.json；
+    - 评审用量为各轮之和（已评审的题在之后各轮中用量记为 0，不会重复计入）。
+    """
+    en_mode = bool(cfg.get("en_mode"))
+    round_size = int(cfg["sampling_round_size"])
+    target = float(cfg["sampling_ci_width"])
+    ci_samples = int(cfg.get("ci_samples") or 10000)
+    ordered, sizes = stratified_order(
+        questions,
+        seed=int(cfg["sampling_seed"]),
+        min_per_stratum=int(cfg["sampling_min_per_stratum"]),
+    )
+    first = sum(min(n, int(cfg["sampling_min_per_stratum"])) for n in sizes)
+    position = {id(q): i for i, q in enumerate(questions)}
+
+    history: Dict[str, Any] = {
+        "total": len(questions),
+        "strata": len(sizes),
+        "target_width": target,
+        "level": cfg["ci_level"],
+        "seed": cfg["sampling_seed"],
+        "rounds": [],
+        "stopped": None,
+    }
+    judge_usage: Dict[str, Dict[str, int]] = {}
+    n = max(0, first - round_size)
+    while True:
+        n = min(n + round_size, len(ordered))
+        sample = sorted(ordered[:n], key=lambda q: position[id(q)])
+        _paths, eval_usage = await evaluate(
+            sample,
+            model_cfg,
+            result_root,
+            en_mode=en_mode,
+            dedup=bool(cfg.get("dedup")),
+            resume_items=True,
+        )
+        rows, totals, round_usage = await compute_scores(
+            result_root,
+            judges,
+            cfg["weights"],
+            en_mode=en_mode,
+            ci_samples=ci_samples,
+            ci_level=cfg["ci_level"],
+            judge_cache=cfg["judge_cache"],
+            judge_ensemble=cfg["judge_ensemble"],
+            ensemble_min=cfg["judge_ensemble_min"],
+            ensemble_tolerance=cfg["judge_ensemble_tolerance"],
+        )
+        for model, usage in round_usage.items():
+            _merge_usage(judge_usage.setdefault(model, _empty_usage()), usage)
+        scores = _top_level(rows)
+        widest = max(scores, key=lambda k: _width(scores[k])) if scores else None
+        width = _width(scores[widest]) if widest else float("inf")
+        history["rounds"].append(
+            {"round": len(history["rounds"]) + 1, "questions": n, "scores": scores}
+        )
+        print(
+            f"Sampling round {len(history['rounds'])}: {n}/{len(ordered)} questions, "
+            f"widest interval {widest} {width:.2f} (target {target:g})."
+        )
+        if width <= target:
+            history["stopped"] = "converged"
+            break
+        if n >= len(ordered):
+            history["stopped"] = "exhausted"
+            break
+
+    os.makedirs(result_root, exist_ok=True)
+    with open(os.path.join(result_root, "sampling.json"), "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+    return rows, totals, eval_usage, judge_usage, history
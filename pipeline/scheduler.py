@@ -0,0 +1,459 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+from loguru import logger
+
+T = TypeVar("T")
+
+Root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+# 各模型跨运行的耗时与 token 统计（按 model_name），每次测评结束时更新，新结果目录也能按历史排序。
+HistoryPath = os.path.join(Root, ".cache", "schedule", "history.json")
+
+# 还没有该题型的历史 usage 时，期望生成长度按 max_tokens 的比例估计：
+# 问答题需要完整作答，客观题只输出选项或对错；未列出的题型取 _DEFAULT_COMPLETION_RATIO。
+_COMPLETION_PRIORS = {"问答题": 0.25, "多选题": 0.06, "单选题": 0.04, "判断题": 0.03}
+_DEFAULT_COMPLETION_RATIO = 0.25
+# 从历史文件恢复的统计最多按该次数（耗时为秒数）计权，当前结果中的观测很快占主导。
+_HISTORY_WEIGHT = 20
+# 历史 usage 的 EWMA 平滑系数。
+_EWMA_ALPHA = 0.2
+# 没有任何历史耗时时，按该生成速度（tokens/s）把期望 token 数折算为秒。
+_DEFAULT_TOKENS_PER_SECOND = 30.0
+
+_TOKEN_BUDGETS: Dict[Tuple[str, str], "TokenBudget"] = {}
+
+
+class CostModel:
+    """
+    估计一次调用的 token 开销：提示词 token 数 + 该题型的期望生成 token 数。
+
+    - 提示词 token 数按“字符数 / 每 token 字符数”估计，比例从历史 usage 中学习；
+    - 期望生成 token 数按题型分别学习（EWMA），没有历史时按题型取 max_tokens 的一部分
+      （_COMPLETION_PRIORS，问答题远多于客观题）。
+    """
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max(1, int(max_tokens or 32768))
+        self.chars_per_token = 1.0
+        self.completion: Dict[str, float] = {}
+
+    def observe(self, qtype: str, prompt_chars: int, usage: Any):
+        if not isinstance(usage, dict):
+            return
+        completion = int(usage.get("completion_tokens", 0) or 0)
+        prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
+        if completion <= 0 and prompt_tokens <= 0:
+            return
+        if prompt_tokens > 0 and prompt_chars > 0:
+            ratio = prompt_chars / prompt_tokens
+            self.chars_per_token += _EWMA_ALPHA * (ratio - self.chars_per_token)
+        prev = self.completion.get(qtype)
+        self.completion[qtype] = (
+            float(completion) if prev is None else prev + _EWMA_ALPHA * (completion - prev)
+        )
+
+    def expected_completion(self, qtype: str) -> int:
+        v = self.completion.get(qtype)
+        if v is None:
+            v = self.max_tokens * _COMPLETION_PRIORS.get(qtype, _DEFAULT_COMPLETION_RATIO)
+        return int(min(self.max_tokens, v))
+
+    def expected(self, qtype: str, prompt_chars: int) -> int:
+        prompt_tokens = int(prompt_chars / max(self.chars_per_token, 0.1))
+        return prompt_tokens + self.expected_completion(qtype)
+
+
+class LatencyModel:
+    """
+    估计一次调用的耗时（秒），用于“最长预计耗时优先”排序与 makespan 预测。
+
+    - 有该题型的历史耗时（raw 结果中的 latency）时：按题型平均耗时，并按提示词长度相对该题型
+      平均长度做线性修正；
+    - 否则用 CostModel 的期望 token 数除以历史平均生成速度估计；
+    - state / restore 用于跨运行保存与恢复（见 load_history / save_history）。
+    """
+
+    def __init__(self, cost_model: CostModel):
+        self.cost_model = cost_model
+        self.by_type: Dict[str, List[float]] = {}
+        self.tokens = 0
+        self.seconds = 0.0
+
+    def observe(self, qtype: str, prompt_chars: int, latency: Any, usage: Any = None):
+        try:
+            latency = float(latency)
+        except (TypeError, ValueError):
+            return
+        if latency <= 0:
+            return
+        st = self.by_type.setdefault(qtype, [0.0, 0.0, 0.0])
+        st[0] += latency
+        st[1] += prompt_chars
+        st[2] += 1
+        if isinstance(usage, dict):
+            self.tokens += int(usage.get("completion_tokens", 0) or 0)
+            self.seconds += latency
+
+    def estimate(self, qtype: str, prompt_chars: int) -> float:
+        st = self.by_type.get(qtype)
+        if st and st[2]:
+            mean_latency = st[0] / st[2]
+            mean_chars = st[1] / st[2]
+            scale = prompt_chars / mean_chars if mean_chars > 0 else 1.0
+            return mean_latency * (0.5 + 0.5 * scale)
+        tps = self.tokens / self.seconds if self.seconds > 0 else _DEFAULT_TOKENS_PER_SECOND
+        return self.cost_model.expected(qtype, prompt_chars) / max(tps, 1e-6)
+
+    def has_history(self) -> bool:
+        """是否有任何历史耗时或 usage；没有时估计完全来自题型先验与提示词长度。"""
+        return bool(self.by_type or self.seconds > 0 or self.cost_model.completion)
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "chars_per_token": self.cost_model.chars_per_token,
+            "completion": dict(self.cost_model.completion),
+            "by_type": {
+                q: [st[0] / st[2], st[1] / st[2], st[2]]
+                for q, st in self.by_type.items()
+                if st[2]
+            },
+            "tokens_per_second": self.tokens / self.seconds if self.seconds > 0 else None,
+        }
+
+    def restore(self, state: Dict[str, Any]):
+        # 历史统计按至多 _HISTORY_WEIGHT 次观测计入，之后的 observe 在其上累加。
+        self.cost_model.chars_per_token = float(
+            state.get("chars_per_token") or self.cost_model.chars_per_token
+        )
+        for q, v in (state.get("completion") or {}).items():
+            self.cost_model.completion[q] = float(v)
+        for q, (mean_latency, mean_chars, n) in (state.get("by_type") or {}).items():
+            w = min(float(n), _HISTORY_WEIGHT)
+            self.by_type[q] = [float(mean_latency) * w, float(mean_chars) * w, w]
+        tps = state.get("tokens_per_second")
+        if tps:
+            self.tokens = int(float(tps) * _HISTORY_WEIGHT)
+            self.seconds = float(_HISTORY_WEIGHT)
+
+
+def _read_history(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable schedule history {path}: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_history(key: str, model: LatencyModel, path: str = HistoryPath) -> bool:
+    """用 path 中 key（模型名）的历史统计初始化 model；没有记录时返回 False。"""
+    state = _read_history(path).get(key)
+    if not isinstance(state, dict):
+        return False
+    try:
+        model.restore(state)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Ignoring schedule history for {key}: {e}")
+        return False
+    return True
+
+
+def save_history(key: str, model: LatencyModel, path: str = HistoryPath):
+    """把 model 的当前统计写入 path 中 key 的记录（其他模型的记录保持不变）。"""
+    if not model.has_history():
+        return
+    data = _read_history(path)
+    data[key] = model.state()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Failed to write schedule history {path}: {e}")
+
+
+def order_by_cost(
+    entries: Sequence[T],
+    cost_fn: Callable[[T], float],
+    policy: str,
+    group_fn: Optional[Callable[[T], Any]] = None,
+) -> List[T]:
+    """
+    policy 为 longest_first 时按预计开销降序（稳定排序），否则保持原有顺序。
+
+    - 给定 group_fn（如按提示词模板）时，同组任务连续排列：组间按总开销降序，组内按上述规则；
+    - group_fn 返回 None 的任务视为同一组。
+    """
+    if group_fn is None:
+        if policy != "longest_first":
+            return list(entries)
+        return sorted(entries, key=cost_fn, reverse=True)
+    groups: Dict[Any, List[T]] = {}
+    for e in entries:
+        groups.setdefault(group_fn(e), []).append(e)
+    ordered = [order_by_cost(g, cost_fn, policy) for g in groups.values()]
+    if policy == "longest_first":
+        ordered.sort(key=lambda g: sum(cost_fn(e) for e in g), reverse=True)
+    return [e for g in ordered for e in g]
+
+
+def predict_makespan(costs: Sequence[float], slots: int) -> float:
+    """按给定顺序把任务依次派给最早空闲的槽位，返回预计总耗时。"""
+    free_at = [0.0] * max(1, int(slots))
+    for c in costs:
+        t = heapq.heappop(free_at)
+        heapq.heappush(free_at, t + c)
+    return max(free_at)
+
+
+class ScheduleLog:
+    """
+    记录一个阶段的排序策略、预计 makespan 与实际耗时，结束时写日志。
+
+    history=False 表示没有任何历史耗时或 usage（预计开销只来自题型先验与提示词长度），开始时写日志说明。
+    """
+
+    def __init__(
+        self, stage: str, policy: str, costs: Sequence[float], slots: int, history: bool = True
+    ):
+        self.stage = stage
+        self.policy = policy
+        self.slots = max(1, int(slots))
+        self.work = float(sum(costs))
+        self.predicted = predict_makespan(costs, self.slots)
+        if not history and costs:
+            logger.info(
+                f"Schedule {stage} | policy: {policy} | no latency history: "
+                f"estimates use 题型 priors and prompt length only"
+            )
+        self._started = time.monotonic()
+
+    def finish(self) -> Dict[str, Any]:
+        actual = time.monotonic() - self._started
+        bound = self.work / self.slots
+        logger.info(
+            f"Schedule {self.stage} | policy: {self.policy} | "
+            f"predicted makespan: {self.predicted:.1f}s "
+            f"(work/concurrency: {bound:.1f}s) | actual: {actual:.1f}s"
+        )
+        return {
+            "policy": self.policy,
+            "predicted_makespan": round(self.predicted, 3),
+            "work_over_concurrency": round(bound, 3),
+            "actual_makespan": round(actual, 3),
+        }
+
+
+class TokenBudget:
+    """
+    按端点限制在途的期望 token 总量（近似服务端 KV 占用），按到达顺序放行。
+
+    单个请求的开销超过总预算时按总预算计，即只能在端点空闲时单独执行。
+    多副本（base_url 为列表）时每个副本各有一个预算，由 async_retry_llm 在选定副本后准入。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self.inflight = 0
+        self.peak = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    def fits(self, cost: int) -> bool:
+        """当前是否可以不排队直接放行 cost。"""
+        cost = max(1, min(int(cost), self.capacity))
+        return not self._waiters and self.inflight + cost <= self.capacity
+
+    def _grant(self, cost: int):
+        self.inflight += cost
+        self.peak = max(self.peak, self.inflight)
+
+    async def acquire(self, cost: int) -> int:
+        cost = max(1, min(int(cost), self.capacity))
+        if not self._waiters and self.inflight + cost <= self.capacity:
+            self._grant(cost)
+            return cost
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((cost, fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(cost)
+            elif (cost, fut) in self._waiters:
+                self._waiters.remove((cost, fut))
+            raise
+        return cost
+
+    def release(self, cost: int):
+        self.inflight = max(0, self.inflight - cost)
+        while self._waiters:
+            head_cost, fut = self._waiters[0]
+            if self.inflight + head_cost > self.capacity:
+                break
+            self._waiters.popleft()
+            if not fut.done():
+                self._grant(head_cost)
+                fut.set_result(None)
+
+
+def _largest_remainder(total: int, weights: Dict[str, float]) -> Dict[str, int]:
+    # 按权重把 total 个槽位分给各通道：先取整数部分，剩余槽位依次给小数部分最大的通道
+    # （相同时按 weights 的顺序），结果之和恰为 total。
+    wsum = sum(weights.values())
+    if wsum <= 0:
+        return {}
+    exact = {k: total * w / wsum for k, w in weights.items()}
+    quota = {k: int(v) for k, v in exact.items()}
+    rest = total - sum(quota.values())
+    for k in sorted(exact, key=lambda k: quota[k] - exact[k])[:rest]:
+        quota[k] += 1
+    return quota
+
+
+class LaneScheduler:
+    """
+    按通道（题型）划分的并发槽位，替代单一信号量，避免长耗时题型占满全部槽位。
+
+    - 每个通道按权重分得 quota 个保底槽位，按最大余数法取整，各通道 quota 之和等于 total；
+      通道数多于 total 时权重小的通道 quota 可能为 0；
+    - weights 中没有的通道 quota 为 0，只能使用其他通道空闲的槽位；
+    - 有空闲槽位时，未达 quota 且有排队任务的通道优先获得；
+    - 其他通道没有低于 quota 的排队任务时，空闲槽位可被任意通道“借用”（work-stealing）。
+    """
+
+    def __init__(self, total: int, weights: Optional[Dict[str, float]] = None):
+        self.total = max(1, int(total))
+        weights = {str(k): float(v) for k, v in (weights or {}).items() if v}
+        self.quota = _largest_remainder(self.total, weights)
+        self.active: Dict[str, int] = {}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._started = time.monotonic()
+
+    def _lane(self, lane: str) -> str:
+        if lane not in self.active:
+            self.active[lane] = 0
+            self._waiters[lane] = deque()
+            self._stats[lane] = {
+                "granted": 0,
+                "stolen": 0,
+                "peak": 0,
+                "busy_seconds": 0.0,
+            }
+        return lane
+
+    def _free(self) -> int:
+        return self.total - sum(self.active.values())
+
+    def _under_quota(self, lane: str) -> bool:
+        return self.active[lane] < self.quota.get(lane, 0)
+
+    def _grant(self, lane: str):
+        self.active[lane] += 1
+        st = self._stats[lane]
+        st["granted"] += 1
+        if self.active[lane] > self.quota.get(lane, 0):
+            st["stolen"] += 1
+        st["peak"] = max(st["peak"], self.active[lane])
+
+    def _pick_lane(self) -> Optional[str]:
+        waiting = [k for k, q in self._waiters.items() if q]
+        if not waiting:
+            return None
+        owed = [k for k in waiting if self._under_quota(k)]
+        pool = owed or waiting
+        return min(pool, key=lambda k: self.active[k] / max(1, self.quota.get(k, 0)))
+
+    def _dispatch(self):
+        while self._free() > 0:
+            lane = self._pick_lane()
+            if lane is None:
+                return
+            fut = self._waiters[lane].popleft()
+            if fut.done():
+                continue
+            self._grant(lane)
+            fut.set_result(None)
+
+    async def acquire(self, lane: str):
+        lane = self._lane(lane)
+        if not self._waiters[lane] and self._free() > 0:
+            blocked = any(
+                q and self._under_quota(k) for k, q in self._waiters.items() if k != lane
+            )
+            if self._under_quota(lane) or not blocked:
+                self._grant(lane)
+                return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(lane, 0.0)
+            raise
+
+    def release(self, lane: str, elapsed: float):
+        self.active[lane] = max(0, self.active[lane] - 1)
+        self._stats[lane]["busy_seconds"] += elapsed
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        await self.acquire(lane)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(lane, time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各通道的保底槽位、放行次数、借用次数、峰值并发及占全部槽位时间的比例。"""
+        wall = max(time.monotonic() - self._started, 1e-9)
+        out: Dict[str, Dict[str, Any]] = {}
+        for lane, st in self._stats.items():
+            out[lane] = {
+                "quota": self.quota.get(lane, 0),
+                "granted": st["granted"],
+                "stolen": st["stolen"],
+                "peak": st["peak"],
+                "busy_seconds": round(st["busy_seconds"], 3),
+                "utilisation": round(st["busy_seconds"] / (self.total * wall), 4),
+            }
+        return out
+
+
+def get_token_budget(
+    base_url: Optional[str], model: Optional[str], capacity: Optional[int]
+) -> Optional[TokenBudget]:
+    """返回端点 (base_url, 模型) 共享的 TokenBudget；capacity（max_inflight_tokens）为空时返回 None。"""
+    if not capacity:
+        return None
+    key = (str(base_url or ""), str(model or ""))
+    budget = _TOKEN_BUDGETS.get(key)
+    if budget is None:
+        budget = TokenBudget(int(capacity))
+        _TOKEN_BUDGETS[key] = budget
+    return budget
+
+
+@asynccontextmanager
+async def admitted(budget: Optional[TokenBudget], cost: int):
+    if budget is None:
+        yield
+        return
+    granted = await budget.acquire(cost)
+    try:
+        yield
+    finally:
+        budget.release(granted)
@@ -0,0 +1,794 @@
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .question import TYPE_CODES
+
+
+# 叶子表的层级列与计数列：每个叶子为 (部分, l1..l5) 的一个取值组合。
+# - 安全：l1 安全类型、l2 安全专项；质量：l1 分部工程、l2 子分部工程、l3 分项工程；
+# - 通用综合：l1 板块类型；特色场景：l1 领域、l2 专业类别（机场为“专项”）、l3..l5 专业专项/子专业专项/细分子专业；
+# - *_n / *_k 为该题型可判定的题数与答对题数，qa_n / qa_sum / qa_sumsq 为有评审分数的问答题数、分数和与平方和。
+LEVELS = ("l1", "l2", "l3", "l4", "l5")
+KEYS = ("部分",) + LEVELS
+COUNTS = (
+    "n",
+    "single_n",
+    "single_k",
+    "multi_n",
+    "multi_k",
+    "judge_n",
+    "judge_k",
+    "qa_n",
+    "qa_sum",
+    "qa_sumsq",
+)
+
+_JUDGE_NORM = {
+    **{x: "正确" for x in ("正确", "对", "是", "true", "True")},
+    **{x: "错误" for x in ("错误", "错", "否", "false", "False")},
+}
+_LETTERS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+# 行排序时未使用的层级取该值，使父节点排在其全部子节点之后。
+_LAST = np.iinfo(np.int64).max
+
+
+# 构建列式表时读取的原始字段。
+_FIELDS = (
+    "答案",
+    "模型回答",
+    "领域",
+    "安全类型",
+    "安全专项",
+    "分部工程",
+    "子分部工程",
+    "分项工程",
+    "专项",
+    "专业类别",
+    "专业专项",
+    "子专业专项",
+    "细分子专业",
+    "板块类型",
+)
+
+_type_of = np.frompyfunc(type, 1, 1)
+
+
+def _text(v: Any) -> str:
+    return str(v or "")
+
+
+def _raw_columns(items: Sequence[Any]) -> Dict[str, np.ndarray]:
+    # 相同字段布局的题目共享键元组：按布局分组，用 itemgetter 一次取出所需字段后转置为列，缺失字段为 None。
+    groups: Dict[int, Tuple[Tuple[str, ...], List[int]]] = {}
+    for i, it in enumerate(items):
+        keys = it.keys()
+        groups.setdefault(id(keys), (keys, []))[1].append(i)
+    cols = {f: np.full(len(items), None, dtype=object) for f in _FIELDS}
+    for keys, pos in groups.values():
+        present = [f for f in _FIELDS if f in keys]
+        if not present:
+            continue
+        getter = itemgetter(*(keys.index(f) for f in present))
+        rows = [getter(items[i].values()) for i in pos]
+        if len(present) == 1:
+            rows = [(r,) for r in rows]
+        index = np.asarray(pos)
+        for f, column in zip(present, zip(*rows)):
+            values = np.empty(len(pos), dtype=object)
+            values[:] = column
+            cols[f][index] = values
+    return cols
+
+
+def _text_array(a: np.ndarray) -> np.ndarray:
+    # 等价于逐个 str(v or "")：字符串原样保留，None 为空串，其余类型逐个转换。
+    types = _type_of(a)
+    is_str = types == str
+    if is_str.all():
+        return a
+    out = a.copy()
+    none = types == type(None)
+    out[none] = ""
+    other = ~is_str & ~none
+    if other.any():
+        out[other] = [_text(v) for v in a[other]]
+    return out
+
+
+def _map_unique(a: np.ndarray, fn: Callable[[str], str]) -> np.ndarray:
+    # 对取值种类很少的文本列，只对每个不同取值调用一次 fn。
+    if not len(a):
+        return a
+    codes, uniques = pd.factorize(a)
+    return np.array([fn(u) for u in uniques], dtype=object)[codes]
+
+
+def _leaf_columns(text: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    按领域把题目归入叶子 (部分, l1..l5)；不属于安全/质量/医疗/机场且没有板块类型的题目部分为空。
+
+    机场只按“专项”分组，映射为专业类别，其余层级为空。
+    """
+    domain = text["领域"]
+    sec = domain == "安全"
+    qual = domain == "质量"
+    airport = domain == "机场"
+    medical = domain == "医疗"
+    special = airport | medical
+    general = ~(sec | qual | special) & (text["板块类型"] != "")
+
+    def pick(*cases: Tuple[np.ndarray, Any]) -> np.ndarray:
+        return np.select(
+            [c for c, _ in cases], [v for _, v in cases], default=""
+        ).astype(object)
+
+    return {
+        "部分": pick((sec, "安全"), (qual, "质量"), (special, "特色场景"), (general, "通用综合")),
+        "l1": pick(
+            (sec, text["安全类型"]),
+            (qual, text["分部工程"]),
+            (special, domain),
+            (general, text["板块类型"]),
+        ),
+        "l2": pick(
+            (sec, text["安全专项"]),
+            (qual, text["子分部工程"]),
+            (airport, text["专项"]),
+            (medical, text["专业类别"]),
+        ),
+        "l3": pick((qual, text["分项工程"]), (medical, text["专业专项"])),
+        "l4": pick((medical, text["子专业专项"])),
+        "l5": pick((medical, text["细分子专业"])),
+    }
+
+
+def _judged(gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
+    # 标准答案或模型回答为空时无法判定（NaN），否则相同为 1、不同为 0。
+    return np.where((gt != "") & (pred != ""), (gt == pred).astype(float), np.nan)
+
+
+def build_frame(
+    items: Sequence[Any], qa_scores: Sequence[Optional[float]]
+) -> pd.DataFrame:
+    """
+    把结果转换为每题一行的列式表：层级列、type_code，以及按题型向量化判定的 correct（1/0，无法判定为 NaN）
+    和 qa（问答题的评审均分，缺失为 NaN）。qa_scores 与 items 等长，行索引为题目在 items 中的下标。
+    """
+    raw = _raw_columns(items)
+    text = {f: _text_array(a) for f, a in raw.items()}
+    leaf = _leaf_columns(text)
+    type_code = np.fromiter((it.type_code for it in items), dtype=np.int64, count=len(items))
+
+    missing_spec = (
+        (leaf["部分"] == "特色场景")
+        & (leaf["l1"] == "机场")
+        & (_type_of(raw["专项"]) == type(None))
+    )
+    for i in np.flatnonzero(missing_spec):
+        it = items[i]
+        print(f"DEBUG: Missing '专项' for item id={it.get('id')}, keys={it.keys()}")
+
+    def upper(x: str) -> str:
+        return x.strip().upper()
+
+    def letters(x: str) -> str:
+        return "".join(sorted({ch for ch in x.upper() if ch in _LETTERS}))
+
+    def judgement(x: str) -> str:
+        x = x.strip()
+        return _JUDGE_NORM.get(x, x)
+
+    correct = np.full(len(items), np.nan)
+    gt, pred = text["答案"], text["模型回答"]
+    for type_name, fn in (("单选题", upper), ("多选题", letters), ("判断题", judgement)):
+        mask = type_code == TYPE_CODES[type_name]
+        correct[mask] = _judged(_map_unique(gt[mask], fn), _map_unique(pred[mask], fn))
+
+    keep = leaf["部分"] != ""
+    position = pd.RangeIndex(len(items))[keep]
+    df = pd.DataFrame(
+        {k: pd.Series(v[keep], dtype=object, index=position) for k, v in leaf.items()}
+    )
+    df["type_code"] = type_code[keep]
+    df["correct"] = correct[keep]
+    df["qa"] = np.array(list(qa_scores), dtype=float)[keep] if len(items) else np.zeros(0)
+    return df
+
+
+def leaf_counts(frame: pd.DataFrame) -> pd.DataFrame:
+    """逐题计数：每题一行，层级列与 COUNTS 各列（0/1 或问答分数），索引与 frame 相同。"""
+    t = frame["type_code"]
+    valid = frame["correct"].notna()
+    hit = frame["correct"] == 1
+    qa_valid = (t == TYPE_CODES["问答题"]) & frame["qa"].notna()
+    qa = frame["qa"].where(qa_valid, 0.0)
+    counts = pd.DataFrame(
+        {
+            "n": 1,
+            "single_n": (t == TYPE_CODES["单选题"]) & valid,
+            "single_k": (t == TYPE_CODES["单选题"]) & hit,
+            "multi_n": (t == TYPE_CODES["多选题"]) & valid,
+            "multi_k": (t == TYPE_CODES["多选题"]) & hit,
+            "judge_n": (t == TYPE_CODES["判断题"]) & valid,
+            "judge_k": (t == TYPE_CODES["判断题"]) & hit,
+            "qa_n": qa_valid,
+            "qa_sum": qa,
+            "qa_sumsq": qa * qa,
+        },
+        index=frame.index,
+    )
+    counts[list(KEYS)] = frame[list(KEYS)]
+    return counts
+
+
+def leaf_table(frame: pd.DataFrame) -> pd.DataFrame:
+    """按叶子聚合计数，叶子按首次出现的顺序排列（与结果文件的遍历顺序一致）。"""
+    return merge_leaf_tables([leaf_counts(frame)])
+
+
+def leaf_records_by(
+    frame: pd.DataFrame, group: np.ndarray, n_groups: int
+) -> List[List[List[Any]]]:
+    """
+    按分组分别聚合叶子表，返回 n_groups 个叶子行列表（格式同 leaf_records，没有题目的分组为空列表）。
+
+    group[i] 为 items[i] 所属分组，同一分组的题目须连续且分组编号递增（如按结果文件）；
+    一次 groupby 完成全部分组，各分组内叶子仍按首次出现的顺序排列。
+    """
+    counts = leaf_counts(frame)
+    counts.insert(0, "_group", np.asarray(group, dtype=np.int64)[frame.index])
+    merged = _sum_by(counts, ["_group", *KEYS])
+    bounds = np.searchsorted(merged["_group"].to_numpy(), np.arange(n_groups + 1))
+    records = leaf_records(merged)
+    return [records[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def _cast_counts(leaf: pd.DataFrame) -> pd.DataFrame:
+    # 题数为 int64，问答分数和为 float。
+    int_cols = [c for c in COUNTS if not c.startswith("qa_s")]
+    leaf[int_cols] = leaf[int_cols].astype(np.int64)
+    leaf[["qa_sum", "qa_sumsq"]] = leaf[["qa_sum", "qa_sumsq"]].astype(float)
+    return leaf
+
+
+def _sum_by(counts: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    return _cast_counts(counts.groupby(by, sort=False)[list(COUNTS)].sum().reset_index())
+
+
+def merge_leaf_tables(tables: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """合并多个叶子表（或逐题计数），相同叶子的计数相加，保持首次出现的顺序。"""
+    tables = [t for t in tables if len(t)]
+    if not tables:
+        return pd.DataFrame(columns=[*KEYS, *COUNTS])
+    return _sum_by(pd.concat(tables, ignore_index=True), list(KEYS))
+
+
+def leaf_records(leaf: pd.DataFrame) -> List[List[Any]]:
+    """叶子表转换为可 JSON 序列化的行列表（列顺序为 KEYS + COUNTS）。"""
+    return [list(r) for r in zip(*(leaf[c].tolist() for c in (*KEYS, *COUNTS)))]
+
+
+def from_leaf_records(records: Sequence[Sequence[Any]]) -> pd.DataFrame:
+    """leaf_records 的逆操作；可传入多个表的行拼接而成的列表，结果未按叶子合并。"""
+    columns = list(zip(*records)) or [()] * (len(KEYS) + len(COUNTS))
+    data: Dict[str, Any] = {}
+    for name, values in zip((*KEYS, *COUNTS), columns):
+        if name in KEYS:
+            data[name] = pd.Series(values, dtype=object)
+        else:
+            dtype = float if name.startswith("qa_s") else np.int64
+            data[name] = np.array(values, dtype=dtype)
+    return pd.DataFrame(data)
+
+
+def _acc(leaf: pd.DataFrame, kind: str) -> pd.Series:
+    n = leaf[f"{kind}_n"]
+    return (leaf[f"{kind}_k"] / n.where(n > 0)).fillna(0.0)
+
+
+def _qa_mean(leaf: pd.DataFrame, by: List[str], index: pd.Index) -> pd.Series:
+    # 问答题均分：没有任何评审分数时为 0。
+    g = leaf.groupby(by, sort=False)[["qa_sum", "qa_n"]].sum()
+    return (g["qa_sum"] / g["qa_n"].where(g["qa_n"] > 0)).reindex(index).fillna(0.0)
+
+
+def _mean_by(
+    leaf: pd.DataFrame, by: List[str], col: str, index: Optional[pd.Index] = None
+) -> pd.Series:
+    # 子节点分数的算术平均；index 中没有子节点的父节点为 0。
+    g = leaf.groupby(by, sort=False)[col]
+    mean = g.sum() / g.count()
+    return mean if index is None else mean.reindex(index).fillna(0.0)
+
+
+def _row(part: str, level: str, name: str, score: float) -> Dict[str, Any]:
+    return {"部分": part, "层级": level, "名称": name, "分数": round(float(score), 2)}
+
+
+def _tree_rows(
+    leaf: pd.DataFrame,
+    levels: Sequence[str],
+    part: str,
+    nodes: List[Tuple[int, pd.Series, str, Optional[Callable[[Tuple[str, ...]], bool]]]],
+) -> List[Dict[str, Any]]:
+    """
+    层级结构的输出行：nodes 为 (深度, 该深度各节点的分数, 层级名, keep)，keep 返回 False 的节点不输出。
+
+    名称为各层取值以“-”连接；各层前缀按首次出现的顺序编号，父节点排在其全部子节点之后。
+    """
+    ranks = [
+        leaf.groupby(list(levels[: i + 1]), sort=False).ngroup().to_numpy()
+        for i in range(len(levels))
+    ]
+    frames = []
+    for depth, scores, level_name, keep in nodes:
+        by = list(levels[:depth])
+        first = leaf.groupby(by, sort=False).head(1).index.to_numpy()
+        keys = list(leaf.loc[first, by].itertuples(index=False, name=None))
+        index = (
+            pd.MultiIndex.from_tuples(keys, names=by)
+            if depth > 1
+            else pd.Index([k[0] for k in keys], name=by[0])
+        )
+        out = pd.DataFrame(
+            {
+                "名称": ["-".join(k) for k in keys],
+                "层级": level_name,
+                "score": scores.reindex(index).to_numpy(dtype=float),
+            }
+        )
+        for i in range(len(levels)):
+            out[f"r{i}"] = ranks[i][first] if i < depth else _LAST
+        if keep is not None:
+            out = out[[bool(keep(k)) for k in keys]]
+        frames.append(out)
+    df = pd.concat(frames, ignore_index=True).sort_values(
+        [f"r{i}" for i in range(len(levels))], kind="stable"
+    )
+    return [
+        _row(part, lv, n, s) for lv, n, s in zip(df["层级"], df["名称"], df["score"])
+    ]
+
+
+def score_leaf_table(
+    leaf: pd.DataFrame, weights: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    由叶子表按配置的权重逐层汇总，返回 write_csv / build_report 使用的 rows 与 totals。
+
+    - 客观题叶子得分 = Σ 题型权重 × 该题型正确率（无可判定题目时正确率为 0）；
+    - 安全/质量中名称为“/”的叶子只贡献问答题，父节点得分 = 客观叶子均分 × (100-问答)/100 + 问答均分 × 问答/100；
+    - 通用综合按板块计分再按“<板块>权重”加权，特色场景逐层取均值再按“<领域>权重”加权；
+    - 行的顺序为各层级首次出现的顺序，父节点排在其子节点之后。
+    """
+    w_pro = weights["专业技术"]
+    w_gen = weights["通用综合"]
+    w_spec = weights["特色场景"]
+    rows: List[Dict[str, Any]] = []
+    parts = {
+        p: leaf[leaf["部分"] == p].reset_index(drop=True)
+        for p in ("安全", "质量", "通用综合", "特色场景")
+    }
+
+    def objective(t: pd.DataFrame, w: Dict[str, Any]) -> pd.Series:
+        return (
+            w["单选"] * _acc(t, "single")
+            + w["多选"] * _acc(t, "multi")
+            + w["判断"] * _acc(t, "judge")
+        )
+
+    def with_qa(t: pd.DataFrame, by: List[str], leaf_level: str) -> pd.Series:
+        # 安全类型 / 子分部工程：客观叶子均分与“/”叶子问答均分按问答权重合成。
+        index = t.groupby(by, sort=False).size().index
+        spec_mean = _mean_by(t[t[leaf_level] != "/"], by, "score", index)
+        qa_mean = _qa_mean(t[t[leaf_level] == "/"], by, index)
+        return spec_mean * ((100 - w_pro["问答"]) / 100.0) + qa_mean * (
+            w_pro["问答"] / 100.0
+        )
+
+    def not_slash(k: Tuple[str, ...]) -> bool:
+        return k[-1] != "/"
+
+    def not_empty(k: Tuple[str, ...]) -> bool:
+        return k[-1] != ""
+
+    # 1-1 安全：安全类型 > 安全专项
+    sec = parts["安全"]
+    sec_score = 0.0
+    if len(sec):
+        levels = ("l1", "l2")
+        sec["score"] = objective(sec, w_pro)
+        type_scores = with_qa(sec, ["l1"], "l2")
+        sec_score = float(type_scores.mean())
+        rows += _tree_rows(
+            sec,
+            levels,
+            "1-1安全",
+            [
+                (2, sec.set_index(list(levels))["score"], "安全专项", not_slash),
+                (1, type_scores, "安全类型", None),
+            ],
+        )
+        rows.append(_row("1-1安全", "整体", "安全", sec_score))
+
+    # 1-2 质量：分部工程 > 子分部工程 > 分项工程
+    qual = parts["质量"]
+    qual_score = 0.0
+    if len(qual):
+        levels = ("l1", "l2", "l3")
+        qual["score"] = objective(qual, w_pro)
+        sub_scores = with_qa(qual, ["l1", "l2"], "l3")
+        dep_scores = _mean_by(sub_scores.rename("score").reset_index(), ["l1"], "score")
+        qual_score = float(dep_scores.mean())
+        rows += _tree_rows(
+            qual,
+            levels,
+            "1-2质量",
+            [
+                (3, qual.set_index(list(levels))["score"], "分项工程", not_slash),
+                (2, sub_scores, "子分部工程", None),
+                (1, dep_scores, "分部工程", None),
+            ],
+        )
+        rows.append(_row("1-2质量", "整体", "质量", qual_score))
+
+    # 2 通用综合：板块类型，按“<板块>权重”加权
+    gen = parts["通用综合"]
+    gen_score = 0.0
+    if len(gen):
+        blk = gen.groupby("l1", sort=False)[list(COUNTS)].sum()
+        qa_mean = (blk["qa_sum"] / blk["qa_n"].where(blk["qa_n"] > 0)).fillna(0.0)
+        blk_scores = (
+            w_gen["单选"] * _acc(blk, "single")
+            + w_gen["多选"] * _acc(blk, "multi")
+            + w_gen["问答"] / 100.0 * qa_mean
+        )
+        blk_w = np.array([weights.get(f"{b}权重", 0.0) for b in blk.index], dtype=float)
+        gen_score = float((blk_scores.to_numpy() * blk_w).sum()) / 100.0
+        rows += [_row("2通用综合", "板块类型", b, s) for b, s in blk_scores.items()]
+        rows.append(_row("2通用综合", "整体", "通用综合", gen_score))
+
+    # 3 特色场景：领域 > 专业类别 > 专业专项 > 子专业专项 > 细分子专业，取值为空的层级不输出
+    spec = parts["特色场景"]
+    spec_total_score = 0.0
+    if len(spec):
+        spec["score"] = objective(spec, w_spec)
+        node_scores = {5: spec.set_index(list(LEVELS))["score"]}
+        child = spec
+        for depth in (4, 3, 2, 1):
+            node_scores[depth] = _mean_by(child, list(LEVELS[:depth]), "score")
+            child = node_scores[depth].rename("score").reset_index()
+        domains = node_scores[1]
+        domain_w = np.array([weights.get(f"{d}权重", 0.0) for d in domains.index], dtype=float)
+        spec_total_score = float((domains.to_numpy() * domain_w).sum()) / 100.0
+        rows += _tree_rows(
+            spec,
+            LEVELS,
+            "3特色场景",
+            [
+                (5, node_scores[5], "细分子专业", not_empty),
+                (4, node_scores[4], "子专业专项", not_empty),
+                (3, node_scores[3], "专业专项", not_empty),
+                (2, node_scores[2], "专业类别", None),
+                (1, node_scores[1], "领域", None),
+            ],
+        )
+        rows.append(_row("3特色场景", "整体", "特色场景", spec_total_score))
+
+    pro_total = 0.0
+    if len(sec) or len(qual):
+        pro_total = sec_score * ((100 - int(weights["安全权重"])) / 100.0) + qual_score * (
+            (100 - int(weights["质量权重"])) / 100.0
+        )
+        rows.append(_row("1专业技术", "整体", "专业技术", pro_total))
+
+    total_score = (
+        pro_total * weights["专业技术权重"] / 100.0
+        + gen_score * weights["通用综合权重"] / 100.0
+        + spec_total_score * weights["特色场景权重"] / 100.0
+    )
+    rows.append(_row("整体", "总分", "总分", total_score))
+
+    totals: Dict[str, float] = {
+        "安全": sec_score,
+        "质量": qual_score,
+        "专业技术": pro_total,
+        "通用综合": gen_score,
+        "特色场景": spec_total_score,
+        "总分": total_score,
+    }
+    return rows, totals
+
+
+def _groups(t: pd.DataFrame, by: List[str]) -> Tuple[np.ndarray, List[Tuple[str, ...]]]:
+    # 各行所属分组的编号（按首次出现的顺序）与各分组的取值。
+    codes = t.groupby(by, sort=False).ngroup().to_numpy()
+    keys = list(t.groupby(by, sort=False).head(1)[by].itertuples(index=False, name=None))
+    return codes, keys
+
+
+def _group_sum(codes: np.ndarray, n: int, x: np.ndarray) -> np.ndarray:
+    # x 为 (行数, 列数)；返回各分组的行和 (n, 列数)。
+    onehot = np.zeros((n, len(codes)))
+    onehot[codes, np.arange(len(codes))] = 1.0
+    return onehot @ x
+
+
+def _group_mean(codes: np.ndarray, n: int, x: np.ndarray) -> np.ndarray:
+    # 各分组的行均值，没有行的分组为 0。
+    counts = np.bincount(codes, minlength=n)[:, None]
+    return _ratio(_group_sum(codes, n, x), counts)
+
+
+def _parent(child: np.ndarray, parent: np.ndarray, n_child: int) -> np.ndarray:
+    # 子分组编号 -> 父分组编号。
+    out = np.zeros(n_child, dtype=np.int64)
+    out[child] = parent
+    return out
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    num, den = np.broadcast_arrays(
+        np.asarray(num, dtype=float), np.asarray(den, dtype=float)
+    )
+    return np.divide(num, den, out=np.zeros(num.shape), where=den > 0)
+
+
+# score_leaf_table 中特色场景各深度的层级名。
+_SPEC_LEVEL_NAMES = {5: "细分子专业", 4: "子专业专项", 3: "专业专项", 2: "专业类别", 1: "领域"}
+
+NodeKey = Tuple[str, str, str]
+
+
+def _roll_up(
+    leaf: pd.DataFrame,
+    cells: Dict[str, np.ndarray],
+    w: Callable[[str], np.ndarray],
+    width: int,
+    nodes: Optional[Dict[NodeKey, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    score_leaf_table 的矩阵形式：返回 totals，每项为长度 width 的数组。
+
+    - cells 为叶子的计数列（*_k / *_n / qa_sum / qa_n），形状 (叶子数, 1) 或 (叶子数, width)；
+    - w(路径) 返回权重（如 "专业技术.单选"、"安全权重"），形状 (1,) 或 (width,)；
+    - 多组权重共用一份计数（批量重算），或一组权重对应多份重抽样的计数（bootstrap），都按广播计算；
+    - nodes 不为 None 时另外记录每个输出行的得分，键为 (部分, 层级, 名称)。
+    """
+
+    def record(part: str, level: str, keys: Sequence[Tuple[str, ...]], scores: np.ndarray):
+        if nodes is not None:
+            for k, s in zip(keys, scores):
+                nodes[(part, level, "-".join(k))] = np.broadcast_to(s, (width,))
+
+    def acc(kind: str, rows: np.ndarray) -> np.ndarray:
+        return _ratio(cells[f"{kind}_k"][rows], cells[f"{kind}_n"][rows])
+
+    def objective(rows: np.ndarray, section: str) -> np.ndarray:
+        return (
+            acc("single", rows) * w(f"{section}.单选")
+            + acc("multi", rows) * w(f"{section}.多选")
+            + acc("judge", rows) * w(f"{section}.判断")
+        )
+
+    q_pro = w("专业技术.问答") / 100.0
+
+    def with_qa(
+        t: pd.DataFrame,
+        rows: np.ndarray,
+        by: List[str],
+        leaf_level: str,
+        part: str,
+        level: str,
+    ) -> Tuple[np.ndarray, np.ndarray, List[Tuple[str, ...]]]:
+        # 客观叶子均分与“/”叶子问答均分按问答权重合成；返回 (各分组得分, 分组编号, 分组取值)。
+        slash = (t[leaf_level] == "/").to_numpy()
+        obj = objective(rows[~slash], "专业技术")
+        leaf_keys = t.loc[~slash, [*by, leaf_level]].itertuples(index=False, name=None)
+        record(part, level, list(leaf_keys), obj)
+        codes, keys = _groups(t, by)
+        spec_mean = _group_mean(codes[~slash], len(keys), obj)
+        qa_sum = _group_sum(codes[slash], len(keys), cells["qa_sum"][rows[slash]])
+        qa_n = _group_sum(codes[slash], len(keys), cells["qa_n"][rows[slash]])
+        return spec_mean * (1 - q_pro) + _ratio(qa_sum, qa_n) * q_pro, codes, keys
+
+    part_col = leaf["部分"].to_numpy()
+    zero = np.zeros(width)
+
+    def part(name: str) -> Tuple[pd.DataFrame, np.ndarray]:
+        rows = np.flatnonzero(part_col == name)
+        return leaf.iloc[rows].reset_index(drop=True), rows
+
+    # 1-1 安全：安全类型 > 安全专项
+    sec, rows = part("安全")
+    sec_score = zero
+    if len(sec):
+        type_scores, _codes, keys = with_qa(sec, rows, ["l1"], "l2", "1-1安全", "安全专项")
+        record("1-1安全", "安全类型", keys, type_scores)
+        sec_score = np.broadcast_to(type_scores.mean(axis=0), (width,))
+        record("1-1安全", "整体", [("安全",)], [sec_score])
+
+    # 1-2 质量：分部工程 > 子分部工程 > 分项工程
+    qual, rows = part("质量")
+    qual_score = zero
+    if len(qual):
+        sub_scores, sub_codes, sub_keys = with_qa(
+            qual, rows, ["l1", "l2"], "l3", "1-2质量", "分项工程"
+        )
+        record("1-2质量", "子分部工程", sub_keys, sub_scores)
+        dep_codes, dep_keys = _groups(qual, ["l1"])
+        dep_scores = _group_mean(
+            _parent(sub_codes, dep_codes, len(sub_keys)), len(dep_keys), sub_scores
+        )
+        record("1-2质量", "分部工程", dep_keys, dep_scores)
+        qual_score = np.broadcast_to(dep_scores.mean(axis=0), (width,))
+        record("1-2质量", "整体", [("质量",)], [qual_score])
+
+    # 2 通用综合：板块类型，按“<板块>权重”加权
+    gen, rows = part("通用综合")
+    gen_score = zero
+    if len(gen):
+        codes, keys = _groups(gen, ["l1"])
+
+        def block(name: str) -> np.ndarray:
+            return _group_sum(codes, len(keys), cells[name][rows])
+
+        blk_scores = (
+            _ratio(block("single_k"), block("single_n")) * w("通用综合.单选")
+            + _ratio(block("multi_k"), block("multi_n")) * w("通用综合.多选")
+            + _ratio(block("qa_sum"), block("qa_n")) * (w("通用综合.问答") / 100.0)
+        )
+        record("2通用综合", "板块类型", keys, blk_scores)
+        blk_w = np.stack([w(f"{k[0]}权重") for k in keys])
+        gen_score = np.broadcast_to((blk_scores * blk_w).sum(axis=0) / 100.0, (width,))
+        record("2通用综合", "整体", [("通用综合",)], [gen_score])
+
+    # 3 特色场景：每层节点得分为其子节点得分的均值，按“<领域>权重”加权
+    spec, rows = part("特色场景")
+    spec_score = zero
+    if len(spec):
+        scores = objective(rows, "特色场景")
+        leaf_keys = spec[list(LEVELS)].itertuples(index=False, name=None)
+        record("3特色场景", _SPEC_LEVEL_NAMES[5], list(leaf_keys), scores)
+        codes = np.arange(len(spec))
+        for depth in (4, 3, 2, 1):
+            parent, keys = _groups(spec, list(LEVELS[:depth]))
+            scores = _group_mean(_parent(codes, parent, len(scores)), len(keys), scores)
+            record("3特色场景", _SPEC_LEVEL_NAMES[depth], keys, scores)
+            codes = parent
+        domain_w = np.stack([w(f"{k[0]}权重") for k in keys])
+        spec_score = np.broadcast_to((scores * domain_w).sum(axis=0) / 100.0, (width,))
+        record("3特色场景", "整体", [("特色场景",)], [spec_score])
+
+    pro_total = zero
+    if len(sec) or len(qual):
+        pro_total = sec_score * (100 - w("安全权重")) / 100.0 + qual_score * (
+            (100 - w("质量权重")) / 100.0
+        )
+        record("1专业技术", "整体", [("专业技术",)], [pro_total])
+
+    total = (
+        pro_total * w("专业技术权重") / 100.0
+        + gen_score * w("通用综合权重") / 100.0
+        + spec_score * w("特色场景权重") / 100.0
+    )
+    record("整体", "总分", [("总分",)], [total])
+    return {
+        "安全": sec_score,
+        "质量": qual_score,
+        "专业技术": pro_total,
+        "通用综合": gen_score,
+        "特色场景": spec_score,
+        "总分": np.broadcast_to(total, (width,)),
+    }
+
+
+_CELLS = (
+    "single_k",
+    "single_n",
+    "multi_k",
+    "multi_n",
+    "judge_k",
+    "judge_n",
+    "qa_sum",
+    "qa_n",
+)
+
+
+def _weight_getter(weights_list: Sequence[Dict[str, Any]]) -> Callable[[str], np.ndarray]:
+    # "专业技术.单选" 形式的路径 -> 各组权重的取值数组，缺失为 0。
+    def w(path: str) -> np.ndarray:
+        out = []
+        for ws in weights_list:
+            v: Any = ws
+            for key in path.split("."):
+                v = v.get(key, 0.0) if isinstance(v, dict) else 0.0
+            out.append(float(v))
+        return np.array(out)
+
+    return w
+
+
+def score_totals_batch(
+    leaf: pd.DataFrame, weights_list: Sequence[Dict[str, Any]]
+) -> pd.DataFrame:
+    """
+    对同一叶子表批量应用多组权重，返回每组权重一行的 totals（列同 score_leaf_table 的 totals）。
+
+    与逐组调用 score_leaf_table 的结果相同（浮点误差内）：各层级的分组结构只计算一次，
+    权重排成 (配置数,) 的数组，叶子得分为 (叶子数, 配置数) 的矩阵，逐层均值与加权均为矩阵运算。
+    """
+    cells = {c: leaf[c].to_numpy(dtype=float)[:, None] for c in _CELLS}
+    totals = _roll_up(leaf, cells, _weight_getter(weights_list), len(weights_list))
+    return pd.DataFrame(totals)
+
+
+def bootstrap_intervals(
+    leaf: pd.DataFrame,
+    weights: Dict[str, Any],
+    samples: int = 10000,
+    level: float = 0.95,
+    seed: int = 0,
+    chunk: int = 1000,
+) -> Dict[NodeKey, Tuple[float, float]]:
+    """
+    score_leaf_table 每个输出行（含各部分与总分）的 bootstrap 百分位置信区间，键为 (部分, 层级, 名称)。
+
+    - 客观题：每个叶子、每种题型的答对数按 Binomial(可判定题数, 正确率) 重抽样，
+      等价于在该单元内对题目有放回重抽样（全对或全错的单元没有抽样波动）；
+    - 问答题：叶子的评分和按正态近似重抽样，方差取自 qa_sum / qa_sumsq，
+      并按题数向全部问答题的合并方差收缩（只有一道问答题的叶子也有不确定性）；
+    - 重抽样的计数按 chunk 个一批整体代入 _roll_up，逐层汇总均为矩阵运算。
+    """
+    rng = np.random.default_rng(seed)
+    cells = {c: leaf[c].to_numpy(dtype=float)[:, None] for c in _CELLS}
+    qa_n = cells["qa_n"]
+    qa_sumsq = leaf["qa_sumsq"].to_numpy(dtype=float)[:, None]
+    qa_mean = _ratio(cells["qa_sum"], qa_n)
+    qa_var = np.maximum(_ratio(qa_sumsq, qa_n) - qa_mean**2, 0.0)
+    n_all = qa_n.sum()
+    pooled = 0.0
+    if n_all > 0:
+        pooled = max(qa_sumsq.sum() / n_all - (cells["qa_sum"].sum() / n_all) ** 2, 0.0)
+    qa_var = (qa_n * qa_var + pooled) / (qa_n + 1.0)
+    # 评分和的标准差：n 道题之和的方差为 n·σ²。
+    qa_sd = np.sqrt(qa_n * qa_var)
+    w = _weight_getter([weights])
+
+    draws: Dict[NodeKey, List[np.ndarray]] = {}
+    done = 0
+    while done < samples:
+        b = min(chunk, samples - done)
+        sample = dict(cells)
+        for kind in ("single", "multi", "judge"):
+            n = cells[f"{kind}_n"]
+            p = _ratio(cells[f"{kind}_k"], n)
+            sample[f"{kind}_k"] = rng.binomial(
+                n.astype(np.int64), p, size=(len(leaf), b)
+            ).astype(float)
+        sample["qa_sum"] = cells["qa_sum"] + qa_sd * rng.standard_normal((len(leaf), b))
+        nodes: Dict[NodeKey, np.ndarray] = {}
+        _roll_up(leaf, sample, w, b, nodes)
+        for key, values in nodes.items():
+            draws.setdefault(key, []).append(values)
+        done += b
+
+    tail = (1.0 - level) / 2.0 * 100.0
+    out: Dict[NodeKey, Tuple[float, float]] = {}
+    for key, parts in draws.items():
+        lo, hi = np.percentile(np.concatenate(parts), [tail, 100.0 - tail])
+        out[key] = (float(lo), float(hi))
+    return out
+
+
+def attach_intervals(
+    rows: List[Dict[str, Any]], intervals: Dict[NodeKey, Tuple[float, float]]
+) -> List[Dict[str, Any]]:
+    """为 rows 的每一行加上“下限”“上限”（保留两位小数），区间缺失的行为 None。"""
+    for r in rows:
+        lo_hi = intervals.get((r["部分"], r["层级"], r["名称"]))
+        r["下限"] = round(lo_hi[0], 2) if lo_hi else None
+        r["上限"] = round(lo_hi[1], 2) if lo_hi else None
+    return rows
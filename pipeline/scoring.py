@@ -1,81 +1,39 @@
 import os
-import json
 import csv
 import asyncio
 from typing import Any, Dict, List, Tuple, Optional
+import numpy as np
 from tqdm import tqdm
-from .judger import judge_one
-
-
-def _read_all_json(root: str) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    base = os.path.join(root, "raw")
-    for r, _d, files in os.walk(base):
-        for fn in files:
-            if not fn.endswith(".json"):
-                continue
-            fp = os.path.join(r, fn)
-            rel = os.path.normpath(os.path.relpath(fp, base))
-            try:
-                with open(fp, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for it in data:
-                        if isinstance(it, dict):
-                            x = dict(it)
-                            x["__source_relpath"] = rel
-                            out.append(x)
-            except Exception:
-                continue
-    return out
-
-
-def _letters(s: str) -> List[str]:
-    s = (s or "").upper()
-    return [ch for ch in s if ch in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"]
-
-
-def _is_correct_single(item: Dict[str, Any]) -> Optional[bool]:
-    gt = str(item.get("答案") or "").strip().upper()
-    pred = str(item.get("模型回答") or "").strip().upper()
-    if not gt or not pred:
-        return None
-    return gt == pred
-
-
-def _is_correct_multi(item: Dict[str, Any]) -> Optional[bool]:
-    gt = set(_letters(str(item.get("答案") or "")))
-    pred = set(_letters(str(item.get("模型回答") or "")))
-    if not gt or not pred:
-        return None
-    return gt == pred
-
-
-def _is_correct_judge(item: Dict[str, Any]) -> Optional[bool]:
-    gt = str(item.get("答案") or "").strip()
-    pred = str(item.get("模型回答") or "").strip()
-    if not gt or not pred:
-        return None
-
-    def norm(x: str) -> str:
-        x = x.strip()
-        if x in ["正确", "对", "是", "true", "True"]:
-            return "正确"
-        if x in ["错误", "错", "否", "false", "False"]:
-            return "错误"
-        return x
-
-    return norm(gt) == norm(pred)
-
-
-def _acc(vals: List[Optional[bool]]) -> float:
-    xs = [1.0 if v else 0.0 for v in vals if v is not None]
-    if not xs:
-        return 0.0
-    return sum(xs) / len(xs)
-
-
-def _mean(xs: List[float]) -> float:
-    return sum(xs) / len(xs) if xs else 0.0
+from .judger import judge_batch, judge_one, leaf_key
+from .judge_store import JudgeScoreCache, JudgeStore, answer_hash, content_key
+from .prompt import format_qa_judge_prompt
+from .question import TYPE_CODES, Question
+from .result_index import (
+    list_result_files,
+    load_scoring_files,
+    partial_key,
+    read_judge_ensemble,
+    read_partial,
+    write_judge_ensemble,
+    write_leaf_table,
+    write_partial,
+)
+from .score_table import (
+    attach_intervals,
+    bootstrap_intervals,
+    build_frame,
+    from_leaf_records,
+    leaf_records,
+    leaf_records_by,
+    merge_leaf_tables,
+    score_leaf_table,
+)
+from .scheduler import (
+    CostModel,
+    LatencyModel,
+    ScheduleLog,
+    order_by_cost,
+)
 
 
 def _safe_rel(rel: str) -> str:
@@ -91,16 +49,22 @@ def _safe_rel(rel: str) -> str:
 
 
 def _empty_usage() -> Dict[str, int]:
-    return {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0}
+    return {
+        "completion_tokens": 0,
+        "prompt_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+    }
 
 
 def _norm_usage(u: Any) -> Dict[str, int]:
     if not isinstance(u, dict):
-        return {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0}
+        return _empty_usage()
     return {
         "completion_tokens": int((u or {}).get("completion_tokens", 0) or 0),
         "prompt_tokens": int((u or {}).get("prompt_tokens", 0) or 0),
         "total_tokens": int((u or {}).get("total_tokens", 0) or 0),
+        "cached_tokens": int((u or {}).get("cached_tokens", 0) or 0),
     }
 
 
@@ -109,39 +73,123 @@ def _merge_usage(base: Dict[str, int], extra: Any) -> Dict[str, int]:
     base["completion_tokens"] += x["completion_tokens"]
     base["prompt_tokens"] += x["prompt_tokens"]
     base["total_tokens"] += x["total_tokens"]
+    base["cached_tokens"] += x["cached_tokens"]
     return base
 
 
+def _batch_size(judge: Dict[str, Any]) -> int:
+    return max(1, int(judge.get("batch_size") or 1))
+
+
+def _judge_batches(
+    missing: List[Tuple[Dict[str, Any], Dict[str, Any], str, Dict[str, Any]]]
+) -> List[List[int]]:
+    """
+    把缺失的评审分成调用单元（missing 的下标列表）：batch_size 大于 1 的裁判按
+    (裁判, 结果文件, 叶子分类路径) 分组后每 batch_size 道题一组，其余每个评审单独一组。
+    """
+    units: List[List[int]] = []
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for i, (it, j, rel, _entry) in enumerate(missing):
+        if _batch_size(j) == 1:
+            units.append([i])
+            continue
+        key = (j["model_name"], rel, leaf_key(it))
+        group = groups.setdefault(key, [])
+        group.append(i)
+        if len(group) == _batch_size(j):
+            units.append(group)
+            groups[key] = []
+    units += [g for g in groups.values() if g]
+    return units
+
+
+def _ensemble_step(
+    entry: Dict[str, Any],
+    judges: List[Dict[str, Any]],
+    min_judges: int,
+    tolerance: float,
+) -> Tuple[List[Dict[str, Any]], List[str], bool]:
+    """
+    按 judges 的顺序检查一道题已有的评审结果，返回 (还需调用的裁判, 计入分数的裁判, 是否完成)。
+
+    - 已有分数的前 min_judges 个裁判（及之后逐个追加的裁判）分差不超过 tolerance 时停止，
+      后面的裁判不再调用，分数取这些裁判的均值；
+    - 否则继续调用下一个裁判，直到分数一致或全部裁判都已评审；
+    - entry 中有详情但没有 "模型回答_int" 的裁判视为评审失败，跳过并继续调用后面的裁判，
+      该题不算完成（下次运行补评）；
+    - min_judges 取裁判数、tolerance 取 inf 时即完整集成：全部裁判都评审后取均值。
+    """
+    want: List[Dict[str, Any]] = []
+    used: List[str] = []
+    xs: List[int] = []
+    failed = False
+    for j in judges:
+        d = entry.get(j["model_name"])
+        if d is None:
+            want.append(j)
+        elif isinstance(d, dict) and isinstance(d.get("模型回答_int"), int):
+            used.append(j["model_name"])
+            xs.append(int(d["模型回答_int"]))
+        else:
+            failed = True
+        if not want and len(xs) >= min_judges and max(xs) - min(xs) <= tolerance:
+            return [], used, not failed
+        if want and len(xs) + len(want) >= min_judges:
+            return want, used, False
+    return want, used, not want and not failed and len(used) == len(judges)
+
+
 async def _judge_items_cached(
-    items: List[Dict[str, Any]],
+    items: List[Question],
     judges: List[Dict[str, Any]],
     result_root: str,
     en_mode: bool,
-) -> Tuple[List[Optional[float]], Dict[str, Dict[str, int]]]:
+    store: Optional[JudgeStore] = None,
+    score_cache: Optional[JudgeScoreCache] = None,
+    ensemble: Optional[Tuple[int, float]] = None,
+) -> Tuple[
+    List[Optional[float]], Dict[str, Dict[str, int]], List[bool], List[Tuple[List[str], int]]
+]:
     """
-    对一批题目 items 进行“带磁盘缓存”的评审打分，并返回每题的聚合分数与 token 用量统计。
+    对一批题目 items 进行“带缓存”的评审打分，并返回每题的聚合分数与 token 用量统计。
 
     缓存设计：
-    - items 来自多个 raw json 文件，函数使用每条样本的 "__source_relpath" 将评审结果按来源文件分片保存；
-    - 每个来源文件对应一个缓存文件：{result_root}/judge/{__source_relpath}；
-    - 缓存文件内容是一个 list[dict]，每个 dict 对应一个题目（用 id 索引），并包含各个 judge 模型的评审详情。
+    - 评审结果保存在 result_root/judge.sqlite3（见 JudgeStore），按 (rel, id, 评审模型) 各一行；
+    - items 来自多个 raw json 文件，函数使用每条样本的 rel 与 id 定位缓存条目；
+    - 每次评审完成立即写入并提交，中途中断时已完成的评审在下次运行时直接复用；
+    - 传入 score_cache 时，缺失的评审先按内容（评审模型、题干、评分标准、回答、模板版本）
+      查全局缓存，命中的直接复用，新的评审结果也写入全局缓存（见 JudgeScoreCache）。
+
+    批量评审（judges[i]["batch_size"] 大于 1 时）：
+    - 该裁判缺失的评审按叶子分组，每 batch_size 道题合成一个请求（见 _judge_batches、judge_batch）；
+    - 输出无法解析时这一组改为逐题评审；只剩一道题的组直接逐题评审；
+    - 批量评审的分数在全局缓存中与逐题评审分开保存，批量模式下也复用逐题评审的缓存分数。
+
+    自适应集成（ensemble 为 (min_judges, tolerance) 时）：
+    - 按 judges 的配置顺序分轮调用：第一轮每题调用前 min_judges 个裁判，
+      之后只对分差超过 tolerance 的题目追加下一个裁判，直到一致或裁判用完（见 _ensemble_step）；
+    - ensemble 为 None 时为完整集成，每题调用全部裁判。
 
     并发设计：
     - 对每个 judge 模型单独设置信号量（Semaphore），限制该模型的并发请求数（默认 2，可由 judges[i]["concurrency"] 覆盖）；
-    - 只对“缓存缺失”的 (item, model) 创建异步任务，已完成的直接复用缓存并跳过调用。
+    - 只对“缓存缺失”的 (item, model) 创建异步任务（批量评审时每组一个任务），已完成的直接复用缓存并跳过调用。
 
     返回：
     - scores：与 items 等长的列表；每条为多个 judge 给出的 "模型回答_int" 的平均值（若缺失则为 None）
     - judge_usages：按 model_name 汇总的 token 用量（prompt/completion/total）
+    - complete：与 items 等长；该题是否已有所需 judge 的 "模型回答_int"（否则下次运行会补评缺失的模型）
+    - used：与 items 等长；每题 (计入分数的裁判, 未调用裁判的预计 token 数)
     """
     if not judges:
-        return [None for _ in items], {}
+        return [None for _ in items], {}, [False for _ in items], [([], 0) for _ in items]
+    min_judges, tolerance = ensemble or (len(judges), float("inf"))
+
+    own_store = store is None
+    store = store or JudgeStore(result_root)
 
     # 按模型统计 token 用量。每次调用 judge_one 返回的 usage 会累计到对应模型。
-    judge_usages = {
-        j["model_name"]: {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0}
-        for j in judges
-    }
+    judge_usages = {j["model_name"]: _empty_usage() for j in judges}
 
     # 每个模型独立限流：避免某一个模型在大批量任务中被打爆或触发限速。
     sem_by_model = {
@@ -149,178 +197,344 @@ async def _judge_items_cached(
         for j in judges
     }
 
-    # 进程内的文件级缓存：避免同一个 judge_fp 反复读写磁盘。
-    # 结构：{judge_fp: {"data": list[dict], "by_id": {id: entry}, "dirty": bool}}
-    file_cache: Dict[str, Dict[str, Any]] = {}
-
-    def load_file_cache(judge_fp: str) -> Dict[str, Any]:
-        # 读取并解析某个缓存文件；同一进程内重复请求直接命中内存缓存。
-        if judge_fp in file_cache:
-            return file_cache[judge_fp]
-        data: List[Dict[str, Any]] = []
-        if os.path.exists(judge_fp) and os.path.getsize(judge_fp) > 0:
-            try:
-                with open(judge_fp, "r", encoding="utf-8") as f:
-                    loaded = json.load(f)
-                if isinstance(loaded, list):
-                    data = [x for x in loaded if isinstance(x, dict)]
-            except Exception:
-                data = []
-        # 使用字符串化的 id 建索引，便于从 items 的 id 直接定位缓存条目。
-        by_id = {str(x.get("id")): x for x in data if x.get("id") is not None}
-        file_cache[judge_fp] = {"data": data, "by_id": by_id, "dirty": False}
-        return file_cache[judge_fp]
+    # 每次评审的期望 token 数（用于 max_inflight_tokens 的按端点准入，见 async_retry_llm），
+    # 从缓存中已有评审的 usage 学习。
+    cost_by_model = {
+        j["model_name"]: CostModel(j.get("max_tokens") or 1024) for j in judges
+    }
+    # 按历史评审耗时估计每次评审的开销，缺失任务按“最长预计耗时优先”启动。
+    latency_by_model = {
+        name: LatencyModel(cost_model) for name, cost_model in cost_by_model.items()
+    }
+
+    # 进程内按 rel 缓存已有的评审结果：{rel: {(id, 模型): (答案哈希, 详情, 用量)}}，每个来源文件只查询一次存储。
+    results_by_rel: Dict[str, Dict[Tuple[str, str], Any]] = {}
+
+    def load_results(rel: str) -> Dict[Tuple[str, str], Any]:
+        if rel not in results_by_rel:
+            results_by_rel[rel] = store.results(rel)
+        return results_by_rel[rel]
+
+    def judge_prompt_chars(it: Dict[str, Any]) -> int:
+        return len(
+            format_qa_judge_prompt(
+                str(it.get("问题") or ""),
+                str(it.get("得分比例") or ""),
+                str(it.get("模型回答") or ""),
+                en_mode=en_mode,
+            )
+        )
 
     async def run_one_missing(
-        it: Dict[str, Any], j: Dict[str, Any], entry: Dict[str, Any]
+        it: Dict[str, Any], j: Dict[str, Any], rel: str, entry: Dict[str, Any]
     ):
-        # 对缓存缺失的一次评审调用：更新 entry 中该模型的 detail 与 usage，并累加全局用量。
+        # 对缓存缺失的一次评审调用：结果立即写入存储，更新 entry 并累加全局用量。
+        cost_model = cost_by_model[j["model_name"]]
+        prompt_chars = judge_prompt_chars(it)
+        cost = cost_model.expected("问答题", prompt_chars)
         async with sem_by_model[j["model_name"]]:
-            s, detail, u = await judge_one(it, j, en_mode=en_mode)
+            s, detail, u = await judge_one(it, j, en_mode=en_mode, token_cost=cost)
             normalized_usage = _norm_usage(u)
+            cost_model.observe("问答题", prompt_chars, normalized_usage)
+            latency_by_model[j["model_name"]].observe(
+                "问答题", prompt_chars, detail.get("latency"), normalized_usage
+            )
+            qid = str(it.get("id"))
+            store.put_result(rel, qid, j["model_name"], it, en_mode, detail, normalized_usage)
+            if score_cache is not None:
+                key = content_key(j, it, en_mode)
+                score_cache.put(key, j["model_name"], detail, normalized_usage)
             entry[j["model_name"]] = detail
-            # usage_details：按模型保存 usage 的细分信息，便于后续回溯与增量合并。
-            usage_details = entry.get("usage_details")
-            if not isinstance(usage_details, dict):
-                usage_details = {}
-            usage_details[j["model_name"]] = normalized_usage
-            entry["usage_details"] = usage_details
-
-            # usage：将 usage_details 中所有模型的 usage 汇总成一个总用量。
-            total_usage = _empty_usage()
-            for model_usage in usage_details.values():
-                _merge_usage(total_usage, model_usage)
-            entry["usage"] = total_usage
-
             _merge_usage(judge_usages[j["model_name"]], normalized_usage)
             return s
 
-    # missing_tasks：仅为缺失的 (item, model) 创建任务；避免重复评审。
-    missing_tasks: List[asyncio.Task] = []
+    async def run_batch_missing(
+        group: List[Tuple[Dict[str, Any], Dict[str, Any], str, Dict[str, Any]]]
+    ):
+        # 一组同一裁判、同一叶子的缺失评审：一次请求评审全部题目，解析失败时逐题评审。
+        # 批量调用的用量与耗时不计入 CostModel/LatencyModel，它们只估计逐题评审的开销。
+        if len(group) == 1:
+            await run_one_missing(*group[0])
+            return
+        j = group[0][1]
+        name = j["model_name"]
+        cost = sum(
+            cost_by_model[name].expected("问答题", judge_prompt_chars(it))
+            for it, _j, _rel, _entry in group
+        )
+        async with sem_by_model[name]:
+            results, usage = await judge_batch(
+                [it for it, _j, _rel, _entry in group], j, en_mode=en_mode, token_cost=cost
+            )
+        _merge_usage(judge_usages[name], usage)
+        if results is None:
+            print(f"Judge {name}: batch of {len(group)} not parsed, judging one by one.")
+            await asyncio.gather(*(run_one_missing(*m) for m in group))
+            return
+        for (it, _j, rel, entry), (_s, detail, u) in zip(group, results):
+            store.put_result(rel, str(it.get("id")), name, it, en_mode, detail, u)
+            if score_cache is not None:
+                score_cache.put(content_key(j, it, en_mode, True), name, detail, u)
+            entry[name] = detail
+
     # missing_by_rel / total_by_rel：按来源文件统计缺失数与总数，用于提示哪些文件已评完可跳过。
     missing_by_rel: Dict[str, int] = {}
     total_by_rel: Dict[str, int] = {}
 
+    # entries：与 items 等长，每题 {模型: 评审详情}，只含与当前回答一致的缓存结果与本次补齐的评审。
+    entries: List[Dict[str, Any]] = []
+    rels: List[str] = []
     for it in items:
-        # "__source_relpath" 来自 _read_all_json；这里会做安全化，防止生成越界路径。
-        rel = _safe_rel(str(it.get("__source_relpath") or ""))
+        # rel 来自 load_scoring_files；这里会做安全化，与结果文件的相对路径一致。
+        rel = _safe_rel(str(it.rel or ""))
+        rels.append(rel)
         total_by_rel[rel] = total_by_rel.get(rel, 0) + 1
-        judge_fp = os.path.join(result_root, "judge", rel)
-        cache = load_file_cache(judge_fp)
+        results = load_results(rel)
         qid = str(it.get("id"))
-        entry = cache["by_id"].get(qid)
-        if entry is None:
-            # 缓存文件里没有该题：创建一个基础 entry。
-            # 排除一些运行期字段，避免把中间态/冗余字段写入缓存导致体积膨胀。
-            entry = {
-                k: v
-                for k, v in it.items()
-                if k
-                not in (
-                    "__source_relpath",
-                    "usage",
-                    "usage_details",
-                    "candidate_usage",
-                    "summary_usage",
-                    "heavy_think_content",
-                )
-            }
-            cache["data"].append(entry)
-            cache["by_id"][qid] = entry
-            cache["dirty"] = True
-
-        # 兼容历史缓存结构：将 entry 中旧字段规范化为 usage_details，并确保只保留本次 judges 列表中的模型。
-        usage_details = entry.get("usage_details")
-        if not isinstance(usage_details, dict):
-            usage_details = {}
-        valid_models = {j["model_name"] for j in judges}
-        usage_details = {
-            k: _norm_usage(v)
-            for k, v in usage_details.items()
-            if k in valid_models and isinstance(v, dict)
-        }
-        changed = False
-        for j in judges:
-            model_name = j["model_name"]
-            if model_name in usage_details and isinstance(usage_details[model_name], dict):
-                usage_details[model_name] = _norm_usage(usage_details[model_name])
-                continue
-            # 部分旧缓存会把 usage 放在 entry[model_name]["usage"]；这里迁移/同步到 usage_details。
-            model_detail = entry.get(model_name)
-            if isinstance(model_detail, dict) and isinstance(model_detail.get("usage"), dict):
-                usage_details[model_name] = _norm_usage(model_detail.get("usage"))
-                changed = True
-        if changed or "usage_details" not in entry:
-            entry["usage_details"] = usage_details
-            cache["dirty"] = True
-
-        # 重新计算总用量 entry["usage"]，保证与 usage_details 一致（用于展示或后续汇总）。
-        total_usage = _empty_usage()
-        for model_usage in usage_details.values():
-            _merge_usage(total_usage, model_usage)
-        if entry.get("usage") != total_usage:
-            entry["usage"] = total_usage
-            cache["dirty"] = True
+        h = answer_hash(it)
+        entry: Dict[str, Any] = {}
+        entries.append(entry)
 
         for j in judges:
             model_name = j["model_name"]
-            cached = entry.get(model_name)
-            cached_score = None
-            if isinstance(cached, dict):
-                # 评审结果的核心字段：judge_one 产出的 detail 里应包含 "模型回答_int"（整数分/档位）。
-                cached_score = cached.get("模型回答_int")
-            if isinstance(cached_score, int):
+            cached = results.get((qid, model_name))
+            # 评审结果的核心字段：judge_one 产出的 detail 里应包含 "模型回答_int"（整数分/档位）；
+            # 结果文件中的回答变化后（答案哈希不同）旧评审作废，重新评审。
+            if (
+                cached is not None
+                and cached[0] == h
+                and isinstance(cached[1].get("模型回答_int"), int)
+            ):
+                entry[model_name] = cached[1]
+                prompt_chars = judge_prompt_chars(it)
+                cost_by_model[model_name].observe("问答题", prompt_chars, cached[2])
+                latency_by_model[model_name].observe(
+                    "问答题", prompt_chars, cached[1].get("latency"), cached[2]
+                )
+
+    Missing = Tuple[Dict[str, Any], Dict[str, Any], str, Dict[str, Any]]
+
+    def reuse_global(
+        missing: List[Missing],
+    ) -> Tuple[List[Missing], Dict[str, Missing], Dict[str, List[Missing]]]:
+        # 全局评审缓存：其他 result_root 中评审过完全相同内容的直接复用，并写入本次的评审存储；
+        # 本次缺失的评审中内容相同的只调用一次，其余在评审完成后复制（followers）。
+        followers: Dict[str, List[Missing]] = {}
+        leaders: Dict[str, Missing] = {}
+        if score_cache is None or not missing:
+            return missing, leaders, followers
+        keys = [
+            content_key(j, it, en_mode, _batch_size(j) > 1)
+            for it, j, _rel, _e in missing
+        ]
+        # 批量评审的裁判同时查逐题评审的分数（singles），批量分数优先。
+        singles = [
+            content_key(j, it, en_mode) if _batch_size(j) > 1 else None
+            for it, j, _rel, _e in missing
+        ]
+        hits = score_cache.get_many(keys + [k for k in singles if k is not None])
+        still: List[Missing] = []
+        for m, key, single in zip(missing, keys, singles):
+            it, j, rel, entry = m
+            if key not in hits and single in hits:
+                key = single
+            if key not in hits:
+                if key in leaders:
+                    followers.setdefault(key, []).append(m)
+                else:
+                    leaders[key] = m
+                    still.append(m)
                 continue
-            # 缓存缺失：创建异步任务补齐该 (item, model) 的评审详情。
-            cache["dirty"] = True
-            missing_by_rel[rel] = missing_by_rel.get(rel, 0) + 1
-            missing_tasks.append(asyncio.create_task(run_one_missing(it, j, entry)))
-
-    for rel, n in total_by_rel.items():
-        if missing_by_rel.get(rel, 0) == 0:
-            print(f"Skipping judge {rel}, already done ({n} items).")
-
-    if missing_tasks:
-        pbar = tqdm(total=len(missing_tasks), desc="Judging QA (cached)", unit="task")
-
-        async def track(t: asyncio.Task):
-            try:
-                return await t
-            finally:
-                pbar.update(1)
-
-        # 所有缺失任务并发执行（每个模型仍受 sem_by_model 限流），并用 track 更新进度条。
-        await asyncio.gather(*[track(t) for t in missing_tasks])
-        pbar.close()
-
-    # 将发生变更的缓存文件写回磁盘：只写 dirty 的，减少 IO。
-    for judge_fp, cache in file_cache.items():
-        if not cache.get("dirty"):
-            continue
-        os.makedirs(os.path.dirname(judge_fp), exist_ok=True)
-        with open(judge_fp, "w", encoding="utf-8") as f:
-            json.dump(cache["data"], f, ensure_ascii=False, indent=2)
+            # 复用的评审本次没有消耗 token：用量记为 0（与 followers 一致），
+            # 原评审的用量保留在详情的 cached_from 中。
+            detail, usage = hits[key]
+            detail = dict(detail, cached_from={"usage": usage})
+            qid = str(it.get("id"))
+            store.put_result(rel, qid, j["model_name"], it, en_mode, detail, _empty_usage())
+            entry[j["model_name"]] = detail
+            missing_by_rel[rel] = missing_by_rel.get(rel, 0) - 1
+        n_dup = sum(len(g) for g in followers.values())
+        reused = len(missing) - len(still) - n_dup
+        if reused or n_dup:
+            print(
+                f"Judge cache: {reused} of {len(missing)} judgements reused, "
+                f"{n_dup} duplicates share another judgement."
+            )
+        return still, leaders, followers
+
+    async def run_missing(
+        missing: List[Missing],
+        leaders: Dict[str, Missing],
+        followers: Dict[str, List[Missing]],
+    ):
+        if missing:
+            # 调用单元：逐题评审每个评审一个单元，批量评审每组一个单元（预计耗时为组内之和）。
+            units = _judge_batches(missing)
+            est = [
+                sum(
+                    latency_by_model[missing[i][1]["model_name"]].estimate(
+                        "问答题", judge_prompt_chars(missing[i][0])
+                    )
+                    for i in unit
+                )
+                for unit in units
+            ]
 
-    # 生成最终 scores：每题取所有 judges 的 "模型回答_int" 做均值。
-    # 注意：这里不会触发评审调用，只读取缓存（本次已补齐缺失并写回）。
+            def sort_cost(u: int) -> float:
+                # schedule_order 为 longest_first 的裁判按预计耗时降序启动，其余保持原有顺序。
+                policy = missing[units[u][0]][1].get("schedule_order") or "longest_first"
+                return est[u] if policy == "longest_first" else 0.0
+
+            order = order_by_cost(list(range(len(units))), sort_cost, "longest_first")
+            sched = ScheduleLog(
+                "judge",
+                ",".join(sorted({j.get("schedule_order") or "longest_first" for j in judges})),
+                [est[u] for u in order],
+                sum(max(1, int(j.get("concurrency") or 2)) for j in judges),
+                history=any(m.has_history() for m in latency_by_model.values()),
+            )
+            missing_tasks = [
+                (
+                    asyncio.create_task(
+                        run_batch_missing([missing[i] for i in units[u]])
+                    ),
+                    len(units[u]),
+                )
+                for u in order
+            ]
+            pbar = tqdm(total=len(missing), desc="Judging QA (cached)", unit="task")
+
+            async def track(t: asyncio.Task, n: int):
+                try:
+                    return await t
+                finally:
+                    pbar.update(n)
+
+            # 所有缺失任务并发执行（每个模型仍受 sem_by_model 限流），并用 track 更新进度条。
+            await asyncio.gather(*[track(t, n) for t, n in missing_tasks])
+            pbar.close()
+            sched.finish()
+
+        for key, group in followers.items():
+            _it, j, _rel, leader = leaders[key]
+            detail = leader.get(j["model_name"])
+            if not isinstance(detail, dict):
+                continue
+            usage = _empty_usage()
+            for it, j, rel, entry in group:
+                qid = str(it.get("id"))
+                store.put_result(rel, qid, j["model_name"], it, en_mode, detail, usage)
+                entry[j["model_name"]] = detail
+
+    # 分轮补齐：每轮按 _ensemble_step 为每题找出还需调用的裁判，只为这些 (item, model) 创建任务；
+    # 完整集成时第一轮即为全部缺失的评审。tried 记录已尝试过的组合，避免同一轮次重复调用。
+    tried = set()
+    pending = list(range(len(items)))
+    wave = 0
+    try:
+        while pending:
+            missing: List[Missing] = []
+            waiting: List[int] = []
+            for i in pending:
+                want = [
+                    j
+                    for j in _ensemble_step(entries[i], judges, min_judges, tolerance)[0]
+                    if (i, j["model_name"]) not in tried
+                ]
+                if not want:
+                    continue
+                waiting.append(i)
+                for j in want:
+                    tried.add((i, j["model_name"]))
+                    missing.append((items[i], j, rels[i], entries[i]))
+            if wave == 0:
+                for _it, _j, rel, _entry in missing:
+                    missing_by_rel[rel] = missing_by_rel.get(rel, 0) + 1
+            elif missing:
+                print(
+                    f"Judge ensemble: {len(waiting)} items disagree, "
+                    f"calling {len(missing)} more judgements."
+                )
+            still, leaders, followers = reuse_global(missing)
+            if wave == 0:
+                for rel, n in total_by_rel.items():
+                    if missing_by_rel.get(rel, 0) == 0:
+                        print(f"Skipping judge {rel}, already done ({n} items).")
+            await run_missing(still, leaders, followers)
+            pending = waiting
+            wave += 1
+    finally:
+        if own_store:
+            store.close()
+
+    # 生成最终 scores：每题取 _ensemble_step 计入的裁判的 "模型回答_int" 均值（完整集成时为全部裁判）。
+    # 注意：这里不会触发评审调用，只读取缓存（本次已补齐缺失的评审）。
     scores: List[Optional[float]] = []
-    for it in items:
-        rel = _safe_rel(str(it.get("__source_relpath") or ""))
-        judge_fp = os.path.join(result_root, "judge", rel)
-        cache = load_file_cache(judge_fp)
-        qid = str(it.get("id"))
-        entry = cache["by_id"].get(qid) or {}
-        xs: List[int] = []
-        for j in judges:
-            d = entry.get(j["model_name"])
-            if isinstance(d, dict) and isinstance(d.get("模型回答_int"), int):
-                xs.append(int(d.get("模型回答_int")))
-        if xs:
-            scores.append(sum(xs) / len(xs))
-        else:
-            scores.append(None)
+    complete: List[bool] = []
+    used_by_item: List[Tuple[List[str], int]] = []
+    for it, entry in zip(items, entries):
+        _want, used, done = _ensemble_step(entry, judges, min_judges, tolerance)
+        xs = [int(entry[name]["模型回答_int"]) for name in used]
+        scores.append(sum(xs) / len(xs) if xs else None)
+        complete.append(done)
+        # 未调用的裁判按其 CostModel 估计节省的 token 数（提示词 + 期望生成）。
+        skipped = [j for j in judges if j["model_name"] not in entry]
+        saved = 0
+        if done and skipped:
+            prompt_chars = judge_prompt_chars(it)
+            saved = sum(
+                cost_by_model[j["model_name"]].expected("问答题", prompt_chars)
+                for j in skipped
+            )
+        used_by_item.append((used, saved))
+
+    return scores, judge_usages, complete, used_by_item
 
-    return scores, judge_usages
+
+def _record_ensemble(
+    result_root: str,
+    ensemble_key: List[Any],
+    rels: List[str],
+    stale_rels: List[str],
+    keys: List[Tuple[str, str]],
+    used: List[Tuple[List[str], int]],
+    n_judges: int,
+):
+    # 逐题记录 [计入分数的裁判, 预计节省的 token 数]，按文件保存；部分汇总被复用的文件沿用上次记录，
+    # 本次重新评分的文件整体替换，已不存在的文件删除。集成设置变化时旧记录全部作废。
+    old = read_judge_ensemble(result_root) or {}
+    by_rel: Dict[str, Dict[str, Any]] = (
+        old.get("files") or {} if old.get("ensemble") == ensemble_key else {}
+    )
+    for rel in stale_rels:
+        by_rel[rel] = {}
+    for (rel, qid), (names, saved) in zip(keys, used):
+        by_rel.setdefault(rel, {})[qid] = [names, saved]
+    keep = {_safe_rel(rel) for rel in rels}
+    by_rel = {rel: v for rel, v in by_rel.items() if rel in keep}
+
+    records = [r for v in by_rel.values() for r in v.values()]
+    counts: Dict[str, int] = {}
+    for names, _saved in records:
+        counts[str(len(names))] = counts.get(str(len(names)), 0) + 1
+    calls = sum(len(names) for names, _saved in records)
+    summary = {
+        "items": len(records),
+        "judgements": calls,
+        "full_judgements": len(records) * n_judges,
+        "mean_judges": round(calls / len(records), 3) if records else None,
+        "judges_per_item": dict(sorted(counts.items())),
+        "saved_tokens": sum(saved for _names, saved in records),
+    }
+    write_judge_ensemble(
+        result_root, {"ensemble": ensemble_key, "summary": summary, "files": by_rel}
+    )
+    if records:
+        print(
+            f"Judge ensemble: {summary['mean_judges']:.2f} judges per item "
+            f"({calls} of {summary['full_judgements']} judgements), "
+            f"about {summary['saved_tokens']} tokens saved."
+        )
 
 
 async def compute_scores(
@@ -328,460 +542,186 @@ async def compute_scores(
     judges: List[Dict[str, Any]],
     weights: Dict[str, Any],
     en_mode: bool = False,
+    ci_samples: int = 10000,
+    ci_level: float = 0.95,
+    judge_cache: bool = True,
+    judge_ensemble: str = "full",
+    ensemble_min: int = 2,
+    ensemble_tolerance: float = 10.0,
+) -> Tuple[List[Dict[str, Any]], Dict[str, float], Dict[str, Any]]:
+    # 逐文件的部分汇总（叶子计数表）缓存在 result_root/partials/<rel>：
+    # 原始文件、该文件的评审结果与评审模型都未变化，且问答题都已有评审分数时直接复用，
+    # 只读取、评审并汇总其余文件（评分字段投影见 result_index）。
+    # 评审结果保存在 result_root/judge.sqlite3（JudgeStore），整个评分过程共用一个连接。
+    # judge_cache 为 True 时另用跨 result_root 的全局评审分数缓存（JudgeScoreCache）。
+    # judge_ensemble 为 adaptive 时按裁判顺序逐个调用，前 ensemble_min 个分数的分差
+    # 不超过 ensemble_tolerance 即停止（见 _ensemble_step），逐题记录写入 judge_ensemble.json。
+    ensemble = (
+        (max(1, int(ensemble_min)), float(ensemble_tolerance))
+        if judge_ensemble == "adaptive" and judges
+        else None
+    )
+    store = JudgeStore(result_root) if judges else None
+    score_cache = JudgeScoreCache() if judges and judge_cache else None
+    try:
+        return await _compute_scores(
+            result_root,
+            judges,
+            weights,
+            en_mode,
+            ci_samples,
+            ci_level,
+            store,
+            score_cache,
+            ensemble,
+        )
+    finally:
+        if store is not None:
+            store.close()
+        if score_cache is not None:
+            score_cache.close()
+
+
+async def _compute_scores(
+    result_root: str,
+    judges: List[Dict[str, Any]],
+    weights: Dict[str, Any],
+    en_mode: bool,
+    ci_samples: int,
+    ci_level: float,
+    store: Optional[JudgeStore],
+    score_cache: Optional[JudgeScoreCache],
+    ensemble: Optional[Tuple[int, float]],
 ) -> Tuple[List[Dict[str, Any]], Dict[str, float], Dict[str, Any]]:
-    items = _read_all_json(result_root)
-    security: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
-    quality: Dict[str, Dict[str, Dict[str, List[Dict[str, Any]]]]] = {}
-    general: Dict[str, List[Dict[str, Any]]] = {}
-    special: Dict[str, Dict[str, Dict[str, Dict[str, List[Dict[str, Any]]]]]] = {}
+    judge_names = [j["model_name"] for j in judges]
+    # 自适应集成的设置；裁判顺序决定调用次序，因此按配置顺序记录。
+    ensemble_key = None if ensemble is None else [ensemble[0], ensemble[1], judge_names]
+
+    def key_of(fp: str, rel: str) -> Dict[str, Any]:
+        judge = store.signature(rel) if store is not None else None
+        return partial_key(fp, judge, judge_names, ensemble_key)
+
+    files = list_result_files(result_root)
+    partials: List[Optional[Dict[str, Any]]] = []
+    stale: List[Tuple[str, str]] = []
+    stale_keys: List[Optional[Dict[str, Any]]] = []
+    for fp, rel in files:
+        try:
+            key = key_of(fp, rel)
+        except OSError:
+            key = None
+        p = read_partial(result_root, rel, key) if key is not None else None
+        if p is not None and judges and p["qa_pending"]:
+            p = None
+        partials.append(p)
+        if p is None:
+            stale.append((fp, rel))
+            stale_keys.append(key)
+    loaded = load_scoring_files(result_root, stale)
+    items: List[Question] = []
+    file_of_item: List[int] = []
+    for i, file_items in enumerate(loaded):
+        if file_items:
+            items.extend(file_items)
+            file_of_item.extend([i] * len(file_items))
+    if stale:
+        print(f"Scoring: {len(files) - len(stale)} files reused, {len(stale)} rescored.")
 
     # Initialize usage stats
     total_judge_usage = {}
     for j in judges:
-        total_judge_usage[j["model_name"]] = {
-            "completion_tokens": 0,
-            "prompt_tokens": 0,
-            "total_tokens": 0,
-        }
+        total_judge_usage[j["model_name"]] = _empty_usage()
 
     def merge_usage(usage_map: Dict[str, Dict[str, int]]):
         for model, usage in usage_map.items():
             if model not in total_judge_usage:
-                total_judge_usage[model] = {
-                    "completion_tokens": 0,
-                    "prompt_tokens": 0,
-                    "total_tokens": 0,
-                }
-            total_judge_usage[model]["completion_tokens"] += usage.get(
-                "completion_tokens", 0
-            )
-            total_judge_usage[model]["prompt_tokens"] += usage.get("prompt_tokens", 0)
-            total_judge_usage[model]["total_tokens"] += usage.get("total_tokens", 0)
-
-    for it in items:
-        t = str(it.get("题型"))
-        domain = str(it.get("领域") or "")
-        if domain == "安全":
-            atype = str(it.get("安全类型") or "")
-            aspec = str(it.get("安全专项") or "")
-            security.setdefault(atype, {}).setdefault(aspec, []).append(it)
-        elif domain == "质量":
-            dep = str(it.get("分部工程") or "")
-            sub = str(it.get("子分部工程") or "")
-            itemx = str(it.get("分项工程") or "")
-            quality.setdefault(dep, {}).setdefault(sub, {}).setdefault(
-                itemx, []
-            ).append(it)
-        elif domain in ["医疗", "机场"]:
-            if domain == "机场":
-                # For Airport, map "专项" to "专业类别", others empty
-                val = it.get("专项")
-                if val is None:
-                    print(
-                        f"DEBUG: Missing '专项' for item id={it.get('id')}, keys={it.keys()}"
-                    )
-                cat = str(val or "")
-                spec = ""
-                sub_spec = ""
-                detail = ""
-            else:
-                cat = str(it.get("专业类别") or "")
-                spec = str(it.get("专业专项") or "")
-                sub_spec = str(it.get("子专业专项") or "")
-                detail = str(it.get("细分子专业") or "")
-
-            special.setdefault(domain, {}).setdefault(cat, {}).setdefault(
-                spec, {}
-            ).setdefault(sub_spec, {}).setdefault(detail, []).append(it)
-        else:
-            blk = str(it.get("板块类型") or "")
-            if blk:
-                general.setdefault(blk, []).append(it)
+                total_judge_usage[model] = _empty_usage()
+            _merge_usage(total_judge_usage[model], usage)
 
     qa_score_by_key: Dict[Tuple[str, str], Optional[float]] = {}
+    # 各文件仍缺评审结果的问答题数；不为 0 时该文件的部分汇总下次不复用，缺失的评审会被补齐。
+    qa_pending = [0] * len(stale)
     if judges:
         qa_all = [
-            x
-            for x in items
-            if str(x.get("题型")) == "问答题" and x.get("id") is not None
+            (i, x)
+            for i, x in zip(file_of_item, items)
+            if x.type_code == TYPE_CODES["问答题"] and x.get("id") is not None
         ]
         if qa_all:
-            qs, usages = await _judge_items_cached(
-                qa_all, judges, result_root=result_root, en_mode=en_mode
+            qs, usages, complete, used = await _judge_items_cached(
+                [x for _i, x in qa_all],
+                judges,
+                result_root=result_root,
+                en_mode=en_mode,
+                store=store,
+                score_cache=score_cache,
+                ensemble=ensemble,
             )
             merge_usage(usages)
-            for it, s in zip(qa_all, qs):
-                rel = _safe_rel(str(it.get("__source_relpath") or ""))
+            for (i, it), s, done in zip(qa_all, qs, complete):
+                rel = _safe_rel(str(it.rel or ""))
                 qa_score_by_key[(rel, str(it.get("id")))] = s
+                qa_pending[i] += not done
+        if ensemble is not None:
+            _record_ensemble(
+                result_root,
+                ensemble_key,
+                [rel for _fp, rel in files],
+                [_safe_rel(rel) for _fp, rel in stale],
+                [(_safe_rel(str(it.rel or "")), str(it.get("id"))) for _i, it in qa_all],
+                used if qa_all else [],
+                len(judges),
+            )
 
     def qa_score(it: Dict[str, Any]) -> Optional[float]:
         qid = it.get("id")
         if qid is None:
             return None
-        rel = _safe_rel(str(it.get("__source_relpath") or ""))
+        rel = _safe_rel(str(it.rel or ""))
         return qa_score_by_key.get((rel, str(qid)))
 
-    w_pro = weights["专业技术"]
-    w_gen = weights["通用综合"]
-    w_spec = weights["特色场景"]
-
-    rows: List[Dict[str, Any]] = []
-
-    sec_type_scores: List[float] = []
-    for atype, spec_map in security.items():
-        spec_scores: List[float] = []
-        qa_type_items: List[Dict[str, Any]] = []
-        for aspec, items_s in spec_map.items():
-            if aspec != "/":
-                sc = _acc(
-                    [
-                        _is_correct_single(x)
-                        for x in items_s
-                        if str(x.get("题型")) == "单选题"
-                    ]
-                )
-                mc = _acc(
-                    [
-                        _is_correct_multi(x)
-                        for x in items_s
-                        if str(x.get("题型")) == "多选题"
-                    ]
-                )
-                jc = _acc(
-                    [
-                        _is_correct_judge(x)
-                        for x in items_s
-                        if str(x.get("题型")) == "判断题"
-                    ]
-                )
-                score = w_pro["单选"] * sc + w_pro["多选"] * mc + w_pro["判断"] * jc
-                spec_scores.append(score)
-                rows.append(
-                    {
-                        "部分": "1-1安全",
-                        "层级": "安全专项",
-                        "名称": f"{atype}-{aspec}",
-                        "分数": round(score, 2),
-                    }
-                )
-            else:
-                qa_type_items.extend(
-                    [x for x in items_s if str(x.get("题型")) == "问答题"]
-                )
-        qa_scores = []
-        if qa_type_items and qa_score_by_key:
-            qa_scores = [
-                x for x in [qa_score(it) for it in qa_type_items] if x is not None
-            ]
-        spec_mean = _mean(spec_scores)
-        qa_mean = _mean(qa_scores)
-        type_score = spec_mean * ((100 - w_pro["问答"]) / 100.0) + qa_mean * (
-            w_pro["问答"] / 100.0
-        )
-        sec_type_scores.append(type_score)
-        rows.append(
-            {
-                "部分": "1-1安全",
-                "层级": "安全类型",
-                "名称": atype,
-                "分数": round(type_score, 2),
-            }
-        )
-
-    sec_score = _mean(sec_type_scores)
-    if sec_type_scores:
-        rows.append(
-            {
-                "部分": "1-1安全",
-                "层级": "整体",
-                "名称": "安全",
-                "分数": round(sec_score, 2),
-            }
-        )
-
-    qual_dep_scores: List[float] = []
-    for dep, sub_map in quality.items():
-        sub_scores: List[float] = []
-        for sub, item_map in sub_map.items():
-            item_scores: List[float] = []
-            qa_sub_items: List[Dict[str, Any]] = []
-            for itemx, items_q in item_map.items():
-                if itemx != "/":
-                    sc = _acc(
-                        [
-                            _is_correct_single(x)
-                            for x in items_q
-                            if str(x.get("题型")) == "单选题"
-                        ]
-                    )
-                    mc = _acc(
-                        [
-                            _is_correct_multi(x)
-                            for x in items_q
-                            if str(x.get("题型")) == "多选题"
-                        ]
-                    )
-                    jc = _acc(
-                        [
-                            _is_correct_judge(x)
-                            for x in items_q
-                            if str(x.get("题型")) == "判断题"
-                        ]
-                    )
-                    score = w_pro["单选"] * sc + w_pro["多选"] * mc + w_pro["判断"] * jc
-                    item_scores.append(score)
-                    rows.append(
-                        {
-                            "部分": "1-2质量",
-                            "层级": "分项工程",
-                            "名称": f"{dep}-{sub}-{itemx}",
-                            "分数": round(score, 2),
-                        }
-                    )
-                else:
-                    qa_sub_items.extend(
-                        [x for x in items_q if str(x.get("题型")) == "问答题"]
-                    )
-            qa_scores = []
-            if qa_sub_items and qa_score_by_key:
-                qa_scores = [
-                    x for x in [qa_score(it) for it in qa_sub_items] if x is not None
-                ]
-            item_mean = _mean(item_scores)
-            qa_mean = _mean(qa_scores)
-            sub_score = item_mean * ((100 - w_pro["问答"]) / 100.0) + qa_mean * (
-                w_pro["问答"] / 100.0
-            )
-            sub_scores.append(sub_score)
-            rows.append(
-                {
-                    "部分": "1-2质量",
-                    "层级": "子分部工程",
-                    "名称": f"{dep}-{sub}",
-                    "分数": round(sub_score, 2),
-                }
-            )
-        dep_score = _mean(sub_scores)
-        qual_dep_scores.append(dep_score)
-        rows.append(
-            {
-                "部分": "1-2质量",
-                "层级": "分部工程",
-                "名称": dep,
-                "分数": round(dep_score, 2),
-            }
-        )
-
-    qual_score = _mean(qual_dep_scores)
-    if qual_dep_scores:
-        rows.append(
-            {
-                "部分": "1-2质量",
-                "层级": "整体",
-                "名称": "质量",
-                "分数": round(qual_score, 2),
-            }
-        )
-
-    gen_blk_scores_weighted = 0.0
-    for blk, items_g in general.items():
-        sc = _acc(
-            [_is_correct_single(x) for x in items_g if str(x.get("题型")) == "单选题"]
-        )
-        mc = _acc(
-            [_is_correct_multi(x) for x in items_g if str(x.get("题型")) == "多选题"]
-        )
-        qa_items = [x for x in items_g if str(x.get("题型")) == "问答题"]
-        qa_scores = []
-        if qa_items and qa_score_by_key:
-            qa_scores = [x for x in [qa_score(it) for it in qa_items] if x is not None]
-        qa_mean = _mean(qa_scores)
-        blk_score = (
-            w_gen["单选"] * sc + w_gen["多选"] * mc + w_gen["问答"] / 100.0 * qa_mean
-        )
-
-        blk_weight_key = f"{blk}权重"
-        blk_w = weights.get(blk_weight_key, 0.0)
-        gen_blk_scores_weighted += blk_score * blk_w
-
-        rows.append(
-            {
-                "部分": "2通用综合",
-                "层级": "板块类型",
-                "名称": blk,
-                "分数": round(blk_score, 2),
-            }
-        )
-
-    gen_score = gen_blk_scores_weighted / 100.0
-    if general:
-        rows.append(
-            {
-                "部分": "2通用综合",
-                "层级": "整体",
-                "名称": "通用综合",
-                "分数": round(gen_score, 2),
-            }
-        )
-
-    spec_domain_scores_weighted = 0.0
-    for domain, cat_map in special.items():
-        cat_scores: List[float] = []
-        for cat, spec_map in cat_map.items():
-            spec_scores: List[float] = []
-            for spec, sub_spec_map in spec_map.items():
-                sub_spec_scores: List[float] = []
-                for sub_spec, detail_map in sub_spec_map.items():
-                    detail_scores: List[float] = []
-                    for detail, items_d in detail_map.items():
-                        # Calculate score
-                        if domain == "机场":
-                            # Special case: Airport items are grouped by "专项"
-                            pass
-
-                        sc = _acc(
-                            [
-                                _is_correct_single(x)
-                                for x in items_d
-                                if str(x.get("题型")) == "单选题"
-                            ]
-                        )
-                        mc = _acc(
-                            [
-                                _is_correct_multi(x)
-                                for x in items_d
-                                if str(x.get("题型")) == "多选题"
-                            ]
-                        )
-                        jc = _acc(
-                            [
-                                _is_correct_judge(x)
-                                for x in items_d
-                                if str(x.get("题型")) == "判断题"
-                            ]
-                        )
-                        score = (
-                            w_spec["单选"] * sc
-                            + w_spec["多选"] * mc
-                            + w_spec["判断"] * jc
-                        )
-
-                        detail_scores.append(score)
-                        if detail != "":
-                            rows.append(
-                                {
-                                    "部分": "3特色场景",
-                                    "层级": "细分子专业",
-                                    "名称": f"{domain}-{cat}-{spec}-{sub_spec}-{detail}",
-                                    "分数": round(score, 2),
-                                }
-                            )
-
-                    sub_spec_score = _mean(detail_scores)
-                    sub_spec_scores.append(sub_spec_score)
-                    if sub_spec != "":
-                        rows.append(
-                            {
-                                "部分": "3特色场景",
-                                "层级": "子专业专项",
-                                "名称": f"{domain}-{cat}-{spec}-{sub_spec}",
-                                "分数": round(sub_spec_score, 2),
-                            }
-                        )
-
-                spec_score = _mean(sub_spec_scores)
-                spec_scores.append(spec_score)
-                if spec != "":
-                    rows.append(
-                        {
-                            "部分": "3特色场景",
-                            "层级": "专业专项",
-                            "名称": f"{domain}-{cat}-{spec}",
-                            "分数": round(spec_score, 2),
-                        }
-                    )
-
-            cat_score = _mean(spec_scores)
-            cat_scores.append(cat_score)
-            rows.append(
-                {
-                    "部分": "3特色场景",
-                    "层级": "专业类别",
-                    "名称": f"{domain}-{cat}"
-                    if domain != "机场"
-                    else f"{domain}-{cat}",
-                    "分数": round(cat_score, 2),
-                }
-            )
+    # 列式汇总：逐题判定与评审分数 -> 各文件的叶子计数表 -> 按文件顺序合并 -> 按权重逐层汇总（见 score_table）。
+    qa_scores = [qa_score(it) for it in items]
+    frame = build_frame(items, qa_scores)
+    fresh = leaf_records_by(frame, np.asarray(file_of_item), len(stale))
 
-        domain_score = _mean(cat_scores)
-        w_domain = weights.get(f"{domain}权重", 0.0)
-        spec_domain_scores_weighted += domain_score * w_domain
-
-        rows.append(
-            {
-                "部分": "3特色场景",
-                "层级": "领域",
-                "名称": domain,
-                "分数": round(domain_score, 2),
-            }
-        )
-
-    spec_total_score = spec_domain_scores_weighted / 100.0
-    if special:
-        rows.append(
-            {
-                "部分": "3特色场景",
-                "层级": "整体",
-                "名称": "特色场景",
-                "分数": round(spec_total_score, 2),
-            }
+    for (fp, rel), before, file_items, leaves, pending in zip(
+        stale, stale_keys, loaded, fresh, qa_pending
+    ):
+        if before is None or file_items is None:
+            continue
+        try:
+            # 评审结果可能刚被写入，键在评审之后重新计算；原始文件在读取期间变化时不写入。
+            key = key_of(fp, rel)
+        except OSError:
+            continue
+        if key["raw"] != before["raw"]:
+            continue
+        write_partial(
+            result_root, rel, {"key": key, "qa_pending": pending, "leaves": leaves}
         )
 
-    pro_total = 0.0
-    if sec_type_scores or qual_dep_scores:
-        pro_total = sec_score * (
-            (100 - int(weights["安全权重"])) / 100.0
-        ) + qual_score * ((100 - int(weights["质量权重"])) / 100.0)
-        rows.append(
-            {
-                "部分": "1专业技术",
-                "层级": "整体",
-                "名称": "专业技术",
-                "分数": round(pro_total, 2),
-            }
+    # 按文件顺序拼接各文件的叶子行后一次合并，叶子仍按首次出现的顺序排列。
+    fresh_iter = iter(fresh)
+    records: List[List[Any]] = []
+    for p in partials:
+        records.extend(next(fresh_iter) if p is None else p["leaves"])
+    leaf = merge_leaf_tables([from_leaf_records(records)])
+    write_leaf_table(result_root, leaf_records(leaf))
+    rows, totals = score_leaf_table(leaf, weights)
+    # 每行的 bootstrap 置信区间（“下限”“上限”），ci_samples 为 0 时不计算。
+    if ci_samples > 0:
+        attach_intervals(
+            rows, bootstrap_intervals(leaf, weights, samples=ci_samples, level=ci_level)
         )
-
-    total_score = (
-        pro_total * weights["专业技术权重"] / 100.0
-        + gen_score * weights["通用综合权重"] / 100.0
-        + spec_total_score * weights["特色场景权重"] / 100.0
-    )
-
-    rows.append(
-        {
-            "部分": "整体",
-            "层级": "总分",
-            "名称": "总分",
-            "分数": round(total_score, 2),
-        }
-    )
-
-    totals: Dict[str, float] = {
-        "安全": sec_score,
-        "质量": qual_score,
-        "专业技术": pro_total,
-        "通用综合": gen_score,
-        "特色场景": spec_total_score,
-        "总分": total_score,
-    }
-
     return rows, totals, total_judge_usage
 
 
 def write_csv(rows: List[Dict[str, Any]], out_path: str) -> str:
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
     headers = ["部分", "层级", "名称", "分数"]
+    if any("下限" in r for r in rows):
+        headers += ["下限", "上限"]
     with open(out_path, "w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=headers)
         w.writeheader()
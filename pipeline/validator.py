@@ -1,9 +1,13 @@
 import os
 import json
+import time
+import pickle
+import hashlib
 from collections import defaultdict, Counter
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
-from pipeline.dataset_loader import _list_json_files, _load_json
+from pipeline.dataset_loader import CacheRoot, _list_json_files
+from pipeline.dataset_store import DatasetStore, get_store
 
 
 def validate_model(model_config: Dict[str, Any]):
@@ -17,247 +21,423 @@ def validate_model(model_config: Dict[str, Any]):
     return True, ""
 
 
-def validate_dataset(data_roots: List[str], frame_root: str):
-    logger.info("Starting dataset validation...")
-
-    # 1. Load all data into memory for efficient querying
-    all_items = []
-    files: List[str] = []
-    for data_root in data_roots:
-        if not data_root:
-            continue
-        if not os.path.exists(data_root):
-            logger.warning(f"Data root not found: {data_root}")
-            continue
-        files.extend(_list_json_files(data_root))
-    for fp in files:
-        try:
-            items = _load_json(fp)
-            for item in items:
-                all_items.append(item)
-        except Exception as e:
-            logger.error(f"Failed to load file {fp}: {e}")
-
-    logger.info(f"Loaded {len(all_items)} items for validation.")
-
-    # Helper to filter items
-    def filter_items(**kwargs):
-        subset = []
-        for item in all_items:
-            match = True
-            for k, v in kwargs.items():
-                # Handle keys that might have different names in data vs query
-                item_val = str(item.get(k) or "")
-                # Special handling for domain which can be "领域" or "工程类别"
-                if k == "domain":
-                    item_val = str(item.get("领域") or item.get("工程类别") or "")
-
-                if item_val != v:
-                    match = False
-                    break
-            if match:
-                subset.append(item)
-        return subset
-
-    # Helper to count types
-    def count_types(items):
-        counts = Counter()
-        for item in items:
-            q_type = str(item.get("题型", "未知"))
-            counts[q_type] += 1
-        return counts
+ValidationCachePath = os.path.join(CacheRoot, "validation.pkl")
+
+# 校验缓存格式变化时递增，旧缓存整体作废。
+_VALIDATION_CACHE_VERSION = 1
+
+# validate_dataset 各规则查询的字段组合；计数表按 (字段组合, 领域, 各字段取值) 索引。
+_COUNT_FIELDS = (
+    ("安全类型",),
+    ("安全类型", "安全专项"),
+    ("分部工程", "子分部工程"),
+    ("分部工程", "子分部工程", "分项工程"),
+    ("板块类型",),
+    ("子专业专项",),
+    ("专项",),
+)
+
+
+def _build_count_table(items: List[Any]) -> Dict[Tuple[Any, ...], Dict[str, int]]:
+    """一次遍历得到各字段组合下按题型的题目数，取值规则与逐条过滤时相同（str(值 or "")）。"""
+    table: Dict[Tuple[Any, ...], Counter] = defaultdict(Counter)
+    for item in items:
+        domain = str(item.get("领域") or item.get("工程类别") or "")
+        q_type = str(item.get("题型", "未知"))
+        for fields in _COUNT_FIELDS:
+            key = (fields, domain, *(str(item.get(k) or "") for k in fields))
+            table[key][q_type] += 1
+    return {k: dict(v) for k, v in table.items()}
+
+
+def _load_validation_cache() -> Dict[str, Any]:
+    empty = {
+        "version": _VALIDATION_CACHE_VERSION,
+        "roots": [],
+        "files": {},
+        "frames": {},
+        "checks": {},
+    }
+    if not os.path.exists(ValidationCachePath):
+        return empty
+    try:
+        with open(ValidationCachePath, "rb") as f:
+            data = pickle.load(f)
+    except Exception:
+        return empty
+    if not isinstance(data, dict) or data.get("version") != _VALIDATION_CACHE_VERSION:
+        return empty
+    return data
+
+
+def _save_validation_cache(cache: Dict[str, Any]):
+    try:
+        os.makedirs(CacheRoot, exist_ok=True)
+        tmp = ValidationCachePath + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, ValidationCachePath)
+    except OSError as e:
+        logger.warning(f"Failed to write validation cache {ValidationCachePath}: {e}")
+
+
+def _file_sha1(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _check(rule: int, frame: str, message: str, q_type: Optional[str], domain: str, **fields):
+    # 一个框架节点上的一条检查：q_type 为 None 时要求题目总数 >= 1，否则要求该题型数量 >= 1。
+    # message 中的 {count} 在输出时替换为当前数量。
+    return {
+        "rule": rule,
+        "frame": frame,
+        "message": message,
+        "题型": q_type,
+        "key": (tuple(fields), domain, *fields.values()),
+        "path": fields,
+    }
+
+
+def _frame_checks(frame_root: str, error, warning) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    把 frame/ 下五个框架文件展开为检查列表（顺序与日志输出顺序一致），并返回各框架文件的 sha1。
+    """
+    checks: List[Dict[str, Any]] = []
+    frame_hashes: Dict[str, str] = {}
+
+    def read_frame(rel: str) -> Optional[Any]:
+        frame_path = os.path.join(frame_root, rel)
+        if not os.path.exists(frame_path):
+            warning(f"Frame file not found: {frame_path}")
+            return None
+        frame_hashes[frame_path] = _file_sha1(frame_path)
+        with open(frame_path, "r", encoding="utf-8") as f:
+            return json.load(f)
 
     # --- Rule 1: 1-1 Safety ---
-    frame_path = os.path.join(frame_root, "1专业技术", "1-1安全框架.json")
-    if os.path.exists(frame_path):
-        try:
-            with open(frame_path, "r", encoding="utf-8") as f:
-                frame_data = json.load(f)
-
-            # Structure: {"安全": { "SafetyType": { "SafetySpecial": [...] } }}
-            security_root = frame_data.get("安全", {})
-            for s_type_key, s_type_val in security_root.items():
-                # Strip suffix like (安全类型)
-                s_type = s_type_key.split("(")[0]
-
-                # Check Essay/QA for Safety Type
-                type_items = filter_items(domain="安全", 安全类型=s_type)
-                type_counts = count_types(type_items)
-                if type_counts.get("问答题", 0) < 1:
-                    logger.error(
-                        f"[Rule 1] 1-1安全: 安全类型 '{s_type}' 下缺少问答题 (当前: {type_counts.get('问答题', 0)})"
+    try:
+        frame_data = read_frame(os.path.join("1专业技术", "1-1安全框架.json"))
+        # Structure: {"安全": { "SafetyType": { "SafetySpecial": [...] } }}
+        security_root = (frame_data or {}).get("安全", {})
+        for s_type_key, s_type_val in security_root.items():
+            # Strip suffix like (安全类型)
+            s_type = s_type_key.split("(")[0]
+
+            # Check Essay/QA for Safety Type
+            checks.append(
+                _check(
+                    1,
+                    "1-1安全",
+                    f"[Rule 1] 1-1安全: 安全类型 '{s_type}' 下缺少问答题 (当前: {{count}})",
+                    "问答题",
+                    "安全",
+                    安全类型=s_type,
+                )
+            )
+
+            if isinstance(s_type_val, dict):
+                for s_special_key in s_type_val.keys():
+                    # Strip suffix like (安全专项)
+                    s_special = s_special_key.split("(")[0]
+
+                    # Check Single/Multi/Judge for Safety Special
+                    for q_type in ("单选题", "多选题", "判断题"):
+                        checks.append(
+                            _check(
+                                1,
+                                "1-1安全",
+                                f"[Rule 1] 1-1安全: 安全类型 '{s_type}' - 安全专项 '{s_special}' 下缺少{q_type}",
+                                q_type,
+                                "安全",
+                                安全类型=s_type,
+                                安全专项=s_special,
+                            )
+                        )
+    except Exception as e:
+        error(1, "1-1安全", f"Error processing Rule 1: {e}")
+
+    # --- Rule 2: 1-2 Quality ---
+    try:
+        frame_data = read_frame(os.path.join("1专业技术", "1-2质量框架.json"))
+        # Structure: {"质量": { "Division": { "SubDivision": { "SubItem": [...] } } }}
+        quality_root = (frame_data or {}).get("质量", {})
+        for div_key, div_val in quality_root.items():
+            division = div_key.split("(")[0]
+
+            if isinstance(div_val, dict):
+                for sub_div_key, sub_div_val in div_val.items():
+                    sub_division = sub_div_key.split("(")[0]
+
+                    # Check Essay/QA for SubDivision
+                    checks.append(
+                        _check(
+                            2,
+                            "1-2质量",
+                            f"[Rule 2] 1-2质量: 分部 '{division}' - 子分部 '{sub_division}' 下缺少问答题",
+                            "问答题",
+                            "质量",
+                            分部工程=division,
+                            子分部工程=sub_division,
+                        )
                     )
 
-                if isinstance(s_type_val, dict):
-                    for s_special_key in s_type_val.keys():
-                        # Strip suffix like (安全专项)
-                        s_special = s_special_key.split("(")[0]
+                    if isinstance(sub_div_val, dict):
+                        for sub_item_key in sub_div_val.keys():
+                            sub_item = sub_item_key.split("(")[0]
+
+                            # Check Single/Multi/Judge for SubItem
+                            for q_type in ("单选题", "多选题", "判断题"):
+                                checks.append(
+                                    _check(
+                                        2,
+                                        "1-2质量",
+                                        f"[Rule 2] 1-2质量: 子分部 '{sub_division}' - 分项 '{sub_item}' 下缺少{q_type}",
+                                        q_type,
+                                        "质量",
+                                        分部工程=division,
+                                        子分部工程=sub_division,
+                                        分项工程=sub_item,
+                                    )
+                                )
+    except Exception as e:
+        error(2, "1-2质量", f"Error processing Rule 2: {e}")
 
-                        # Check Single/Multi/Judge for Safety Special
-                        special_items = filter_items(
-                            domain="安全", 安全类型=s_type, 安全专项=s_special
+    # --- Rule 3: 2-1 General ---
+    try:
+        frame_data = read_frame(os.path.join("2通用综合", "2-1通用部分框架.json"))
+        # Structure: {"房屋建筑工程(工程类别)": { "BlockType": [...] }}
+        # Iterate root keys (usually one)
+        for root_key, root_val in (frame_data or {}).items():
+            domain = root_key.split("(")[0]  # e.g. "房屋建筑工程"
+
+            if isinstance(root_val, dict):
+                for block_key in root_val.keys():
+                    block_type = block_key.split("(")[0]
+
+                    # Check Total >= 1
+                    checks.append(
+                        _check(
+                            3,
+                            "2-1通用",
+                            f"[Rule 3] 2-1通用: 板块类型 '{block_type}' 下缺少题目",
+                            None,
+                            domain,
+                            板块类型=block_type,
                         )
-                        special_counts = count_types(special_items)
+                    )
+    except Exception as e:
+        error(3, "2-1通用", f"Error processing Rule 3: {e}")
 
-                        if special_counts.get("单选题", 0) < 1:
-                            logger.error(
-                                f"[Rule 1] 1-1安全: 安全类型 '{s_type}' - 安全专项 '{s_special}' 下缺少单选题"
-                            )
-                        if special_counts.get("多选题", 0) < 1:
-                            logger.error(
-                                f"[Rule 1] 1-1安全: 安全类型 '{s_type}' - 安全专项 '{s_special}' 下缺少多选题"
-                            )
-                        if special_counts.get("判断题", 0) < 1:
-                            logger.error(
-                                f"[Rule 1] 1-1安全: 安全类型 '{s_type}' - 安全专项 '{s_special}' 下缺少判断题"
+    # --- Rule 4: 3-1 Medical ---
+    try:
+        frame_data = read_frame(os.path.join("3特色场景", "3-1医疗.json"))
+        # Structure: {"医疗": { "SpecialtyCat": { "SpecialtySpecial": { "SubSpecialtySpecial": [...] } } }}
+        medical_root = (frame_data or {}).get("医疗", {})
+
+        # 医疗 -> 专业类别 -> 专业专项 -> 子专业专项；数据按“子专业专项”字段计数
+        for cat_key, cat_val in medical_root.items():  # 专业类别
+            if isinstance(cat_val, dict):
+                for spec_key, spec_val in cat_val.items():  # 专业专项
+                    if isinstance(spec_val, dict):
+                        for sub_spec_key in spec_val.keys():  # 子专业专项
+                            sub_spec = sub_spec_key.split("(")[0]
+
+                            # Check Total >= 1
+                            checks.append(
+                                _check(
+                                    4,
+                                    "3-1医疗",
+                                    f"[Rule 4] 3-1医疗: 子专业专项 '{sub_spec}' 下缺少题目",
+                                    None,
+                                    "医疗",
+                                    子专业专项=sub_spec,
+                                )
                             )
-        except Exception as e:
-            logger.error(f"Error processing Rule 1: {e}")
-    else:
-        logger.warning(f"Frame file not found: {frame_path}")
+    except Exception as e:
+        error(4, "3-1医疗", f"Error processing Rule 4: {e}")
 
-    # --- Rule 2: 1-2 Quality ---
-    frame_path = os.path.join(frame_root, "1专业技术", "1-2质量框架.json")
-    if os.path.exists(frame_path):
-        try:
-            with open(frame_path, "r", encoding="utf-8") as f:
-                frame_data = json.load(f)
+    # --- Rule 5: 3-2 Airport ---
+    try:
+        frame_data = read_frame(os.path.join("3特色场景", "3-2机场.json"))
+        # Structure: {"机场": [ "Special", ... ]}
+        airport_root = (frame_data or {}).get("机场", [])
+        if isinstance(airport_root, list):
+            for special in airport_root:
+                # Check Total >= 1
+                checks.append(
+                    _check(
+                        5,
+                        "3-2机场",
+                        f"[Rule 5] 3-2机场: 专项 '{special}' 下缺少题目",
+                        None,
+                        "机场",
+                        专项=special,
+                    )
+                )
+    except Exception as e:
+        error(5, "3-2机场", f"Error processing Rule 5: {e}")
 
-            # Structure: {"质量": { "Division": { "SubDivision": { "SubItem": [...] } } }}
-            quality_root = frame_data.get("质量", {})
-            for div_key, div_val in quality_root.items():
-                division = div_key.split("(")[0]
+    return checks, frame_hashes
 
-                if isinstance(div_val, dict):
-                    for sub_div_key, sub_div_val in div_val.items():
-                        sub_division = sub_div_key.split("(")[0]
 
-                        # Check Essay/QA for SubDivision
-                        sub_div_items = filter_items(
-                            domain="质量", 分部工程=division, 子分部工程=sub_division
-                        )
-                        sub_div_counts = count_types(sub_div_items)
-                        if sub_div_counts.get("问答题", 0) < 1:
-                            logger.error(
-                                f"[Rule 2] 1-2质量: 分部 '{division}' - 子分部 '{sub_division}' 下缺少问答题"
-                            )
+def validate_dataset(
+    data_roots: List[str],
+    frame_root: str,
+    store: Optional[DatasetStore] = None,
+    report_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    按 frame/ 下的框架检查各层级的题目数量，错误写入日志并汇总为报告。
+
+    - 每个文件对计数表的贡献缓存在 .cache/dataset/validation.pkl 中，按 mtime/大小与内容 sha1 判断是否变化；
+      只有变化的文件才会被读取，且只重新检查受其影响的框架节点，其余节点沿用上次结果；
+      框架文件变化时全部重新检查；
+    - 返回报告 dict：items/files 为题目与文件数，errors 为各条规则未满足的节点
+      （含 rule、frame、path、题型、count、message），warnings 为缺失的框架文件，ok 表示无错误，
+      incremental 为变化的文件与重新检查的节点数；
+    - 给定 report_path 时同时把报告写为 JSON。
+    """
+    logger.info("Starting dataset validation...")
 
-                        if isinstance(sub_div_val, dict):
-                            for sub_item_key in sub_div_val.keys():
-                                sub_item = sub_item_key.split("(")[0]
-
-                                # Check Single/Multi/Judge for SubItem
-                                # Note: sub_item might be "/" in data? Need to check if data uses "/" or empty string
-                                # Assuming data matches frame name.
-                                sub_item_items = filter_items(
-                                    domain="质量",
-                                    分部工程=division,
-                                    子分部工程=sub_division,
-                                    分项工程=sub_item,
-                                )
-                                sub_item_counts = count_types(sub_item_items)
+    report: Dict[str, Any] = {"items": 0, "files": 0, "errors": [], "warnings": []}
 
-                                if sub_item_counts.get("单选题", 0) < 1:
-                                    logger.error(
-                                        f"[Rule 2] 1-2质量: 子分部 '{sub_division}' - 分项 '{sub_item}' 下缺少单选题"
-                                    )
-                                if sub_item_counts.get("多选题", 0) < 1:
-                                    logger.error(
-                                        f"[Rule 2] 1-2质量: 子分部 '{sub_division}' - 分项 '{sub_item}' 下缺少多选题"
-                                    )
-                                if sub_item_counts.get("判断题", 0) < 1:
-                                    logger.error(
-                                        f"[Rule 2] 1-2质量: 子分部 '{sub_division}' - 分项 '{sub_item}' 下缺少判断题"
-                                    )
-        except Exception as e:
-            logger.error(f"Error processing Rule 2: {e}")
-    else:
-        logger.warning(f"Frame file not found: {frame_path}")
+    def error(rule: Optional[int], frame: Optional[str], message: str, **detail):
+        logger.error(message)
+        report["errors"].append({"rule": rule, "frame": frame, "message": message, **detail})
 
-    # --- Rule 3: 2-1 General ---
-    frame_path = os.path.join(frame_root, "2通用综合", "2-1通用部分框架.json")
-    if os.path.exists(frame_path):
-        try:
-            with open(frame_path, "r", encoding="utf-8") as f:
-                frame_data = json.load(f)
-
-            # Structure: {"房屋建筑工程(工程类别)": { "BlockType": [...] }}
-            # Iterate root keys (usually one)
-            for root_key, root_val in frame_data.items():
-                domain = root_key.split("(")[0]  # e.g. "房屋建筑工程"
-
-                if isinstance(root_val, dict):
-                    for block_key in root_val.keys():
-                        block_type = block_key.split("(")[0]
-
-                        # Check Total >= 1
-                        block_items = filter_items(domain=domain, 板块类型=block_type)
-                        if len(block_items) < 1:
-                            logger.error(
-                                f"[Rule 3] 2-1通用: 板块类型 '{block_type}' 下缺少题目"
-                            )
-        except Exception as e:
-            logger.error(f"Error processing Rule 3: {e}")
-    else:
-        logger.warning(f"Frame file not found: {frame_path}")
+    def warning(message: str, **detail):
+        logger.warning(message)
+        report["warnings"].append({"message": message, **detail})
 
-    # --- Rule 4: 3-1 Medical ---
-    frame_path = os.path.join(frame_root, "3特色场景", "3-1医疗.json")
-    if os.path.exists(frame_path):
-        try:
-            with open(frame_path, "r", encoding="utf-8") as f:
-                frame_data = json.load(f)
-
-            # Structure: {"医疗": { "SpecialtyCat": { "SpecialtySpecial": { "SubSpecialtySpecial": [...] } } }}
-            medical_root = frame_data.get("医疗", {})
-
-            # We need to traverse deep to find SubSpecialtySpecial
-            # 医疗 -> 专业类别 -> 专业专项 -> 子专业专项
-            for cat_key, cat_val in medical_root.items():  # 专业类别
-                if isinstance(cat_val, dict):
-                    for spec_key, spec_val in cat_val.items():  # 专业专项
-                        if isinstance(spec_val, dict):
-                            for sub_spec_key in spec_val.keys():  # 子专业专项
-                                sub_spec = sub_spec_key.split("(")[0]
-
-                                # Check Total >= 1
-                                # Note: Data only has "子专业专项" field? Or do we need to match path?
-                                # dataset_loader uses: item.get("子专业专项")
-                                sub_spec_items = filter_items(
-                                    domain="医疗", 子专业专项=sub_spec
-                                )
-                                if len(sub_spec_items) < 1:
-                                    logger.error(
-                                        f"[Rule 4] 3-1医疗: 子专业专项 '{sub_spec}' 下缺少题目"
-                                    )
+    # 1. Per-file count contributions, reading only files whose content changed
+    files: List[str] = []
+    for data_root in data_roots:
+        if not data_root:
+            continue
+        if not os.path.exists(data_root):
+            warning(f"Data root not found: {data_root}")
+            continue
+        files.extend(_list_json_files(data_root))
 
+    cache = _load_validation_cache()
+    started = time.perf_counter()
+    contributions: Dict[str, Dict[str, Any]] = {}
+    changed: List[str] = []
+    affected: set = set()
+    loaded = 0
+    # 先用 mtime/大小与 sha1 找出内容变化的文件，由 store 并行解析后再逐个计数。
+    stale: Dict[str, Any] = {}
+    for fp in files:
+        key = os.path.abspath(fp)
+        prev = cache["files"].get(key)
+        try:
+            st = os.stat(key)
+            signature = [st.st_mtime_ns, st.st_size]
+            if prev is not None and prev["signature"] == signature:
+                contributions[key] = prev
+                continue
+            sha1 = _file_sha1(key)
+            if prev is not None and prev["sha1"] == sha1:
+                contributions[key] = {**prev, "signature": signature}
+                continue
         except Exception as e:
-            logger.error(f"Error processing Rule 4: {e}")
-    else:
-        logger.warning(f"Frame file not found: {frame_path}")
-
-    # --- Rule 5: 3-2 Airport ---
-    frame_path = os.path.join(frame_root, "3特色场景", "3-2机场.json")
-    if os.path.exists(frame_path):
+            stale[fp] = e
+            continue
+        stale[fp] = (signature, sha1)
+    if stale:
+        store = store or get_store()
+        store.preload([fp for fp, v in stale.items() if not isinstance(v, Exception)])
+
+    for fp, state in stale.items():
+        key = os.path.abspath(fp)
+        prev = cache["files"].get(key)
         try:
-            with open(frame_path, "r", encoding="utf-8") as f:
-                frame_data = json.load(f)
-
-            # Structure: {"机场": [ "Special", ... ]}
-            airport_root = frame_data.get("机场", [])
-            if isinstance(airport_root, list):
-                for special in airport_root:
-                    # Check Total >= 1
-                    special_items = filter_items(domain="机场", 专项=special)
-                    if len(special_items) < 1:
-                        logger.error(f"[Rule 5] 3-2机场: 专项 '{special}' 下缺少题目")
-            elif isinstance(airport_root, dict):
-                # Handle if it's a dict like others (though sample showed list earlier)
-                pass
-
+            if isinstance(state, Exception):
+                raise state
+            signature, sha1 = state
+            counts = store.column(fp, "validation_counts", _build_count_table)
+            loaded += 1
         except Exception as e:
-            logger.error(f"Error processing Rule 5: {e}")
-    else:
-        logger.warning(f"Frame file not found: {frame_path}")
+            error(None, None, f"Failed to load file {fp}: {e}", file=fp)
+            counts = {}
+            signature, sha1 = None, None
+        contributions[key] = {"signature": signature, "sha1": sha1, "counts": counts}
+        changed.append(fp)
+        affected.update(counts)
+        if prev is not None:
+            affected.update(prev["counts"])
+
+    # 本次不再存在的文件视为变化。
+    for key, prev in cache["files"].items():
+        if key not in contributions:
+            changed.append(key)
+            affected.update(prev["counts"])
+    if store is not None:
+        store.save()
+
+    counts: Dict[Tuple[Any, ...], Counter] = defaultdict(Counter)
+    n_items = 0
+    for contrib in contributions.values():
+        for k, v in contrib["counts"].items():
+            counts[k].update(v)
+            if k[0] == _COUNT_FIELDS[0]:
+                n_items += sum(v.values())
+    logger.info(
+        f"Loaded {n_items} items for validation in "
+        f"{time.perf_counter() - started:.2f}s "
+        f"(changed files: {len(changed)}, parsed files: {loaded})."
+    )
+    report["items"] = n_items
+    report["files"] = len(files)
+
+    # 2. Frame checks; unaffected nodes reuse last run's counts
+    checks, frame_hashes = _frame_checks(frame_root, error, warning)
+    roots = sorted(os.path.abspath(r) for r in data_roots if r)
+    full = frame_hashes != cache["frames"] or roots != cache["roots"]
+    results: Dict[str, int] = {}
+    rechecked = 0
+    for c in checks:
+        check_id = json.dumps([c["rule"], c["key"], c["题型"]], ensure_ascii=False)
+        if not full and c["key"] not in affected and check_id in cache["checks"]:
+            n = cache["checks"][check_id]
+        else:
+            found = counts.get(c["key"]) or Counter()
+            n = sum(found.values()) if c["题型"] is None else found.get(c["题型"], 0)
+            rechecked += 1
+        results[check_id] = n
+        if n < 1:
+            error(
+                c["rule"],
+                c["frame"],
+                c["message"].replace("{count}", str(n)),
+                path=c["path"],
+                题型=c["题型"],
+                count=n,
+            )
+    report["incremental"] = {
+        "changed_files": changed,
+        "checks": len(checks),
+        "rechecked": rechecked,
+    }
+    logger.info(f"Checked {rechecked}/{len(checks)} frame nodes affected by changes.")
+
+    _save_validation_cache(
+        {
+            "version": _VALIDATION_CACHE_VERSION,
+            "roots": roots,
+            "files": contributions,
+            "frames": frame_hashes,
+            "checks": results,
+        }
+    )
+
+    report["ok"] = not report["errors"]
+    if report_path:
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"Dataset validation report written to {report_path}")
 
     logger.info("Dataset validation completed.")
+    return report
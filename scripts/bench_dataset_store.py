@@ -0,0 +1,56 @@
+"""
+测量冷启动（无缓存）与热启动（缓存命中）时加载全部题目的耗时。
+
+在项目根目录运行：python -m scripts.bench_dataset_store
+"""
+import os
+import json
+import time
+
+from pipeline.dataset_loader import DataRoot, _list_json_files
+from pipeline.dataset_store import DatasetStore, StorePath
+
+
+def main():
+    files = sorted(_list_json_files(DataRoot))
+
+    started = time.perf_counter()
+    for fp in files:
+        with open(fp, "r", encoding="utf-8") as f:
+            json.load(f)
+    plain = time.perf_counter() - started
+
+    cold_path = StorePath + ".bench"
+    if os.path.exists(cold_path):
+        os.remove(cold_path)
+    started = time.perf_counter()
+    store = DatasetStore(cold_path)
+    for fp in files:
+        store.load(fp)
+    store.save()
+    cold = time.perf_counter() - started
+
+    os.remove(cold_path)
+    started = time.perf_counter()
+    store = DatasetStore(cold_path)
+    store.preload(files)
+    for fp in files:
+        store.load(fp)
+    store.save()
+    cold_preload = time.perf_counter() - started
+
+    started = time.perf_counter()
+    store = DatasetStore(cold_path)
+    n = sum(len(store.load(fp)) for fp in files)
+    warm = time.perf_counter() - started
+    os.remove(cold_path)
+
+    print(f"files: {len(files)}, items: {n}")
+    print(f"json.load:           {plain:.3f}s")
+    print(f"cold (parse + save): {cold:.3f}s")
+    print(f"cold (preload):      {cold_preload:.3f}s")
+    print(f"warm (cache hit):    {warm:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+对比标准库/orjson、顺序/线程池/进程池在不同文件数与大小下的 JSON 解析耗时。
+
+在项目根目录运行：python -m scripts.bench_jsonio [目录 ...]（默认为 data/）
+"""
+import os
+import sys
+import time
+from typing import List
+
+from pipeline.jsonio import load_files, orjson
+
+
+Root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def _bench(label: str, paths: List[str], **kwargs) -> float:
+    started = time.perf_counter()
+    for _p, _data, err in load_files(paths, **kwargs):
+        if err is not None:
+            raise err
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(p) for p in paths) / 1e6
+    print(f"{label:<32} files={len(paths):<5} {size:8.1f} MB {elapsed:8.3f}s")
+    return elapsed
+
+
+def main(roots: List[str]):
+    roots = roots or [os.path.join(Root, "data")]
+    paths = sorted(
+        os.path.join(r, fn)
+        for root in roots
+        for r, _d, files in os.walk(root)
+        for fn in files
+        if fn.endswith(".json")
+    )
+    print(f"orjson: {'available' if orjson is not None else 'not installed'}, "
+          f"CPUs: {os.cpu_count()}")
+    by_size = sorted(paths, key=os.path.getsize)
+    for subset_label, subset in (
+        ("smallest half", by_size[: len(by_size) // 2]),
+        ("largest half", by_size[len(by_size) // 2 :]),
+        ("all", paths),
+    ):
+        print(f"-- {subset_label}")
+        _bench("stdlib json, sequential", subset, workers=1, use_orjson=False)
+        if orjson is not None:
+            _bench("orjson, sequential", subset, workers=1)
+        _bench("threads x4", subset, workers=4)
+        _bench("processes x4", subset, workers=4, processes=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,130 @@
+"""
+对比逐题评审与批量评审的吞吐与分数一致性（直接调用评审模型，不读写评审存储与缓存）。
+
+在项目根目录运行：
+python -m scripts.bench_judger --config_yaml_path config/test.yaml --batch_size 4 --limit 40
+"""
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+from pipeline.config_loader import load_config
+from pipeline.judger import judge_batch, judge_one, leaf_key
+from pipeline.question import TYPE_CODES
+from pipeline.result_index import read_scoring_items
+
+
+def _leaf_chunks(items: List[Dict[str, Any]], size: int) -> List[List[int]]:
+    # 按 (结果文件, 叶子) 分组，每 size 道题一组（items 的下标）。
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for i, it in enumerate(items):
+        groups.setdefault((getattr(it, "rel", None), leaf_key(it)), []).append(i)
+    return [g[k : k + size] for g in groups.values() for k in range(0, len(g), size)]
+
+
+async def _bench_judge(
+    items: List[Dict[str, Any]], judge_cfg: Dict[str, Any], batch_size: int, en_mode: bool
+) -> Tuple[List[Optional[int]], float, Dict[str, int], int]:
+    # 用一个裁判评审 items：batch_size 为 1 时逐题，否则按叶子分批（解析失败的组逐题）。
+    # 返回 (逐题分数, 耗时秒数, 总用量, 解析失败的批数)。
+    sem = asyncio.Semaphore(max(1, int(judge_cfg.get("concurrency") or 2)))
+    scores: List[Optional[int]] = [None] * len(items)
+    usage = {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+    failed = [0]
+
+    def add(u: Dict[str, int]):
+        for k in usage:
+            usage[k] += int(u.get(k, 0) or 0)
+
+    async def one(i: int):
+        async with sem:
+            s, _detail, u = await judge_one(items[i], judge_cfg, en_mode=en_mode)
+        scores[i] = s
+        add(u)
+
+    async def batch(chunk: List[int]):
+        if len(chunk) == 1:
+            await one(chunk[0])
+            return
+        async with sem:
+            results, u = await judge_batch([items[i] for i in chunk], judge_cfg, en_mode)
+        add(u)
+        if results is None:
+            failed[0] += 1
+            await asyncio.gather(*(one(i) for i in chunk))
+            return
+        for i, (s, _detail, _u) in zip(chunk, results):
+            scores[i] = s
+
+    started = time.perf_counter()
+    if batch_size == 1:
+        await asyncio.gather(*(one(i) for i in range(len(items))))
+    else:
+        await asyncio.gather(*(batch(c) for c in _leaf_chunks(items, batch_size)))
+    return scores, time.perf_counter() - started, usage, failed[0]
+
+
+def _agreement(a: List[Optional[int]], b: List[Optional[int]]) -> str:
+    pairs = [(x, y) for x, y in zip(a, b) if x is not None and y is not None]
+    if not pairs:
+        return "no paired scores"
+    diff = [abs(x - y) for x, y in pairs]
+    xs, ys = [float(x) for x, _y in pairs], [float(y) for _x, y in pairs]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxy = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    sxx = sum((x - mx) ** 2 for x in xs)
+    syy = sum((y - my) ** 2 for y in ys)
+    r = sxy / (sxx * syy) ** 0.5 if sxx > 0 and syy > 0 else float("nan")
+    return (
+        f"n={len(pairs)} mean|diff|={sum(diff) / len(diff):.2f} "
+        f"within 5={sum(d <= 5 for d in diff) / len(diff):.0%} "
+        f"within 10={sum(d <= 10 for d in diff) / len(diff):.0%} "
+        f"mean {mx:.2f} vs {my:.2f} r={r:.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark batched QA judging against single-item judging."
+    )
+    parser.add_argument("--config_yaml_path", type=str, default="./config/test.yaml")
+    parser.add_argument("--result_root", type=str, default=None)
+    parser.add_argument("--batch_size", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=40, help="Number of QA items to judge.")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config_yaml_path)
+    root = args.result_root or cfg.get("result_output_path") or "results"
+    qa = [
+        it
+        for it in read_scoring_items(root)
+        if it.type_code == TYPE_CODES["问答题"] and it.get("id") is not None
+    ]
+    # 取前 limit 道题时保持叶子完整，使批量评审能凑满 batch_size。
+    picked: List[Dict[str, Any]] = []
+    for chunk in _leaf_chunks(qa, max(1, args.batch_size)):
+        if len(picked) >= args.limit:
+            break
+        picked += [qa[i] for i in chunk]
+    picked = picked[: args.limit]
+    print(f"{len(picked)} QA items from {root}, batch size {args.batch_size}")
+    for j in cfg["judges"]:
+        single, t1, u1, _ = asyncio.run(_bench_judge(picked, j, 1, cfg["en_mode"]))
+        batched, t2, u2, failed = asyncio.run(
+            _bench_judge(picked, j, max(1, args.batch_size), cfg["en_mode"])
+        )
+        n = max(1, len(picked))
+        print(f"-- {j['model_name']}")
+        for label, t, u in (("single", t1, u1), ("batched", t2, u2)):
+            print(
+                f"{label:<8} {t:8.1f}s {len(picked) / max(t, 1e-9):7.2f} items/s "
+                f"{u['prompt_tokens'] / n:8.0f} prompt + "
+                f"{u['completion_tokens'] / n:6.0f} completion tokens/item"
+            )
+        print(f"batches not parsed: {failed}")
+        print(f"agreement: {_agreement(single, batched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import pytest
+
+from pipeline.judger import _parse_scores
+
+
+def test_parse_scores_object_and_list():
+    assert _parse_scores('{"scores": [80, 55.5, "70"]}', 3) == [80, 55, 70]
+    assert _parse_scores("<think>...</think>\n[120, -5]", 2) == [100, 0]
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        '{"scores": [Infinity, 3]}',
+        '{"scores": [-Infinity, 3]}',
+        '{"scores": [NaN, 3]}',
+        '{"scores": ["inf", 3]}',
+        '{"scores": ["nan", 3]}',
+        '{"scores": [1e400, 3]}',
+        '{"scores": [' + "9" * 400 + ", 3]}",
+    ],
+)
+def test_parse_scores_rejects_non_finite(reply):
+    assert _parse_scores(reply, 2) is None
+
+
+def test_parse_scores_rejects_wrong_count_and_types():
+    assert _parse_scores('{"scores": [80]}', 2) is None
+    assert _parse_scores('{"scores": [true, 3]}', 2) is None
+    assert _parse_scores('{"scores": ["很好", 3]}', 2) is None
+    assert _parse_scores("80, 70", 2) is None